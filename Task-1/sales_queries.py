@@ -0,0 +1,213 @@
+"""
+Run `Week-1 Queries.sql` against a local copy of sales_data_sample with DuckDB, without a
+database server. The Kaggle CSV is converted once to Parquet and exposed as a
+`sales_data_sample` view. SQL Server syntax the queries use (SELECT TOP n, [brackets],
+ISNULL, LEN, GETDATE) is translated first. Each query runs out of core: DuckDB streams the
+Parquet file and writes the result straight to a Parquet file in the result cache, keyed
+on the query text and the data fingerprint, so reruns of unchanged queries are free.
+
+    python sales_queries.py sales_data_sample.csv
+    python sales_queries.py sales_data_sample.csv --query 16 17
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import duckdb
+
+QUERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Week-1 Queries.sql')
+TABLE_NAME = 'sales_data_sample'
+
+# The Kaggle file is Windows-1252 text with dates like '2/24/2003 0:00'
+SALES_CSV_ENCODING = os.environ.get('SALES_CSV_ENCODING', 'latin-1')
+SALES_DATE_FORMAT = os.environ.get('SALES_DATE_FORMAT', '%m/%d/%Y %H:%M')
+
+QUERY_CACHE_DIR = os.environ.get('SALES_QUERY_CACHE', '.query_cache')
+# Result files kept in the cache; the least recently used ones are removed beyond this
+QUERY_CACHE_MAX_FILES = int(os.environ.get('SALES_QUERY_CACHE_MAX_FILES', '256'))
+
+# e.g. '2GB'; DuckDB spills larger sorts and aggregations to its temp directory
+DUCKDB_MEMORY_LIMIT = os.environ.get('SALES_DUCKDB_MEMORY_LIMIT')
+
+PREVIEW_ROWS = 5
+
+# SQL Server functions with a different name in DuckDB
+TSQL_FUNCTIONS = {
+    r'\bISNULL\s*\(': 'coalesce(',
+    r'\bLEN\s*\(': 'length(',
+    r'\bGETDATE\s*\(\s*\)': 'current_timestamp',
+}
+
+
+def file_fingerprint(path):
+    """Cache key for a local file: path, size and modification time"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _literal(value):
+    """SQL string literal, for statements that cannot take parameters (COPY ... TO)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def split_queries(text):
+    """
+    (name, sql) for each statement of a query file, named after its last '-- Query N'
+    comment. Statements end with ';' (the file has no semicolons inside strings).
+    """
+    queries = []
+    for statement in text.split(';'):
+        labels = re.findall(r'--\s*(Query\s+\d+)', statement, flags=re.IGNORECASE)
+        body = '\n'.join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+        if body:
+            queries.append((labels[-1] if labels else f"Query {len(queries) + 1}", body))
+    return queries
+
+
+def _depth_at(sql, position):
+    return sql.count('(', 0, position) - sql.count(')', 0, position)
+
+
+def translate_tsql(sql):
+    """
+    Rewrite the SQL Server syntax used by the course queries for DuckDB. SELECT TOP n is
+    only supported on the outermost SELECT, where it becomes a trailing LIMIT n.
+    """
+    sql = re.sub(r'\[([^\]]+)\]', r'"\1"', sql)
+    for pattern, replacement in TSQL_FUNCTIONS.items():
+        sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
+
+    top = re.search(r'\bSELECT\s+TOP\s+(\d+)\s+', sql, flags=re.IGNORECASE)
+    if top:
+        if _depth_at(sql, top.start()) != 0:
+            raise ValueError("SELECT TOP is only supported in the outermost query")
+        sql = f"{sql[:top.start()]}SELECT {sql[top.end():].rstrip()}\nLIMIT {top.group(1)}"
+    return sql
+
+
+def ensure_parquet(csv_path, parquet_path=None):
+    """
+    Convert the CSV to Parquet unless the existing conversion was made from the same file
+    (a sidecar JSON records the source fingerprint). Returns the Parquet path.
+    """
+    parquet_path = parquet_path or os.path.splitext(csv_path)[0] + '.parquet'
+    marker = parquet_path + '.source.json'
+    fingerprint = file_fingerprint(csv_path)
+    if os.path.exists(parquet_path) and os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f).get('fingerprint') == fingerprint:
+                return parquet_path
+
+    start = time.perf_counter()
+    con = duckdb.connect()
+    con.execute(f"""
+        COPY (SELECT * FROM read_csv({_literal(csv_path)}, header = true,
+                                     encoding = {_literal(SALES_CSV_ENCODING)},
+                                     timestampformat = {_literal(SALES_DATE_FORMAT)}))
+        TO {_literal(parquet_path + '.tmp')} (FORMAT parquet)
+    """)
+    rows = con.execute("SELECT count(*) FROM read_parquet(?)", [parquet_path + '.tmp']).fetchone()[0]
+    con.close()
+    os.replace(parquet_path + '.tmp', parquet_path)
+    with open(marker, 'w') as f:
+        json.dump({'source': os.path.abspath(csv_path), 'fingerprint': fingerprint, 'rows': rows}, f)
+    print(f"Converted {csv_path} to {parquet_path} ({rows} rows) in {time.perf_counter() - start:.2f}s")
+    return parquet_path
+
+
+class QueryRunner:
+    """DuckDB connection with `sales_data_sample` over a Parquet file, caching results as Parquet"""
+
+    def __init__(self, parquet_path, cache_dir=QUERY_CACHE_DIR, max_cached=QUERY_CACHE_MAX_FILES):
+        self.parquet_path = parquet_path
+        self.cache_dir = cache_dir
+        self.max_cached = max_cached
+        self.data_fingerprint = file_fingerprint(parquet_path)
+        self.con = duckdb.connect()
+        self.con.execute("SET enable_progress_bar = false")
+        if DUCKDB_MEMORY_LIMIT:
+            self.con.execute(f"SET memory_limit = {_literal(DUCKDB_MEMORY_LIMIT)}")
+        self.con.execute(f"CREATE VIEW {TABLE_NAME} AS SELECT * FROM read_parquet({_literal(parquet_path)})")
+
+    def _cache_path(self, sql):
+        key = hashlib.sha1(f"{sql}\n{self.data_fingerprint}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _prune_cache(self):
+        """Remove the least recently used result files beyond max_cached (results of older data included)"""
+        keep = max(self.max_cached, 1)  # never the result just written
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.parquet')]
+        if len(entries) <= keep:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:len(entries) - keep]:
+            os.remove(entry.path)
+        print(f"Removed {len(entries) - keep} cached results from {self.cache_dir}")
+
+    def run(self, sql):
+        """Run one query; returns its result file, row count, seconds and whether it was cached"""
+        sql = translate_tsql(sql)
+        result_path = self._cache_path(sql)
+        start = time.perf_counter()
+        cached = os.path.exists(result_path)
+        if cached:
+            # The modification time records the last use for _prune_cache
+            os.utime(result_path)
+        else:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written straight from DuckDB, in the query's order, so large results never reach Python
+            self.con.execute(f"COPY ({sql}) TO {_literal(result_path + '.tmp')} (FORMAT parquet)")
+            os.replace(result_path + '.tmp', result_path)
+            self._prune_cache()
+        rows = self.con.execute("SELECT count(*) FROM read_parquet(?)", [result_path]).fetchone()[0]
+        return {'path': result_path, 'rows': rows, 'seconds': time.perf_counter() - start, 'cached': cached}
+
+    def preview(self, result, rows=PREVIEW_ROWS):
+        return self.con.execute(f"SELECT * FROM read_parquet(?) LIMIT {int(rows)}", [result['path']]).df()
+
+    def close(self):
+        self.con.close()
+
+
+def run_query_file(csv_path, queries_file=QUERIES_FILE, names=None, cache_dir=QUERY_CACHE_DIR, show=True):
+    """Run the queries of `queries_file` (or those named in `names`) and print their timings"""
+    with open(queries_file, encoding='utf-8') as f:
+        queries = split_queries(f.read())
+    if names:
+        queries = [(name, sql) for name, sql in queries if name in names]
+
+    runner = QueryRunner(ensure_parquet(csv_path), cache_dir)
+    results = {}
+    try:
+        for name, sql in queries:
+            result = runner.run(sql)
+            results[name] = result
+            print(f"{name}: {result['rows']} rows in {result['seconds']:.3f}s"
+                  f"{' (cached)' if result['cached'] else ''}")
+            if show:
+                print(runner.preview(result).to_string(index=False))
+    finally:
+        runner.close()
+    total = sum(result['seconds'] for result in results.values())
+    print(f"{len(results)} queries in {total:.3f}s, {sum(r['cached'] for r in results.values())} from cache")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Week 1 sales queries with DuckDB")
+    parser.add_argument('csv_path', help="sales_data_sample.csv")
+    parser.add_argument('--queries', default=QUERIES_FILE, help="SQL file to run")
+    parser.add_argument('--query', type=int, nargs='+', help="Only run these query numbers")
+    parser.add_argument('--cache-dir', default=QUERY_CACHE_DIR, help="Directory of cached results")
+    parser.add_argument('--quiet', action='store_true', help="Print timings only")
+    args = parser.parse_args()
+    names = [f"Query {number}" for number in args.query] if args.query else None
+    run_query_file(args.csv_path, args.queries, names, args.cache_dir, show=not args.quiet)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Hive-partitioned Parquet dataset for the cleaned inpatient charges data.
+The dataset is written by admission year and month (year=2016/month=10/...), optionally
+split further by DRG code, and read through pyarrow.dataset: only the requested columns
+are read, partition filters skip whole directories and other filters are checked against
+row-group statistics before any data is decoded. The helpers below are the notebook's
+aggregations (exercises 7, 10, 11 and 12) on top of those reads.
+
+    python healthcare_dataset.py cleaned_hospital_data --year 2016
+"""
+
+import argparse
+import calendar
+import itertools
+import json
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PARTITION_COLUMNS = ['year', 'month']
+
+# '039 - EXTRACRANIAL PROCEDURES W/O CC/MCC' is partitioned as drg_code=039
+DRG_PARTITION = 'drg_code'
+PARTITION_BY_DRG = os.environ.get('HEALTHCARE_PARTITION_BY_DRG', '0') == '1'
+
+PARTITION_TYPES = {'year': pa.int64(), 'month': pa.int64(), DRG_PARTITION: pa.string()}
+
+# Upper bound on rows per Parquet row group
+ROWS_PER_GROUP = int(os.environ.get('HEALTHCARE_ROWS_PER_GROUP', '131072'))
+
+
+def partition_columns(by_drg=None):
+    by_drg = PARTITION_BY_DRG if by_drg is None else by_drg
+    return PARTITION_COLUMNS + ([DRG_PARTITION] if by_drg else [])
+
+
+def partitioning(columns):
+    """Hive partitioning with fixed types, so DRG codes like '039' stay strings"""
+    return ds.partitioning(pa.schema([(col, PARTITION_TYPES[col]) for col in columns]), flavor='hive')
+
+
+def add_drg_code(data):
+    data[DRG_PARTITION] = data['drg_definition'].str.split(' - ', n=1).str[0].str.strip()
+    return data
+
+
+def write_dataset(chunks, output_dir, by_drg=None):
+    """
+    Write DataFrame chunks to a partitioned Parquet dataset at `output_dir`. Files stay open
+    across chunks, so each partition gets one file rather than one per chunk. The dataset
+    is written next to `output_dir` and moved into place at the end, so a failed run leaves
+    the previous one. Returns the number of rows and chunks written.
+    """
+    columns = partition_columns(by_drg)
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return {'rows': 0, 'chunks': 0}
+    if DRG_PARTITION in columns:
+        first = add_drg_code(first)
+    # Every chunk is converted with the first chunk's schema so the dataset reads as one table.
+    # Partition columns are dropped from the pandas metadata: they are stored in the paths,
+    # and pd.read_parquet reads them back as categories
+    schema = pa.Schema.from_pandas(first, preserve_index=False)
+    pandas_meta = json.loads(schema.metadata[b'pandas'])
+    pandas_meta['columns'] = [col for col in pandas_meta['columns'] if col['name'] not in columns]
+    schema = schema.with_metadata({b'pandas': json.dumps(pandas_meta)})
+    written = {'rows': 0, 'chunks': 0}
+
+    def batches():
+        for chunk in itertools.chain([first], chunks):
+            if DRG_PARTITION in columns and chunk is not first:
+                chunk = add_drg_code(chunk)
+            written['rows'] += len(chunk)
+            written['chunks'] += 1
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+    staging_dir = output_dir.rstrip('/\\') + '.tmp'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    ds.write_dataset(batches(), staging_dir, schema=schema, format='parquet',
+                     partitioning=partitioning(columns), basename_template='part-{i}.parquet',
+                     max_rows_per_group=ROWS_PER_GROUP)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(staging_dir, output_dir)
+    return written
+
+
+def open_dataset(path):
+    """The dataset at `path`: a partitioned directory, or a single Parquet file"""
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    columns = [col for col in dataset.partitioning.schema.names if col in PARTITION_TYPES]
+    if not columns:
+        return dataset
+    return ds.dataset(path, format='parquet', partitioning=partitioning(columns))
+
+
+def where(**values):
+    """
+    Filter expression matching every given column, e.g. where(year=2016, month=[1, 2]).
+    None values are ignored; returns None when nothing is filtered.
+    """
+    expression = None
+    for col, value in values.items():
+        if value is None:
+            continue
+        field = ds.field(col)
+        term = field.isin(list(value)) if isinstance(value, (list, tuple, set)) else field == value
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def read_table(path, columns=None, filter=None):
+    """Arrow table of `columns` for the rows matching `filter`, reading only what they need"""
+    return open_dataset(path).to_table(columns=columns, filter=filter)
+
+
+def read_frame(path, columns=None, filter=None):
+    return read_table(path, columns, filter).to_pandas()
+
+
+def patient_count_by_drg(path, filter=None):
+    """Patients per DRG definition (exercise 7)"""
+    counts = (read_table(path, ['drg_definition', 'provider_id'], filter)
+              .group_by('drg_definition').aggregate([('provider_id', 'count')])
+              .rename_columns(['drg_definition', 'patient_count']))
+    return counts.to_pandas().sort_values('drg_definition', ignore_index=True)
+
+
+def monthly_admissions(path, filter=None):
+    """Admissions per year and month (exercise 10), answered from the partition values alone"""
+    counts = (read_table(path, PARTITION_COLUMNS, filter)
+              .group_by(PARTITION_COLUMNS).aggregate([([], 'count_all')])
+              .rename_columns(PARTITION_COLUMNS + ['record_count']))
+    return counts.to_pandas().sort_values(PARTITION_COLUMNS, ignore_index=True)
+
+
+def top_providers(path, n=5, filter=None):
+    """The `n` providers with the most patients (exercise 11)"""
+    counts = (read_table(path, ['provider_name', 'provider_id'], filter)
+              .group_by('provider_name').aggregate([('provider_id', 'count')])
+              .rename_columns(['provider_name', 'patient_count']))
+    return counts.to_pandas().sort_values('patient_count', ascending=False, ignore_index=True).head(n)
+
+
+def drg_month_pivot(path, filter=None):
+    """Patients per DRG definition and admission month, months as columns (exercise 12)"""
+    counts = (read_table(path, ['drg_definition', 'month', 'provider_id'], filter)
+              .group_by(['drg_definition', 'month']).aggregate([('provider_id', 'count')])
+              .to_pandas())
+    pivot = counts.pivot_table(index='drg_definition', columns='month', values='provider_id_count',
+                               aggfunc='sum', fill_value=0)
+    pivot = pivot.reindex(columns=range(1, 13), fill_value=0)
+    pivot.columns = [calendar.month_name[m] for m in pivot.columns]
+    return pivot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notebook's aggregations on a partitioned Parquet dataset")
+    parser.add_argument('path', help="Dataset directory written by healthcare_etl.py")
+    parser.add_argument('--year', type=int, nargs='+', help="Admission years to include")
+    parser.add_argument('--month', type=int, nargs='+', help="Admission months to include")
+    args = parser.parse_args()
+    filter = where(year=args.year, month=args.month)
+
+    print(patient_count_by_drg(args.path, filter).head())
+    print(monthly_admissions(args.path, filter).head())
+    print(top_providers(args.path, filter=filter))
+    print(drg_month_pivot(args.path, filter).head())
+
+
+if __name__ == '__main__':
+    main()
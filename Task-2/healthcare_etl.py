@@ -0,0 +1,293 @@
+"""
+Reusable ETL pipeline for the CMS inpatient charges data (exercise 15 of the notebook).
+The CSV is read in chunks, so full-size files never have to fit in memory. Each chunk gets
+standardized column names, currency columns parsed with vectorized string operations,
+admission/discharge dates parsed once with an explicit format, missing values filled,
+duplicates dropped (across chunks too) and the derived length_of_stay/year/month columns,
+then is appended to a Parquet dataset partitioned by admission year and month
+(healthcare_dataset.py).
+
+The mean/median/mode fills need whole-file statistics, which are gathered during the same
+read; the (usually few) rows with a missing value are filled and written last. Past
+HEALTHCARE_DEFERRED_MAX_ROWS they wait in temporary Parquet files instead of memory.
+
+    python healthcare_etl.py Updated_Inpatient_Charges.csv --output cleaned_hospital_data
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from healthcare_dataset import partition_columns, write_dataset
+
+CURRENCY_COLUMNS = ['average_covered_charges', 'average_total_payments', 'average_medicare_payments']
+DATE_COLUMNS = ['admission_date', 'discharge_date']
+
+# Dates in the extract are ISO formatted ('2016-10-28'); anything else becomes NaT
+DATE_FORMAT = os.environ.get('HEALTHCARE_DATE_FORMAT', '%Y-%m-%d')
+
+# Rows parsed and cleaned per chunk
+CHUNK_SIZE = int(os.environ.get('HEALTHCARE_CHUNK_SIZE', '250000'))
+
+# Rows with a value to fill held in memory until the end of the file; more are spilled to disk
+DEFERRED_MAX_ROWS = int(os.environ.get('HEALTHCARE_DEFERRED_MAX_ROWS', '500000'))
+
+# Missing values are filled as in the notebook: mean, median or most frequent value
+FILL_RULES = {
+    'average_total_payments': 'mean',
+    'average_medicare_payments': 'median',
+    'gender': 'mode',
+}
+
+# Currency symbol, thousands separators and stray whitespace
+CURRENCY_JUNK = r'[$,\s]'
+
+
+def standardize_column(name):
+    """'Average Covered Charges ' -> 'average_covered_charges'"""
+    return str(name).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _column_mapping(file_path):
+    """Source header names mapped to standardized names, read from the header only"""
+    header = pd.read_csv(file_path, nrows=0).columns
+    return {name: standardize_column(name) for name in header}
+
+
+def _read_chunks(file_path, mapping, chunksize=None):
+    """Chunks of the CSV with standardized column names; currency and date columns are read as text"""
+    dtype = {source: 'str' for source, name in mapping.items() if name in CURRENCY_COLUMNS + DATE_COLUMNS}
+    reader = pd.read_csv(file_path, dtype=dtype, chunksize=chunksize or CHUNK_SIZE)
+    with reader:
+        for chunk in reader:
+            yield chunk.rename(columns=mapping)
+
+
+def parse_currency(values):
+    """'$32,963.07' -> 32963.07 for a whole column at once; unparseable values become NaN"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    return pd.to_numeric(values.str.replace(CURRENCY_JUNK, '', regex=True), errors='coerce')
+
+
+def parse_dates(values):
+    """Parse a date column in one pass with DATE_FORMAT; other formats become NaT"""
+    return pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+
+
+class FillStats:
+    """
+    Whole-file fill values for the FILL_RULES columns, accumulated chunk by chunk: mean from
+    running sums, median from the column's non-missing values and mode from merged value
+    counts (ties go to the smallest value, like Series.mode()).
+    """
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+        self.parts = {}
+        self.frequencies = {}
+
+    def add(self, data):
+        for col, rule in FILL_RULES.items():
+            if col not in data.columns:
+                continue
+            values = data[col]
+            if rule == 'mean':
+                self.sums[col] = self.sums.get(col, 0.0) + values.sum()
+                self.counts[col] = self.counts.get(col, 0) + int(values.count())
+            elif rule == 'median':
+                self.parts.setdefault(col, []).append(values.dropna().to_numpy(dtype='float64'))
+            else:
+                self.frequencies[col] = self.frequencies.get(col, pd.Series(dtype='int64')).add(
+                    values.value_counts(), fill_value=0)
+
+    def values(self):
+        fills = {}
+        for col, count in self.counts.items():
+            if count:
+                fills[col] = float(self.sums[col] / count)
+        for col, parts in self.parts.items():
+            if sum(len(part) for part in parts):
+                fills[col] = float(np.median(np.concatenate(parts)))
+        for col, top in self.frequencies.items():
+            if len(top):
+                fills[col] = top[top == top.max()].index.min()
+        return fills
+
+
+def parse_chunk(data):
+    """Parse the currency and date columns of one chunk"""
+    for col in CURRENCY_COLUMNS:
+        if col in data.columns:
+            data[col] = parse_currency(data[col])
+    for col in DATE_COLUMNS:
+        if col in data.columns:
+            data[col] = parse_dates(data[col])
+    return data
+
+
+def derive_columns(data):
+    """Add length_of_stay and the year/month partition columns from the admission date"""
+    if 'admission_date' in data.columns:
+        if 'discharge_date' in data.columns:
+            data['length_of_stay'] = (data['discharge_date'] - data['admission_date']).dt.days.astype('Int64')
+        data['year'] = data['admission_date'].dt.year.astype('Int64')
+        data['month'] = data['admission_date'].dt.month.astype('Int64')
+    return data
+
+
+class _RowDeduplicator:
+    """
+    Drops rows repeated within a chunk or seen in an earlier one. Rows are tracked as
+    64-bit hashes in a few sorted, disjoint runs, so membership is a binary search per run.
+    Each chunk adds a run, and a run is merged into the previous one while that one is not
+    larger, so there are O(log n) runs and each hash is re-sorted O(log n) times overall,
+    instead of the whole seen set being sorted again for every chunk.
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.dropped = 0
+
+    def _seen(self, hashes):
+        """Boolean array: which of `hashes` are in one of the runs"""
+        found = np.zeros(len(hashes), dtype=bool)
+        if not self.runs or not len(hashes):
+            return found
+        # Sorted needles keep the binary searches of every run walking forward in memory
+        order = np.argsort(hashes)
+        needles = hashes[order]
+        hits = np.zeros(len(needles), dtype=bool)
+        for run in self.runs:
+            idx = np.searchsorted(run, needles).clip(max=len(run) - 1)
+            hits |= run[idx] == needles
+        found[order] = hits
+        return found
+
+    def filter(self, data):
+        hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+        repeated = pd.Series(hashes).duplicated().to_numpy(copy=True) | self._seen(hashes)
+        # New hashes are unique and not seen yet, so the runs stay disjoint
+        run = np.sort(hashes[~repeated])
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        if len(run):
+            self.runs.append(run)
+        self.dropped += int(repeated.sum())
+        return data[~repeated]
+
+
+class ChunkCleaner:
+    """
+    Cleans one file in a single read. Fill values need whole-file statistics, so rows with
+    a value to fill are held back and are filled and yielded after the last chunk, in file
+    order. Up to `deferred_max_rows` of them stay in memory (the extract rarely has any);
+    beyond that they are spilled to Parquet files in a temporary directory. Duplicates are
+    dropped after filling, as in the notebook.
+    """
+
+    def __init__(self, deferred_max_rows=None):
+        self.fill_stats = FillStats()
+        self.dedup = _RowDeduplicator()
+        self.deferred_max_rows = deferred_max_rows or DEFERRED_MAX_ROWS
+        self.rows_in = 0
+        self.rows_filled = 0
+        self.rows_spilled = 0
+
+    def _finish(self, data):
+        data = self.dedup.filter(derive_columns(data))
+        return data if len(data) else None
+
+    def _fill(self, data, fills):
+        data = data.fillna(fills)
+        self.rows_filled += len(data)
+        return self._finish(data)
+
+    def clean(self, file_path, chunksize=None):
+        """Yield the cleaned, deduplicated chunks of `file_path`"""
+        deferred = []
+        deferred_rows = 0
+        spill_dir = None
+        spilled = []
+        try:
+            for chunk in _read_chunks(file_path, _column_mapping(file_path), chunksize):
+                chunk = parse_chunk(chunk)
+                self.rows_in += len(chunk)
+                self.fill_stats.add(chunk)
+                fill_columns = [col for col in FILL_RULES if col in chunk.columns]
+                missing = chunk[fill_columns].isna().any(axis=1).to_numpy()
+                if missing.any():
+                    deferred.append(chunk[missing])
+                    deferred_rows += int(missing.sum())
+                    chunk = chunk[~missing]
+                    if deferred_rows > self.deferred_max_rows:
+                        if spill_dir is None:
+                            spill_dir = tempfile.mkdtemp(prefix='healthcare_deferred_')
+                            print(f"More than {self.deferred_max_rows} rows to fill, spilling them to {spill_dir}")
+                        part_path = os.path.join(spill_dir, f"part-{len(spilled):05d}.parquet")
+                        pd.concat(deferred).to_parquet(part_path)
+                        spilled.append(part_path)
+                        self.rows_spilled += deferred_rows
+                        deferred, deferred_rows = [], 0
+                chunk = self._finish(chunk)
+                if chunk is not None:
+                    yield chunk
+
+            # Spilled parts first, then the rest in memory, so the filled rows keep file order
+            fills = self.fill_stats.values()
+            for part_path in spilled:
+                chunk = self._fill(pd.read_parquet(part_path), fills)
+                if chunk is not None:
+                    yield chunk
+            if deferred:
+                chunk = self._fill(pd.concat(deferred), fills)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            if spill_dir is not None:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def etl_pipeline(file_path, chunksize=None):
+    """Load → clean → transform `file_path` into one DataFrame (for files that fit in memory)"""
+    return pd.concat(list(ChunkCleaner().clean(file_path, chunksize)), ignore_index=True)
+
+
+def run_etl(file_path, output_dir, chunksize=None, by_drg=None):
+    """
+    Clean `file_path` chunk by chunk into a Parquet dataset at `output_dir`, partitioned by
+    admission year and month (year=2016/month=10/...) and, with `by_drg`, DRG code.
+    Returns a dict of row counts and timings.
+    """
+    start = time.perf_counter()
+    cleaner = ChunkCleaner()
+    written = write_dataset(cleaner.clean(file_path, chunksize), output_dir, by_drg)
+    elapsed = time.perf_counter() - start
+    print(f"Fill values: {cleaner.fill_stats.values()} ({cleaner.rows_filled} rows filled, "
+          f"{cleaner.rows_spilled} spilled to disk)")
+    print(f"Healthcare ETL: {cleaner.rows_in} rows in, {written['rows']} written in {written['chunks']} chunks "
+          f"to {output_dir} partitioned by {'/'.join(partition_columns(by_drg))} "
+          f"({cleaner.dedup.dropped} duplicates dropped) in {elapsed:.2f}s")
+    return {'rows_in': cleaner.rows_in, 'rows_out': written['rows'], 'rows_filled': cleaner.rows_filled,
+            'duplicates_dropped': cleaner.dedup.dropped, 'chunks': written['chunks'],
+            'seconds': round(elapsed, 3), 'output_dir': output_dir}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the inpatient charges CSV into a partitioned Parquet dataset")
+    parser.add_argument('file_path', help="Inpatient charges CSV")
+    parser.add_argument('--output', default='cleaned_hospital_data', help="Parquet dataset directory")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--partition-drg', action='store_true', default=None, help="Also partition by DRG code")
+    args = parser.parse_args()
+    run_etl(args.file_path, args.output, args.chunksize, args.partition_drg)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Cached KPIs for the inpatient charges analysis: patients per DRG, monthly admissions, top
+providers, the DRG by month pivot, gender counts and the correlation matrix of the numeric
+columns (exercises 7, 10-13 and the visualizations).
+
+Each file is cleaned once (healthcare_etl.ChunkCleaner) and reduced, chunk by chunk, into
+partial aggregates that can be merged: one groupby over categorical keys with several
+aggregates, per-provider counts and the pairwise moments behind DataFrame.corr(). Partials
+are cached on disk per file fingerprint, so when a new monthly file is added only that file
+is read and the KPIs are merged from the partials. Duplicates are dropped and missing values
+filled per file.
+
+    python healthcare_kpis.py monthly/2016-01.csv monthly/2016-02.csv
+"""
+
+import argparse
+import calendar
+import hashlib
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from healthcare_etl import ChunkCleaner
+
+KPI_CACHE_DIR = os.environ.get('HEALTHCARE_KPI_CACHE', '.kpi_cache')
+
+# Bump when the partial format changes so old cache files are ignored
+KPI_CACHE_VERSION = 1
+
+GROUP_KEYS = ['drg_definition', 'year', 'month', 'gender']
+CATEGORICAL_KEYS = ['drg_definition', 'gender']
+
+NUMERIC_COLUMNS = ['age', 'average_covered_charges', 'average_total_payments',
+                   'average_medicare_payments', 'length_of_stay']
+
+TOP_PROVIDERS = 5
+
+
+def file_fingerprint(path):
+    """Cache key for a local file: path, size and modification time"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class PairMoments:
+    """
+    Mergeable statistics for a pairwise-complete correlation matrix, as DataFrame.corr()
+    computes it. Entry [i, j] is taken over the rows where both column i and column j are
+    present: `n` rows, the mean of column i, and the centered sums of squares (m2) and
+    cross products (c). Partials are combined with the parallel variance formulas, so
+    large currency values do not lose precision to cancellation.
+    """
+
+    def __init__(self, k):
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.c = np.zeros((k, k))
+
+    @classmethod
+    def from_values(cls, values):
+        moments = cls(values.shape[1])
+        present = ~np.isnan(values)
+        if not present.any():
+            return moments
+        # Centering on the column means first keeps the sums small
+        counts = present.sum(axis=0)
+        center = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(present, values - center, 0.0)
+        mask = present.astype('float64')
+        moments.n = mask.T @ mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(moments.n > 0, (centered.T @ mask) / moments.n, 0.0)
+        moments.m2 = (centered ** 2).T @ mask - moments.n * mean ** 2
+        moments.c = centered.T @ centered - moments.n * mean * mean.T
+        moments.mean = mean + center[:, None]
+        return moments
+
+    def merge(self, other):
+        n = self.n + other.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            share = np.where(n > 0, other.n / n, 0.0)
+        delta = other.mean - self.mean
+        merged = PairMoments(len(n))
+        merged.n = n
+        merged.mean = self.mean + delta * share
+        merged.m2 = self.m2 + other.m2 + delta ** 2 * weight
+        merged.c = self.c + other.c + delta * delta.T * weight
+        return merged
+
+    def corr(self, columns):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(self.m2) > 0, 1.0, np.nan))
+        return pd.DataFrame(corr.clip(-1, 1), index=columns, columns=columns)
+
+
+def reduce_chunk(data):
+    """Partial aggregates of one cleaned chunk"""
+    keys = data[GROUP_KEYS].copy()
+    for col in CATEGORICAL_KEYS:
+        keys[col] = keys[col].astype('category')
+    keys['provider_id'] = data['provider_id']
+    groups = keys.groupby(GROUP_KEYS, observed=True, dropna=False).agg(
+        rows=('provider_id', 'size'), patients=('provider_id', 'count')).reset_index()
+
+    providers = (data['provider_id'].groupby(data['provider_name'].astype('category'), observed=True)
+                 .count())
+    values = data[NUMERIC_COLUMNS].astype('float64').to_numpy(na_value=np.nan)
+    return {'groups': groups, 'providers': providers, 'moments': PairMoments.from_values(values)}
+
+
+def merge_partials(partials):
+    """Combine partial aggregates of chunks or files into one"""
+    partials = list(partials)
+    if not partials:
+        return {'groups': pd.DataFrame(columns=GROUP_KEYS + ['rows', 'patients']),
+                'providers': pd.Series(dtype='int64'), 'moments': PairMoments(len(NUMERIC_COLUMNS))}
+    groups = pd.concat([partial['groups'] for partial in partials], ignore_index=True)
+    for col in CATEGORICAL_KEYS:
+        groups[col] = groups[col].astype('str').where(groups[col].notna())
+    groups = groups.groupby(GROUP_KEYS, dropna=False)[['rows', 'patients']].sum().reset_index()
+
+    providers = pd.concat([partial['providers'].rename(index=str) for partial in partials])
+    providers = providers.groupby(level=0).sum()
+
+    moments = PairMoments(len(NUMERIC_COLUMNS))
+    for partial in partials:
+        moments = moments.merge(partial['moments'])
+    return {'groups': groups, 'providers': providers, 'moments': moments}
+
+
+def reduce_file(file_path, chunksize=None):
+    """Clean `file_path` and reduce it to one partial in a single read"""
+    return merge_partials(reduce_chunk(chunk) for chunk in ChunkCleaner().clean(file_path, chunksize))
+
+
+def compute_kpis(partial):
+    """The notebook's KPI tables from merged partial aggregates"""
+    groups = partial['groups']
+    pivot = groups.pivot_table(index='drg_definition', columns='month', values='patients',
+                               aggfunc='sum', fill_value=0)
+    pivot = pivot.reindex(columns=range(1, 13), fill_value=0)
+    pivot.columns = [calendar.month_name[m] for m in pivot.columns]
+    top = partial['providers'].sort_values(ascending=False, kind='stable').head(TOP_PROVIDERS)
+    return {
+        'patient_count_by_drg': (groups.groupby('drg_definition')['patients'].sum()
+                                 .reset_index(name='patient_count')),
+        'monthly_admissions': (groups.groupby(['year', 'month'])['rows'].sum()
+                               .reset_index(name='record_count')),
+        'top_providers': top.rename_axis('provider_name').reset_index(name='patient_count'),
+        'drg_month_pivot': pivot,
+        'gender_counts': groups.groupby('gender')['rows'].sum().sort_values(ascending=False),
+        'correlation': partial['moments'].corr(NUMERIC_COLUMNS),
+    }
+
+
+class KpiEngine:
+    """
+    KPIs over a list of files. Each file's partial is memoized in memory and on disk under its
+    fingerprint, and the KPIs of a list of files under the list of fingerprints, so repeating
+    a query is a dictionary lookup and adding a file reduces only the new one.
+    """
+
+    def __init__(self, cache_dir=KPI_CACHE_DIR, chunksize=None):
+        self.cache_dir = cache_dir
+        self.chunksize = chunksize
+        self.files_reduced = 0
+        self._partials = {}
+        self._kpis = {}
+
+    def _cache_path(self, fingerprint):
+        key = hashlib.sha1(f"{KPI_CACHE_VERSION}:{fingerprint}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def partial(self, file_path):
+        """Partial aggregates of one file, reduced only if its fingerprint is new"""
+        fingerprint = file_fingerprint(file_path)
+        if fingerprint in self._partials:
+            return self._partials[fingerprint]
+
+        cache_path = self._cache_path(fingerprint) if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                partial = pickle.load(f)
+        else:
+            partial = reduce_file(file_path, self.chunksize)
+            self.files_reduced += 1
+            if cache_path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_path + '.tmp', 'wb') as f:
+                    pickle.dump(partial, f)
+                os.replace(cache_path + '.tmp', cache_path)
+        self._partials[fingerprint] = partial
+        return partial
+
+    def kpis(self, file_paths):
+        """KPI tables over all of `file_paths` (see compute_kpis)"""
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        key = tuple(file_fingerprint(path) for path in file_paths)
+        if key not in self._kpis:
+            self._kpis[key] = compute_kpis(merge_partials(self.partial(path) for path in file_paths))
+        return self._kpis[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the notebook's KPIs for one or more inpatient charges CSVs")
+    parser.add_argument('file_paths', nargs='+', help="Inpatient charges CSVs, e.g. one per month")
+    parser.add_argument('--cache-dir', default=KPI_CACHE_DIR, help="Directory of cached per-file aggregates")
+    args = parser.parse_args()
+
+    engine = KpiEngine(args.cache_dir)
+    start = time.perf_counter()
+    kpis = engine.kpis(args.file_paths)
+    for name, table in kpis.items():
+        print(f"\n{name}\n{table.head(10) if name != 'correlation' else table.round(3)}")
+    print(f"\nKPIs for {len(args.file_paths)} files ({engine.files_reduced} read, the rest cached) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
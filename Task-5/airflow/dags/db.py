@@ -0,0 +1,125 @@
+"""
+Shared PostgreSQL connection factory for the ETL tasks, scripts and the dashboard.
+Connections come from a process-wide ThreadedConnectionPool configured from the
+environment, so callers stop paying a TCP + auth handshake per query.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+from etl_metrics import record_db_call
+
+
+class CountingCursor(extensions.cursor):
+    """Cursor that reports every statement and COPY as a round trip to etl_metrics"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_db_call(time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_db_call(time.perf_counter() - start)
+
+
+DB_CONFIG = {
+    'host': os.environ.get('PGHOST', 'localhost'),
+    'port': int(os.environ.get('PGPORT', '5433')),
+    'database': os.environ.get('PGDATABASE', 'etl_demo'),
+    'user': os.environ.get('PGUSER', 'postgres'),
+    'password': os.environ.get('PGPASSWORD', 'SpeakO13.'),
+    'cursor_factory': CountingCursor,
+}
+
+POOL_MIN_CONNECTIONS = int(os.environ.get('ETL_DB_POOL_MIN', '1'))
+POOL_MAX_CONNECTIONS = int(os.environ.get('ETL_DB_POOL_MAX', '10'))
+
+# Connections idle for longer than this are pinged before being handed out
+HEALTHCHECK_IDLE_SECONDS = float(os.environ.get('ETL_DB_HEALTHCHECK_SECONDS', '30'))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_last_used = {}
+
+
+def get_pool():
+    """Process-wide connection pool, created on first use (and again after a fork)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited from a parent process shares its sockets, never reuse it
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = pool.ThreadedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **DB_CONFIG)
+            _pool_pid = os.getpid()
+            _last_used.clear()
+        return _pool
+
+
+def close_pool():
+    """Close every pooled connection (e.g. at interpreter shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+
+def _is_healthy(conn):
+    """Cheap liveness check: closed flag always, a SELECT 1 only after a long idle period"""
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    # Freshly opened connections have never been used and need no ping
+    if last_used is None or time.monotonic() - last_used < HEALTHCHECK_IDLE_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def get_connection():
+    """
+    Borrow a pooled connection. The caller commits; anything left uncommitted is
+    rolled back before the connection goes back to the pool.
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    while not _is_healthy(conn):
+        _discard(db_pool, conn)
+        conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        try:
+            if not conn.closed and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            pass
+        if conn.closed:
+            _discard(db_pool, conn)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+            db_pool.putconn(conn)
+
+
+def _discard(db_pool, conn):
+    """Drop a broken connection from the pool"""
+    _last_used.pop(id(conn), None)
+    db_pool.putconn(conn, close=True)
@@ -0,0 +1,89 @@
+"""
+Row deduplication before the load.
+A row is identified by a 64-bit hash of its loaded columns, the same value stored as
+movies.row_hash. Repeated rows within a run are dropped chunk by chunk, and a persistent
+seen-set (a sorted array of the hashes currently in the warehouse) lets incremental loads
+of repeated partner drops skip rows the table already holds without querying it. Rows
+changed outside the ETL are not tracked; a full load rebuilds the set.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from etl_state import load_array_state, save_array_state
+from hash_set import HashSet, merge_sorted
+from movies_schema import MOVIES_COLUMNS
+
+SEEN_SET_FILE = 'dedup_seen_hashes.npy'
+
+# Drop rows loaded by earlier incremental runs; '0' only drops repeats within a run
+DEDUP_ACROSS_RUNS = os.environ.get('ETL_DEDUP_ACROSS_RUNS', '1') == '1'
+
+
+def content_hashes(frame):
+    """int64 hash of every row's loaded columns, computed vectorized"""
+    # hash_pandas_object returns uint64; keep the same bits as a signed BIGINT
+    return pd.util.hash_pandas_object(frame[MOVIES_COLUMNS], index=False).to_numpy().view('int64')
+
+
+def _contains(sorted_hashes, hashes):
+    """Membership of `hashes` in a sorted array by binary search"""
+    if not len(sorted_hashes):
+        return np.zeros(len(hashes), dtype=bool)
+    idx = np.searchsorted(sorted_hashes, hashes).clip(max=len(sorted_hashes) - 1)
+    return sorted_hashes[idx] == hashes
+
+
+def load_seen_hashes(cur):
+    """The persisted seen-set, or an empty one if the movies table has been emptied since"""
+    cur.execute("SELECT EXISTS (SELECT 1 FROM movies)")
+    if not cur.fetchone()[0]:
+        return np.empty(0, dtype=np.int64)
+    return load_array_state(SEEN_SET_FILE, np.int64)
+
+
+class RowDeduplicator:
+    """
+    Drops rows whose hash was seen earlier in this run or, with `drop_seen`, in the `seen` set.
+    Without `drop_seen` the set is only carried forward by save().
+    """
+
+    def __init__(self, seen=None, drop_seen=True):
+        self.seen = seen if seen is not None else np.empty(0, dtype=np.int64)
+        self.drop_seen = drop_seen
+        self._run = HashSet(np.int64)
+        self.repeated = 0
+        self.already_loaded = 0
+
+    def filter(self, frame, hashes):
+        """Rows of `frame` not seen before (`hashes` holds one hash per row)"""
+        loaded_before = _contains(self.seen, hashes) if self.drop_seen else np.zeros(len(hashes), dtype=bool)
+        repeated = (pd.Series(hashes).duplicated().to_numpy() | self._run.contains(hashes)) & ~loaded_before
+        keep = ~(loaded_before | repeated)
+        self.already_loaded += int(loaded_before.sum())
+        self.repeated += int(repeated.sum())
+        self._run.add(hashes[keep])
+        return frame[keep]
+
+    @property
+    def run_hashes(self):
+        """Sorted hashes of the rows kept in this run"""
+        return self._run.to_array()
+
+    @property
+    def dropped(self):
+        return self.repeated + self.already_loaded
+
+    def save(self, replace, removed=None):
+        """
+        Persist the seen-set after a committed load: the hashes of this run after a load
+        that replaced the table, or these added to the previous set after an append/merge.
+        `removed` lists hashes no longer in the table (rows replaced by an update), which
+        must not be treated as loaded if they come back.
+        """
+        hashes = self.run_hashes if replace else merge_sorted(self.seen, self.run_hashes)
+        if removed is not None and len(removed):
+            hashes = np.setdiff1d(hashes, removed, assume_unique=True)
+        save_array_state(SEEN_SET_FILE, hashes)
@@ -0,0 +1,190 @@
+"""
+Task metrics helpers shared by the ETL stages.
+Metrics are printed to the task log and pushed to XCom when running under Airflow.
+measure_stage() wraps a whole task and records wall/CPU time, memory, row and byte
+counts and the database round trips counted by db.CountingCursor.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+# Statements sent to PostgreSQL by this process and the time spent waiting for them
+_db_calls = {'round_trips': 0, 'seconds': 0.0}
+_db_calls_lock = threading.Lock()
+
+# Last manual run's stage metrics (state directory), also read by the dashboard's /metrics
+RUN_METRICS_FILE = 'run_metrics.json'
+
+# History of manual runs, one row per stage
+RUN_METRICS_DDL = """
+CREATE TABLE IF NOT EXISTS etl_run_metrics (
+    run_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    wall_seconds DOUBLE PRECISION,
+    cpu_seconds DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION,
+    rows_in BIGINT,
+    rows_out BIGINT,
+    bytes_read BIGINT,
+    db_round_trips INTEGER,
+    db_seconds DOUBLE PRECISION,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, stage)
+);
+"""
+
+RUN_METRICS_COLUMNS = ['status', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'rows_in', 'rows_out',
+                       'bytes_read', 'db_round_trips', 'db_seconds']
+
+# Marks machine-readable progress lines in the runner output (parsed by the dashboard job runner)
+PROGRESS_PREFIX = '@@progress '
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (None if unavailable)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def current_rss_mb():
+    """Current resident set size of the process in MB (None if unavailable)"""
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except ImportError:
+        pass
+    try:
+        # Linux without psutil: resident pages are the second field of /proc/self/statm
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def push_metrics(context, key, metrics):
+    """Print a metrics dict and push it to XCom if a task instance is available"""
+    print(f"{key}: " + ", ".join(f"{name}={value}" for name, value in metrics.items()))
+    ti = (context or {}).get('ti')
+    if ti is not None:
+        ti.xcom_push(key=key, value=metrics)
+    return metrics
+
+
+def report_progress(stage, status, **fields):
+    """Print a single-line JSON progress event for a pipeline stage"""
+    event = {'stage': stage, 'status': status, **fields}
+    print(PROGRESS_PREFIX + json.dumps(event, default=str), flush=True)
+    return event
+
+
+def record_db_call(seconds):
+    """Count one database round trip (called by db.CountingCursor)"""
+    with _db_calls_lock:
+        _db_calls['round_trips'] += 1
+        _db_calls['seconds'] += seconds
+
+
+def db_call_counters():
+    with _db_calls_lock:
+        return dict(_db_calls)
+
+
+def cpu_seconds():
+    """User + system CPU time of this process and its finished child processes (pool workers)"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class StageMetrics:
+    """Measurements of one stage; the stage adds its counts with set()"""
+
+    def __init__(self, stage):
+        self.values = {'stage': stage, 'status': 'running'}
+
+    def set(self, **fields):
+        """Record rows_in, rows_out, bytes_read (or other counts); None values are ignored"""
+        self.values.update({name: value for name, value in fields.items() if value is not None})
+
+
+@contextmanager
+def measure_stage(stage, context=None):
+    """
+    Measure the enclosed block as pipeline stage `stage`. On exit, also when the stage
+    fails or is skipped, the metrics are printed and pushed to XCom as `stage_metrics`.
+    peak_rss_mb is the process high-water mark at the end of the stage.
+    """
+    metrics = StageMetrics(stage)
+    db_before = db_call_counters()
+    cpu_before = cpu_seconds()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield metrics
+        metrics.values['status'] = 'finished'
+    except BaseException as e:
+        # Compared by name so this module does not need Airflow installed
+        metrics.values['status'] = 'skipped' if type(e).__name__ == 'AirflowSkipException' else 'failed'
+        raise
+    finally:
+        db_after = db_call_counters()
+        rss_after = current_rss_mb()
+        metrics.values.update({
+            'wall_seconds': round(time.perf_counter() - start, 3),
+            'cpu_seconds': round(cpu_seconds() - cpu_before, 3),
+            'rss_mb': rss_after,
+            'rss_delta_mb': round(rss_after - rss_before, 1) if None not in (rss_after, rss_before) else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'db_round_trips': db_after['round_trips'] - db_before['round_trips'],
+            'db_seconds': round(db_after['seconds'] - db_before['seconds'], 3),
+        })
+        push_metrics(context, 'stage_metrics', metrics.values)
+
+
+def instrument_stage(stage):
+    """
+    Decorator running an Airflow task callable under measure_stage(stage).
+    The task finds its StageMetrics in context['stage_metrics'] to add row and byte counts.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(**context):
+            with measure_stage(stage, context) as metrics:
+                return func(**context, stage_metrics=metrics)
+        return wrapper
+    return decorator
+
+
+def save_run_metrics(conn, run_id, stages):
+    """Insert one row per stage of a run into etl_run_metrics and commit"""
+    cur = conn.cursor()
+    cur.execute(RUN_METRICS_DDL)
+    for metrics in stages:
+        cur.execute(
+            f"INSERT INTO etl_run_metrics (run_id, stage, {', '.join(RUN_METRICS_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * (len(RUN_METRICS_COLUMNS) + 2))})",
+            [run_id, metrics['stage']] + [metrics.get(col) for col in RUN_METRICS_COLUMNS],
+        )
+    conn.commit()
+    cur.close()
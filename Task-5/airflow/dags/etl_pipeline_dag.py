@@ -2,12 +2,51 @@ from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
+from airflow.exceptions import AirflowSkipException
 import pandas as pd
 import psycopg2
 import boto3
 from botocore.exceptions import ClientError
+import hashlib
 import os
 
+from db import get_connection
+from etl_metrics import instrument_stage, push_metrics
+from etl_state import file_sha256
+from incremental_load import DEFAULT_LOAD_MODE, changed_sources, load_movies, source_unchanged
+from intermediate import (EXPORT_CSV, InMemoryIntermediate, artifact_path, intermediate_row_count,
+                          iter_intermediate_batches)
+from minio_extract import (MINIO_BUCKET, MINIO_OBJECT, MINIO_PREFIX, download_object, download_objects,
+                           list_object_keys, list_objects)
+from movies_loader import DEFAULT_BATCH_SIZE, prepare_movies_frame
+from movies_schema import MOVIES_COLUMNS
+from movies_transform import transform_movies_csv
+from parallel_transform import TRANSFORM_WORKERS, transform_movies_parallel
+from pipelined_etl import run_pipelined
+from stats_cache import refresh_dashboard_stats
+
+# 'minio' downloads the source object, 'local' uses the CSV checked into Task-5
+ETL_SOURCE = os.environ.get('ETL_SOURCE', 'minio')
+
+# Rows failing the validation rules, with their reasons
+QUARANTINE_FILE = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/quarantine/movies_rejected.csv'
+
+# With a MinIO source the DAG lists new or changed objects and maps one transform and one
+# load task over each; '0' keeps the single extract >> transform >> load chain
+ETL_FAN_OUT = os.environ.get('ETL_FAN_OUT', '1') == '1' and ETL_SOURCE == 'minio'
+
+# Pool the per-object tasks run in, and how many of each may run at once
+ETL_POOL = os.environ.get('ETL_POOL', 'default_pool')
+ETL_MAX_ACTIVE_OBJECTS = int(os.environ.get('ETL_MAX_ACTIVE_OBJECTS', '4'))
+
+# Per-object downloads and transformed artifacts
+LANDING_DIR = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/landing'
+TRANSFORMED_DIR = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/transformed'
+
+# Load stats summed over the per-object loads by merge_load_stats
+MERGED_STAT_FIELDS = ['loaded', 'rejected', 'inserted', 'updated', 'unchanged_or_duplicate',
+                      'repeated_rows_dropped', 'already_loaded_dropped', 'lock_wait_seconds']
+
 # Default arguments for the DAG
 default_args = {
     'owner': 'data_engineer',
@@ -29,212 +68,363 @@ dag = DAG(
     tags=['etl', 'minio', 'postgresql', 'movies'],
 )
 
+def _record_files(context, paths):
+    """Add the number and total size of the files a stage read to its stage metrics"""
+    paths = paths if isinstance(paths, list) else [paths]
+    context['stage_metrics'].set(files=len(paths), bytes_read=sum(os.path.getsize(path) for path in paths))
+
+@instrument_stage('extract')
 def extract_from_minio(**context):
-    """Extract CSV file (simulating MinIO extraction)"""
+    """Download the source CSV from MinIO (or use the local copy when ETL_SOURCE=local)"""
     try:
-        # For demo purposes, we'll use the local file directly
-        # In production, this would download from MinIO
         local_file_path = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/Movies.csv'
         
-        # Check if file exists
-        if os.path.exists(local_file_path):
-            print(f"Successfully located CSV file: {local_file_path}")
-            print("(In production, this would download from MinIO)")
-            return local_file_path
-        else:
+        if ETL_SOURCE == 'local':
+            if os.path.exists(local_file_path):
+                print(f"Successfully located CSV file: {local_file_path}")
+                _record_files(context, local_file_path)
+                return local_file_path
             raise FileNotFoundError(f"CSV file not found at {local_file_path}")
         
+        if MINIO_PREFIX is not None:
+            # Partner drops: every CSV under the prefix, transformed together downstream
+            keys = list_object_keys(MINIO_BUCKET, MINIO_PREFIX)
+            if not keys:
+                raise FileNotFoundError(f"No CSV objects under s3://{MINIO_BUCKET}/{MINIO_PREFIX}")
+            results = download_objects(MINIO_BUCKET, keys, 'd:/Data-Engineering-Buildables-Fellowship/Task-5/landing')
+            if context.get('ti') is not None:
+                combined = hashlib.sha256('\n'.join(f"{key}:{r['etag']}" for key, r in zip(keys, results)).encode())
+                context['ti'].xcom_push(key='source_etag', value=combined.hexdigest())
+            print(f"Extracted {len(results)} objects from s3://{MINIO_BUCKET}/{MINIO_PREFIX}")
+            _record_files(context, [r['path'] for r in results])
+            return [r['path'] for r in results]
+        
+        # Parallel ranged download, verified against the ETag and skipped if unchanged
+        landing_path = f'd:/Data-Engineering-Buildables-Fellowship/Task-5/landing/{MINIO_OBJECT}'
+        result = download_object(MINIO_BUCKET, MINIO_OBJECT, landing_path)
+        if context.get('ti') is not None:
+            context['ti'].xcom_push(key='source_etag', value=result['etag'])
+        _record_files(context, result['path'])
+        return result['path']
+        
     except Exception as e:
         print(f"Error in extract step: {e}")
         raise
 
+def _upstream_result(context, task_id, default):
+    """Return value of an upstream task from XCom, or `default` outside Airflow"""
+    ti = context.get('ti')
+    result = ti.xcom_pull(task_ids=task_id) if ti is not None else None
+    return result or default
+
+def _source_fingerprint(context, source):
+    """
+    ETag of the extracted object(s), or a content hash of the local source file(s). The
+    transform step pushes the hash it computed, so the load step never re-reads the source
+    """
+    ti = context.get('ti')
+    fingerprint = None
+    if ti is not None:
+        fingerprint = (ti.xcom_pull(task_ids='extract_from_minio', key='source_etag')
+                       or ti.xcom_pull(task_ids='transform_data', key='source_fingerprint'))
+    if fingerprint:
+        return fingerprint
+    if isinstance(source, list):
+        return hashlib.sha256('\n'.join(file_sha256(path) for path in source).encode()).hexdigest()
+    return file_sha256(source)
+
+def _source_name(source):
+    """Watermark key: the source file, or the bucket prefix for a multi-object extract"""
+    return source if isinstance(source, str) else f"s3://{MINIO_BUCKET}/{MINIO_PREFIX}"
+
+def _skip_if_unchanged(source, fingerprint):
+    """In incremental mode, skip when `source` matches the last loaded watermark"""
+    if DEFAULT_LOAD_MODE != 'incremental':
+        return
+    with get_connection() as conn:
+        unchanged = source_unchanged(conn, _source_name(source), fingerprint)
+    if unchanged:
+        raise AirflowSkipException(f"{_source_name(source)} is unchanged since the last load, skipping")
+
+@instrument_stage('transform')
 def transform_data(**context):
-    """Transform the extracted data"""
+    """Transform the extracted data chunk by chunk"""
     try:
-        # Read the CSV file with proper encoding
-        input_file = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/Movies.csv'
-        try:
-            data = pd.read_csv(input_file, encoding='utf-8')
-        except UnicodeDecodeError:
-            try:
-                data = pd.read_csv(input_file, encoding='latin-1')
-            except UnicodeDecodeError:
-                data = pd.read_csv(input_file, encoding='cp1252')
-        
-        print(f"Original data shape: {data.shape}")
-        print(f"Original columns: {list(data.columns)}")
-        
-        # Data cleaning and transformation
-        # Remove rows with missing critical data
-        data = data.dropna(subset=['movie_title', 'imdb_score'])
-        
-        # Fill missing numeric values with 0
-        numeric_columns = ['num_critic_for_reviews', 'duration', 'director_facebook_likes',
-                          'actor_3_facebook_likes', 'actor_1_facebook_likes', 'gross',
-                          'num_voted_users', 'cast_total_facebook_likes', 'facenumber_in_poster',
-                          'num_user_for_reviews', 'budget', 'title_year', 'actor_2_facebook_likes']
-        
-        for col in numeric_columns:
-            if col in data.columns:
-                data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0)
-        
-        # Clean movie titles (remove extra characters)
-        data['movie_title'] = data['movie_title'].str.strip()
-        
-        # Ensure IMDB score is within valid range
-        data = data[(data['imdb_score'] >= 0) & (data['imdb_score'] <= 10)]
-        
-        # Select and rename columns to match database schema
-        columns_mapping = {
-            'movie_title': 'movie_title',
-            'num_critic_for_reviews': 'num_critic_for_reviews',
-            'duration': 'duration',
-            'director_facebook_likes': 'DIRECTOR_facebook_likes',
-            'actor_3_facebook_likes': 'actor_3_facebook_likes',
-            'actor_1_facebook_likes': 'ACTOR_1_facebook_likes',
-            'gross': 'gross',
-            'num_voted_users': 'num_voted_users',
-            'cast_total_facebook_likes': 'Cast_Total_facebook_likes',
-            'facenumber_in_poster': 'facenumber_in_poster',
-            'num_user_for_reviews': 'num_user_for_reviews',
-            'budget': 'budget',
-            'title_year': 'title_year',
-            'actor_2_facebook_likes': 'ACTOR_2_facebook_likes',
-            'imdb_score': 'imdb_score'
-        }
-        
-        # Select only the columns we need
-        available_columns = [col for col in columns_mapping.keys() if col in data.columns]
-        data_transformed = data[available_columns].copy()
-        
-        # Rename columns
-        data_transformed = data_transformed.rename(columns=columns_mapping)
-        
-        print(f"Transformed data shape: {data_transformed.shape}")
-        print(f"Transformed columns: {list(data_transformed.columns)}")
-        
-        # Save transformed data
-        output_file = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/movies_transformed.csv'
-        data_transformed.to_csv(output_file, index=False)
+        input_file = _upstream_result(context, 'extract_from_minio',
+                                      'd:/Data-Engineering-Buildables-Fellowship/Task-5/Movies.csv')
+        output_file = artifact_path('d:/Data-Engineering-Buildables-Fellowship/Task-5/movies_transformed')
+        csv_export_file = 'd:/Data-Engineering-Buildables-Fellowship/Task-5/movies_transformed.csv' if EXPORT_CSV else None
         
+        # In incremental mode a source file identical to the last loaded one is skipped
+        fingerprint = _source_fingerprint(context, input_file)
+        if context.get('ti') is not None:
+            context['ti'].xcom_push(key='source_fingerprint', value=fingerprint)
+        _skip_if_unchanged(input_file, fingerprint)
+        
+        # Each chunk is cleaned, filtered and renamed, then appended to a typed
+        # Parquet/Arrow artifact, so only one chunk of the source is in memory at a time.
+        # The in-process runner (in_memory=True) keeps the batches in memory instead and
+        # hands the handle to the load step; Airflow tasks always persist the artifact
+        writer = None
+        if context.get('in_memory'):
+            writer = InMemoryIntermediate(output_file, MOVIES_COLUMNS, csv_export_path=csv_export_file)
+        if isinstance(input_file, list) or TRANSFORM_WORKERS > 1:
+            # Byte-range partitions of every input cleaned in a process pool
+            input_files = input_file if isinstance(input_file, list) else [input_file]
+            metrics = transform_movies_parallel(input_files, output_file, csv_export_file=csv_export_file,
+                                                source_keys=None if len(input_files) > 1 else [fingerprint],
+                                                writer=writer, quarantine_file=QUARANTINE_FILE)
+        else:
+            metrics = transform_movies_csv(input_file, output_file, source_key=fingerprint,
+                                           csv_export_file=csv_export_file, writer=writer,
+                                           quarantine_file=QUARANTINE_FILE)
+        push_metrics(context, 'transform_metrics', metrics)
+        _record_files(context, input_file)
+        context['stage_metrics'].set(rows_in=metrics['rows_in'], rows_out=metrics['rows_out'],
+                                     rows_rejected=metrics['rows_rejected'])
+        
+        print(f"Transformed {metrics['rows_in']} rows into {metrics['rows_out']} rows "
+              f"in {metrics['chunks']} chunks ({metrics['rows_rejected']} quarantined)")
+        if writer is not None:
+            print(f"Transformed data kept as {writer!r}")
+            return writer
         print(f"Transformed data saved to {output_file}")
         return output_file
         
+    except AirflowSkipException:
+        raise
     except Exception as e:
         print(f"Error in data transformation: {e}")
         raise
 
+@instrument_stage('load')
 def load_to_postgresql(**context):
     """Load transformed data into PostgreSQL"""
     try:
-        # Read transformed data
-        data = pd.read_csv('d:/Data-Engineering-Buildables-Fellowship/Task-5/movies_transformed.csv')
-        
-        # Handle duplicate columns if any
-        if data.columns.duplicated().any():
-            data = data.loc[:, ~data.columns.duplicated()]
-        
-        print(f"Loading {len(data)} records to PostgreSQL")
-        
-        # Connect to PostgreSQL
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5433,
-            database="etl_demo",
-            user="postgres",
-            password="SpeakO13."
+        source = _upstream_result(context, 'extract_from_minio',
+                                  'd:/Data-Engineering-Buildables-Fellowship/Task-5/Movies.csv')
+        # Typed intermediate artifact (or in-memory handle) produced by the transform step
+        artifact = _upstream_result(
+            context, 'transform_data',
+            artifact_path('d:/Data-Engineering-Buildables-Fellowship/Task-5/movies_transformed'),
         )
-        cur = conn.cursor()
-        
-        # Create table if it doesn't exist
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS movies (
-            id SERIAL PRIMARY KEY,
-            movie_title VARCHAR(255),
-            num_critic_for_reviews INTEGER,
-            duration INTEGER,
-            DIRECTOR_facebook_likes INTEGER,
-            actor_3_facebook_likes INTEGER,
-            ACTOR_1_facebook_likes INTEGER,
-            gross BIGINT,
-            num_voted_users INTEGER,
-            Cast_Total_facebook_likes INTEGER,
-            facenumber_in_poster INTEGER,
-            num_user_for_reviews INTEGER,
-            budget BIGINT,
-            title_year INTEGER,
-            ACTOR_2_facebook_likes INTEGER,
-            imdb_score DECIMAL(3,1),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        cur.execute(create_table_query)
-        
-        # Clear existing data (optional - remove if you want to append)
-        cur.execute("TRUNCATE TABLE movies RESTART IDENTITY;")
-        
-        # Insert data with available columns
-        insert_count = 0
-        for _, row in data.iterrows():
-            try:
-                cur.execute("""
-                    INSERT INTO movies (
-                        movie_title, num_critic_for_reviews, duration, DIRECTOR_facebook_likes,
-                        actor_3_facebook_likes, ACTOR_1_facebook_likes, gross, num_voted_users,
-                        Cast_Total_facebook_likes, facenumber_in_poster, num_user_for_reviews,
-                        budget, title_year, ACTOR_2_facebook_likes, imdb_score
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    row["movie_title"], 
-                    row.get("num_critic_for_reviews", 0), 
-                    row.get("duration", 0), 
-                    0,  # DIRECTOR_facebook_likes not in transformed data
-                    row.get("actor_3_facebook_likes", 0), 
-                    0,  # ACTOR_1_facebook_likes not in transformed data
-                    row.get("gross", 0), 
-                    row.get("num_voted_users", 0),
-                    0,  # Cast_Total_facebook_likes not in transformed data
-                    row.get("facenumber_in_poster", 0), 
-                    row.get("num_user_for_reviews", 0), 
-                    row.get("budget", 0), 
-                    row.get("title_year", 0), 
-                    0,  # ACTOR_2_facebook_likes not in transformed data
-                    row.get("imdb_score", 0)
-                ))
-                insert_count += 1
-            except Exception as e:
-                print(f"Error inserting row: {e}")
-                continue
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        print(f"Successfully loaded {insert_count} records into PostgreSQL")
+        
+        rows_in = intermediate_row_count(artifact)
+        print(f"Loading {rows_in} records from {artifact} to PostgreSQL")
+        frames = (prepare_movies_frame(frame)
+                  for frame in iter_intermediate_batches(artifact, batch_size=DEFAULT_BATCH_SIZE))
+        
+        # Bulk load into a staging table, then replace (full) or upsert changed rows
+        # (incremental) and record the source watermark in one transaction
+        with get_connection() as conn:
+            load_stats = load_movies(conn, frames, source=_source_name(source),
+                                     fingerprint=_source_fingerprint(context, source))
+            # Replace the dashboard's cached stats now rather than waiting for the TTL
+            refresh_dashboard_stats(conn)
+        push_metrics(context, 'load_metrics', load_stats)
+        if isinstance(artifact, str):
+            _record_files(context, artifact)
+        context['stage_metrics'].set(rows_in=rows_in, rows_out=load_stats['loaded'],
+                                     rows_rejected=load_stats['rejected'])
+        
+        print(f"Successfully loaded {load_stats['loaded']} records into PostgreSQL "
+              f"({load_stats['rows_per_sec']:,.0f} rows/sec)")
+        return load_stats
         
     except Exception as e:
         print(f"Error loading data to PostgreSQL: {e}")
         raise
 
-# Define tasks
-extract_task = PythonOperator(
-    task_id='extract_from_minio',
-    python_callable=extract_from_minio,
-    dag=dag,
-)
+@instrument_stage('transform+load')
+def transform_and_load_pipelined(**context):
+    """
+    Transform and load concurrently: chunks are cleaned by worker threads and COPYed into
+    the staging table as they arrive, instead of persisting an intermediate artifact first.
+    Used by the manual runner's --pipelined mode in place of transform_data + load_to_postgresql.
+    """
+    try:
+        source = _upstream_result(context, 'extract_from_minio',
+                                  'd:/Data-Engineering-Buildables-Fellowship/Task-5/Movies.csv')
+        if isinstance(source, list):
+            raise ValueError("Pipelined mode takes a single source file, unset MINIO_PREFIX")
+        fingerprint = _source_fingerprint(context, source)
+        _skip_if_unchanged(source, fingerprint)
+        
+        with get_connection() as conn:
+            stats = run_pipelined(conn, source, watermark_source=source, fingerprint=fingerprint,
+                                  source_key=fingerprint, quarantine_file=QUARANTINE_FILE)
+            refresh_dashboard_stats(conn)
+        push_metrics(context, 'load_metrics', stats)
+        _record_files(context, source)
+        context['stage_metrics'].set(rows_in=stats['rows_in'], rows_out=stats['loaded'],
+                                     rows_rejected=stats['rejected'] + stats['rows_rejected'])
+        
+        print(f"Successfully loaded {stats['loaded']} records into PostgreSQL "
+              f"in {stats['wall_seconds']}s")
+        return stats
+        
+    except AirflowSkipException:
+        raise
+    except Exception as e:
+        print(f"Error in pipelined transform/load: {e}")
+        raise
 
-transform_task = PythonOperator(
-    task_id='transform_data',
-    python_callable=transform_data,
-    dag=dag,
-)
+def _object_source(key):
+    """Watermark key of one mapped object"""
+    return f"s3://{MINIO_BUCKET}/{key}"
 
-load_task = PythonOperator(
-    task_id='load_to_postgresql',
-    python_callable=load_to_postgresql,
-    dag=dag,
-)
+def _object_name(key):
+    """File name stem for one object's artifact and quarantine file: 'drops/2025/a.csv' -> 'drops__2025__a'"""
+    return os.path.splitext(key)[0].replace('/', '__')
+
+@instrument_stage('list')
+def list_new_objects(**context):
+    """
+    CSV objects in the bucket (under MINIO_PREFIX if set) whose ETag differs from the
+    watermark of their last load, as the op_kwargs of one mapped transform task each
+    """
+    try:
+        prefix = MINIO_PREFIX or ''
+        objects = list_objects(MINIO_BUCKET, prefix)
+        with get_connection() as conn:
+            changed = set(changed_sources(conn, {_object_source(obj['key']): obj['etag'] for obj in objects}))
+        new_objects = [{'key': obj['key'], 'etag': obj['etag']} for obj in objects
+                       if _object_source(obj['key']) in changed]
+        context['stage_metrics'].set(files=len(new_objects),
+                                     bytes_read=sum(obj['size'] for obj in objects if _object_source(obj['key']) in changed))
+        print(f"{len(new_objects)} of {len(objects)} objects under s3://{MINIO_BUCKET}/{prefix} are new or changed")
+        return new_objects
+        
+    except Exception as e:
+        print(f"Error listing source objects: {e}")
+        raise
+
+@instrument_stage('transform')
+def transform_object(key, etag, **context):
+    """Download one object and transform it into its own intermediate artifact (one mapped task per object)"""
+    try:
+        result = download_object(MINIO_BUCKET, key, os.path.join(LANDING_DIR, *key.split('/')))
+        os.makedirs(TRANSFORMED_DIR, exist_ok=True)
+        output_file = artifact_path(f"{TRANSFORMED_DIR}/{_object_name(key)}")
+        # Objects are the unit of parallelism here, so each one is transformed in a single process
+        metrics = transform_movies_csv(result['path'], output_file, source_key=result['etag'],
+                                       quarantine_file=os.path.join(os.path.dirname(QUARANTINE_FILE),
+                                                                    f"{_object_name(key)}_rejected.csv"))
+        push_metrics(context, 'transform_metrics', metrics)
+        _record_files(context, result['path'])
+        context['stage_metrics'].set(rows_in=metrics['rows_in'], rows_out=metrics['rows_out'],
+                                     rows_rejected=metrics['rows_rejected'])
+        
+        print(f"Transformed s3://{MINIO_BUCKET}/{key}: {metrics['rows_in']} rows into {metrics['rows_out']} rows "
+              f"({metrics['rows_rejected']} quarantined), saved to {output_file}")
+        # The ETag actually downloaded becomes the object's watermark
+        return {'key': key, 'etag': result['etag'], 'artifact': output_file}
+        
+    except Exception as e:
+        print(f"Error transforming s3://{MINIO_BUCKET}/{key}: {e}")
+        raise
+
+@instrument_stage('load')
+def load_object(key, etag, artifact, **context):
+    """
+    Merge one object's artifact into movies (one mapped task per object). Loads are always
+    incremental, so objects never replace each other's rows, and take turns on the load lock.
+    """
+    try:
+        rows_in = intermediate_row_count(artifact)
+        frames = (prepare_movies_frame(frame)
+                  for frame in iter_intermediate_batches(artifact, batch_size=DEFAULT_BATCH_SIZE))
+        with get_connection() as conn:
+            load_stats = load_movies(conn, frames, mode='incremental', source=_object_source(key), fingerprint=etag)
+        load_stats['source'] = _object_source(key)
+        push_metrics(context, 'load_metrics', load_stats)
+        _record_files(context, artifact)
+        context['stage_metrics'].set(rows_in=rows_in, rows_out=load_stats['loaded'],
+                                     rows_rejected=load_stats['rejected'])
+        
+        print(f"Loaded {load_stats['loaded']} records from s3://{MINIO_BUCKET}/{key} "
+              f"(waited {load_stats['lock_wait_seconds']}s for the load lock)")
+        return load_stats
+        
+    except Exception as e:
+        print(f"Error loading s3://{MINIO_BUCKET}/{key}: {e}")
+        raise
 
-# Set task dependencies
-extract_task >> transform_task >> load_task
\ No newline at end of file
+@instrument_stage('reduce')
+def merge_load_stats(load_stats, **context):
+    """Sum the per-object load stats and refresh the dashboard stats once for the whole run"""
+    try:
+        load_stats = [stats for stats in load_stats if stats]
+        totals = {name: sum(stats.get(name) or 0 for stats in load_stats) for name in MERGED_STAT_FIELDS}
+        totals['lock_wait_seconds'] = round(totals['lock_wait_seconds'], 3)
+        totals['objects'] = len(load_stats)
+        with get_connection() as conn:
+            refresh_dashboard_stats(conn)
+        push_metrics(context, 'load_metrics', totals)
+        context['stage_metrics'].set(files=len(load_stats), rows_out=totals['loaded'],
+                                     rows_rejected=totals['rejected'])
+        
+        print(f"Loaded {totals['loaded']} records from {totals['objects']} objects "
+              f"({totals['inserted']} inserted, {totals['updated']} updated)")
+        return totals
+        
+    except Exception as e:
+        print(f"Error merging load stats: {e}")
+        raise
+
+# Define tasks
+if ETL_FAN_OUT:
+    list_task = PythonOperator(
+        task_id='list_new_objects',
+        python_callable=list_new_objects,
+        dag=dag,
+    )
+    
+    # One mapped task instance per new object; the pool and max_active_tis_per_dag
+    # bound how many transforms and loads run at once
+    transform_objects = PythonOperator.partial(
+        task_id='transform_object',
+        python_callable=transform_object,
+        pool=ETL_POOL,
+        max_active_tis_per_dag=ETL_MAX_ACTIVE_OBJECTS,
+        dag=dag,
+    ).expand(op_kwargs=list_task.output)
+    
+    load_objects = PythonOperator.partial(
+        task_id='load_object',
+        python_callable=load_object,
+        pool=ETL_POOL,
+        max_active_tis_per_dag=ETL_MAX_ACTIVE_OBJECTS,
+        dag=dag,
+    ).expand(op_kwargs=transform_objects.output)
+    
+    reduce_task = PythonOperator(
+        task_id='merge_load_stats',
+        python_callable=merge_load_stats,
+        op_kwargs={'load_stats': load_objects.output},
+        dag=dag,
+    )
+    
+    # Set task dependencies
+    list_task >> transform_objects >> load_objects >> reduce_task
+else:
+    extract_task = PythonOperator(
+        task_id='extract_from_minio',
+        python_callable=extract_from_minio,
+        dag=dag,
+    )
+    
+    transform_task = PythonOperator(
+        task_id='transform_data',
+        python_callable=transform_data,
+        dag=dag,
+    )
+    
+    load_task = PythonOperator(
+        task_id='load_to_postgresql',
+        python_callable=load_to_postgresql,
+        dag=dag,
+    )
+    
+    # Set task dependencies
+    extract_task >> transform_task >> load_task
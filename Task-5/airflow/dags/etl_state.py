@@ -0,0 +1,122 @@
+"""
+Small persistent state store for the ETL tasks (caches, ETags, seen-sets).
+Airflow runs each task in its own process, so anything shared between runs lives on disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STATE_DIR = os.environ.get(
+    'ETL_STATE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'state'),
+)
+
+
+def state_path(name):
+    """Absolute path of a file inside the state directory"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
+
+
+def load_json_state(name, default=None):
+    """Read a JSON state file, returning `default` if it is missing or unreadable"""
+    path = state_path(name)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {} if default is None else default
+
+
+def _tmp_path(path):
+    # Unique per thread as well, since mapped tasks may share a process
+    return f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+
+
+@contextmanager
+def state_lock(name):
+    """Exclusive lock on a state file across processes and threads (a `.lock` file beside it)"""
+    with open(state_path(name + '.lock'), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def save_json_state(name, value):
+    """Atomically replace a JSON state file"""
+    path = state_path(name)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def update_json_state(name, updates):
+    """
+    Merge `updates` into a JSON state file under state_lock, so concurrent tasks that
+    each add their own keys do not drop each other's entries. Returns the merged state.
+    """
+    with state_lock(name):
+        state = load_json_state(name)
+        state.update(updates)
+        save_json_state(name, state)
+    return state
+
+
+def load_array_state(name, dtype):
+    """Read a NumPy array state file, returning an empty array if it is missing or unreadable"""
+    try:
+        return np.load(state_path(name), allow_pickle=False)
+    except (FileNotFoundError, ValueError, OSError):
+        return np.empty(0, dtype=dtype)
+
+
+def save_array_state(name, values):
+    """Atomically replace a NumPy array state file"""
+    path = state_path(name)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        np.save(f, values, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Content fingerprint of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Cache key for a local file: path, size and modification time"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
@@ -0,0 +1,65 @@
+"""
+Set of 64-bit row hashes that grows chunk by chunk.
+Hashes are kept as a few sorted runs instead of one array: a new chunk becomes a run of
+its own and is merged with the last run only while that run is not larger, like the
+carries of a binary counter. Each hash is merged O(log(chunks)) times, so adding n
+hashes costs O(n log n) in total instead of re-sorting the whole set per chunk, and a
+lookup is one binary search per run.
+"""
+
+import numpy as np
+
+
+def _sorted_unique(values):
+    # np.unique hashes before sorting, which is much slower for 64-bit hashes
+    values = np.sort(values)
+    if len(values) < 2:
+        return values
+    return values[np.concatenate([[True], values[1:] != values[:-1]])]
+
+
+def merge_sorted(a, b):
+    """Union of two sorted, unique arrays"""
+    return _sorted_unique(np.concatenate([a, b]))
+
+
+class HashSet:
+    def __init__(self, dtype=np.int64):
+        self.dtype = dtype
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, hashes):
+        """Boolean array: which of `hashes` are in the set"""
+        hashes = np.asarray(hashes, dtype=self.dtype)
+        if not self.runs or not len(hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        # Sorted needles walk each run in order, which is far more cache friendly
+        order = np.argsort(hashes)
+        needles = hashes[order]
+        found_sorted = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            idx = np.searchsorted(run, needles).clip(max=len(run) - 1)
+            found_sorted |= run[idx] == needles
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = found_sorted
+        return found
+
+    def add(self, hashes):
+        run = _sorted_unique(np.asarray(hashes, dtype=self.dtype))
+        # Runs stay disjoint, so the set's size is the sum of theirs
+        run = run[~self.contains(run)]
+        if not len(run):
+            return
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = merge_sorted(self.runs.pop(), run)
+        self.runs.append(run)
+
+    def to_array(self):
+        """The whole set as one sorted array (merges the runs once)"""
+        while len(self.runs) > 1:
+            run = self.runs.pop()
+            self.runs[-1] = merge_sorted(self.runs[-1], run)
+        return self.runs[0] if self.runs else np.empty(0, dtype=self.dtype)
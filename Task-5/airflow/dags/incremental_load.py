@@ -0,0 +1,330 @@
+"""
+Full, partition and incremental (change data capture) loads of the movies table.
+Every batch is bulk-loaded into a temporary staging table, then swapped into the year
+partitions of `movies` (movies_partitions.py) or merged by a content hash keyed on the
+normalized title and year. A per-source watermark records the fingerprint of the last
+loaded file so unchanged files can be skipped, and rows already loaded or repeated within
+the run are dropped before staging (dedup.py), and the rollups of the years a load
+touched are recomputed before it commits (movies_rollups.py). Loads take an advisory lock,
+so concurrent loads (e.g. one mapped Airflow task per source object) merge one at a time.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from psycopg2 import extensions, sql
+
+from dedup import DEDUP_ACROSS_RUNS, RowDeduplicator, content_hashes, load_seen_hashes
+from movies_loader import MOVIES_COLUMNS, bulk_load
+from movies_rollups import ensure_rollup_tables, refresh_rollups
+from movies_partitions import (analyze_partitions, attached_partition_starts, build_partition, check_partition_width,
+                               drop_partition, ensure_partitioned_table, ensure_partitions, movies_relkind,
+                               partition_years, staged_partition_starts, swap_in_partition)
+
+# 'full' replaces the table contents, 'partitions' replaces only the year partitions
+# present in the source, 'incremental' upserts only new or changed rows
+DEFAULT_LOAD_MODE = os.environ.get('ETL_LOAD_MODE', 'full')
+
+LOAD_MODES = ('full', 'partitions', 'incremental')
+
+KEY_COLUMNS = ['row_key', 'row_hash']
+
+MOVIES_KEY_DDL = """
+ALTER TABLE movies ADD COLUMN IF NOT EXISTS row_key TEXT;
+ALTER TABLE movies ADD COLUMN IF NOT EXISTS row_hash BIGINT;
+ALTER TABLE movies ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+CREATE UNIQUE INDEX IF NOT EXISTS movies_row_key_idx ON movies (row_key, title_year);
+CREATE INDEX IF NOT EXISTS movies_imdb_score_idx ON movies (imdb_score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS movies_title_idx ON movies (lower(movie_title));
+"""
+
+# Advisory lock key shared by every process loading into movies
+MOVIES_LOAD_LOCK = 727001
+
+WATERMARK_DDL = """
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    rows_loaded INTEGER,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Hashes of rows an incremental merge is about to overwrite (run before the merge)
+REPLACED_HASHES_QUERY = """
+SELECT m.row_hash FROM movies m JOIN movies_staging s USING (row_key)
+WHERE m.row_hash IS DISTINCT FROM s.row_hash;
+"""
+
+# Staged rows that lost to a later row with the same key (run after the merge)
+SUPERSEDED_HASHES_QUERY = """
+SELECT s.row_hash FROM movies_staging s
+WHERE NOT EXISTS (SELECT 1 FROM movies m WHERE m.row_key = s.row_key AND m.row_hash = s.row_hash);
+"""
+
+
+def add_row_keys(frame):
+    """
+    Add the merge key (normalized title + year) and a content hash of the loaded
+    columns, both computed vectorized over the whole frame.
+    """
+    title_key = (frame['movie_title'].fillna('').astype(str)
+                 .str.strip().str.lower().str.replace(r'\s+', ' ', regex=True))
+    year_key = frame['title_year'].astype('Int64').astype('string').fillna('')
+    frame = frame.copy()
+    frame['row_key'] = title_key + '|' + year_key
+    frame['row_hash'] = content_hashes(frame)
+    return frame
+
+
+def ensure_movies_table(cur):
+    """Create the partitioned movies table, its merge key, score and title indexes, and the watermark table"""
+    ensure_partitioned_table(cur)
+    cur.execute(MOVIES_KEY_DDL)
+    cur.execute(WATERMARK_DDL)
+
+
+def get_watermark(cur, source):
+    """Fingerprint of the last file loaded for `source`, or None"""
+    cur.execute("SELECT fingerprint FROM etl_watermarks WHERE source = %s", (source,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def source_unchanged(conn, source, fingerprint):
+    """True if `fingerprint` matches the watermark stored by the last successful load"""
+    cur = conn.cursor()
+    try:
+        cur.execute(WATERMARK_DDL)
+        unchanged = get_watermark(cur, source) == fingerprint
+    finally:
+        cur.close()
+    conn.commit()
+    return unchanged
+
+
+def changed_sources(conn, fingerprints):
+    """Sources of a {source: fingerprint} dict whose fingerprint differs from their watermark"""
+    cur = conn.cursor()
+    try:
+        cur.execute(WATERMARK_DDL)
+        cur.execute("SELECT source, fingerprint FROM etl_watermarks WHERE source = ANY(%s)", (list(fingerprints),))
+        loaded = dict(cur.fetchall())
+    finally:
+        cur.close()
+    conn.commit()
+    return [source for source, fingerprint in fingerprints.items() if loaded.get(source) != fingerprint]
+
+
+@contextmanager
+def movies_load_lock(conn):
+    """
+    Hold the session advisory lock serializing loads into movies. It is released after the
+    load's commit, ANALYZE and seen-set save, so the next load starts from a saved seen-set.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (MOVIES_LOAD_LOCK,))
+    try:
+        yield
+    finally:
+        # A closed connection has already dropped its session locks
+        if not conn.closed:
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MOVIES_LOAD_LOCK,))
+            conn.commit()
+        cur.close()
+
+
+def _set_watermark(cur, source, fingerprint, rows_loaded):
+    cur.execute("""
+        INSERT INTO etl_watermarks (source, fingerprint, rows_loaded, loaded_at)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint,
+            rows_loaded = EXCLUDED.rows_loaded,
+            loaded_at = EXCLUDED.loaded_at
+    """, (source, fingerprint, rows_loaded))
+
+
+def _reset_other_watermarks(cur, source):
+    """
+    Forget the watermarks of every source but `source` after a full load replaced the table
+    with its rows, so the next run reloads the others instead of skipping them as unchanged
+    """
+    cur.execute("DELETE FROM etl_watermarks WHERE source IS DISTINCT FROM %s RETURNING source", (source,))
+    cleared = [row[0] for row in cur.fetchall()]
+    if cleared:
+        print(f"Full load replaced movies: cleared the watermarks of {len(cleared)} other sources, "
+              f"which are reloaded by their next run")
+
+
+def _staging_query():
+    """Temp table with the loaded columns plus a sequence recording staging order"""
+    columns = sql.SQL(', ').join(sql.SQL(col) for col in MOVIES_COLUMNS + KEY_COLUMNS)
+    return sql.SQL("""
+        CREATE TEMP TABLE movies_staging ON COMMIT DROP AS
+        SELECT {columns} FROM movies WITH NO DATA;
+        ALTER TABLE movies_staging ADD COLUMN staging_seq BIGSERIAL;
+    """).format(columns=columns)
+
+
+def _partition_rows(bounds=None):
+    """Column list and SELECT of the last staged row per key, limited to a partition's `bounds` if given"""
+    columns = sql.SQL(', ').join(sql.SQL(col) for col in MOVIES_COLUMNS + KEY_COLUMNS)
+    return sql.SQL("""
+        ({columns})
+        SELECT DISTINCT ON (row_key) {columns}
+        FROM movies_staging
+        WHERE {bounds}
+        ORDER BY row_key, staging_seq DESC
+    """).format(columns=columns, bounds=sql.SQL('TRUE') if bounds is None else bounds)
+
+
+def _merge_query():
+    """
+    INSERT ... ON CONFLICT from staging, keeping the last staged row per key.
+    Returns the inserted and updated counts and the years of the rows written.
+    """
+    updates = sql.SQL(', ').join(
+        sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.SQL(col))
+        for col in MOVIES_COLUMNS + ['row_hash']
+    )
+    # Unchanged rows match the WHERE clause on row_hash and are left untouched.
+    # The conflict target includes title_year because unique keys of a partitioned
+    # table must contain the partition key; row_key already holds the year. System
+    # columns (xmax) cannot be returned from a partitioned table, but only updates set updated_at
+    return sql.SQL("""
+        WITH merged AS (
+            INSERT INTO movies {rows}
+            ON CONFLICT (row_key, title_year) DO UPDATE
+            SET {updates}, updated_at = CURRENT_TIMESTAMP
+            WHERE movies.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+            RETURNING (movies.updated_at IS NULL) AS inserted, title_year
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted),
+               coalesce(array_agg(DISTINCT title_year), '{{}}') FROM merged
+    """).format(rows=_partition_rows(), updates=updates)
+
+
+def _swap_partitions(cur, mode, starts):
+    """
+    Build each staged partition in its own table, then swap them all in. A full load also
+    restarts the id sequence and drops the partitions the source no longer covers; it always
+    rebuilds the default partition so that one exists.
+    Returns (rows inserted, hashes of the rows in replaced partitions when mode is 'partitions').
+    """
+    if mode == 'full':
+        cur.execute("SELECT setval(pg_get_serial_sequence('movies', 'id'), 1, false)")
+        starts = starts if None in starts else starts + [None]
+    else:
+        check_partition_width(cur)
+    inserted = sum(build_partition(cur, start, _partition_rows) for start in starts)
+
+    # DETACH takes an exclusive lock on movies, so the swaps run last, just before the commit
+    if mode == 'full':
+        for start in set(attached_partition_starts(cur)) - set(starts):
+            drop_partition(cur, start)
+    removed = []
+    for start in starts:
+        removed += swap_in_partition(cur, start, collect_hashes=mode == 'partitions' and DEDUP_ACROSS_RUNS)
+    return inserted, removed
+
+
+def load_movies(conn, frames, mode=None, source=None, fingerprint=None):
+    """
+    Load prepared movie frames through the staging table and swap or merge them into `movies`.
+    Runs in the caller's transaction, under movies_load_lock, and commits at the end, then
+    analyzes what changed. Returns the bulk load stats extended with inserted/updated/unchanged counts.
+    """
+    mode = mode or DEFAULT_LOAD_MODE
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode '{mode}', expected one of {', '.join(LOAD_MODES)}")
+
+    requested = time.perf_counter()
+    with movies_load_lock(conn):
+        lock_wait = time.perf_counter() - requested
+        stats = _load_movies(conn, frames, mode, source, fingerprint)
+    stats['lock_wait_seconds'] = round(lock_wait, 3)
+    return stats
+
+
+def _load_movies(conn, frames, mode, source, fingerprint):
+    start = time.perf_counter()
+    cur = conn.cursor()
+    if movies_relkind(cur) == 'r':
+        # A table created before partitioning is only rebuilt by an explicit full load: merging
+        # one source into a rebuilt table would drop every other source's rows
+        if mode != 'full':
+            raise ValueError("movies is not partitioned yet; run a full load (ETL_LOAD_MODE=full) to rebuild it")
+        cur.execute("DROP TABLE movies")
+    ensure_movies_table(cur)
+    rebuild_rollups = ensure_rollup_tables(cur)
+
+    if mode == 'incremental':
+        # Rows loaded before merge keys existed cannot be matched. Rebuilding from this one
+        # source would drop every other source's rows, so that takes an explicit full load
+        cur.execute("SELECT EXISTS (SELECT 1 FROM movies WHERE row_key IS NULL)")
+        if cur.fetchone()[0]:
+            raise ValueError("movies has rows without merge keys; run a full load (ETL_LOAD_MODE=full) to rebuild it")
+
+    # Rows loaded by earlier runs only count as duplicates when merging into them; a
+    # partition load keeps the set just to carry the other partitions' hashes forward
+    seen = load_seen_hashes(cur) if mode != 'full' and DEDUP_ACROSS_RUNS else None
+    dedup = RowDeduplicator(seen, drop_seen=mode == 'incremental')
+
+    cur.execute(_staging_query())
+    stats = bulk_load(conn, (dedup.filter(frame, frame['row_hash'].to_numpy())
+                             for frame in map(add_row_keys, frames)),
+                      table='movies_staging', columns=MOVIES_COLUMNS + KEY_COLUMNS)
+
+    starts = staged_partition_starts(cur)
+    replaced = []
+    if mode == 'incremental':
+        ensure_partitions(cur, starts)
+        if DEDUP_ACROSS_RUNS:
+            cur.execute(REPLACED_HASHES_QUERY)
+            replaced = [row[0] for row in cur.fetchall()]
+        cur.execute(_merge_query())
+        inserted, updated, years = cur.fetchone()
+    else:
+        inserted, old_hashes = _swap_partitions(cur, mode, starts)
+        updated = 0
+        # Rows reloaded unchanged keep their hash in the seen-set
+        replaced = list(np.setdiff1d(np.array(old_hashes, dtype=np.int64), dedup.run_hashes))
+        years = [year for start in starts for year in partition_years(start)]
+    if DEDUP_ACROSS_RUNS:
+        cur.execute(SUPERSEDED_HASHES_QUERY)
+        replaced += [row[0] for row in cur.fetchall()]
+
+    rollup_years = refresh_rollups(cur, None if mode == 'full' or rebuild_rollups else years)
+
+    if mode == 'full':
+        _reset_other_watermarks(cur, source if fingerprint else None)
+    if source and fingerprint:
+        _set_watermark(cur, source, fingerprint, inserted + updated)
+    conn.commit()
+    cur.close()
+    analyze_partitions(conn, None if mode == 'full' else starts)
+    if DEDUP_ACROSS_RUNS:
+        dedup.save(replace=mode == 'full', removed=np.array(replaced, dtype=np.int64))
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        'mode': mode,
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged_or_duplicate': stats['loaded'] - inserted - updated,
+        'repeated_rows_dropped': dedup.repeated,
+        'already_loaded_dropped': dedup.already_loaded,
+        'partitions': len(starts),
+        'rollup_years': rollup_years,
+        'merge_seconds': round(elapsed, 3),
+    })
+    print(f"Dedup: {dedup.repeated} repeated rows and {dedup.already_loaded} rows loaded by earlier runs dropped")
+    print(f"Merge ({mode}): {inserted} inserted, {updated} updated, "
+          f"{stats['unchanged_or_duplicate']} unchanged or duplicate rows skipped across {len(starts)} partitions, "
+          f"rollups of {rollup_years} years refreshed")
+    return stats
@@ -0,0 +1,191 @@
+"""
+Typed intermediate artifact passed from transform to load.
+Chunks are written to a Parquet or Arrow IPC file with an explicit schema, so the load
+step gets integers back as integers and reads the file memory-mapped instead of re-parsing CSV.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from movies_schema import column_type
+
+# 'parquet' (compressed, default) or 'arrow' (Arrow IPC file, zero-copy reads)
+INTERMEDIATE_FORMAT = os.environ.get('ETL_INTERMEDIATE_FORMAT', 'parquet')
+
+# Also write a CSV copy of the transformed data for people who want to open it
+EXPORT_CSV = os.environ.get('ETL_EXPORT_CSV', '0') == '1'
+
+FORMAT_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# In-process runs keep the transformed data in memory up to this size, then spill to disk
+MEMORY_BUDGET_MB = float(os.environ.get('ETL_MEMORY_BUDGET_MB', '512'))
+
+
+def artifact_path(base_path, fmt=None):
+    """Intermediate file path for `base_path` (without extension) in the configured format"""
+    fmt = fmt or INTERMEDIATE_FORMAT
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown intermediate format '{fmt}', expected one of {list(FORMAT_EXTENSIONS)}")
+    return base_path + FORMAT_EXTENSIONS[fmt]
+
+
+def movies_arrow_schema(columns):
+    """Arrow schema for transformed movie columns, in the given order"""
+    return pa.schema([pa.field(col, pa.type_for_alias(column_type(col, 'arrow'))) for col in columns])
+
+
+def _to_record_batch(frame, schema):
+    """Convert a cleaned chunk to a record batch, casting counts back to integers"""
+    arrays = []
+    for field in schema:
+        values = frame[field.name]
+        if pa.types.is_integer(field.type):
+            values = pd.to_numeric(values, errors='coerce').round().astype('Int64')
+        array = pa.array(values, type=field.type, from_pandas=True)
+        # Arrow-backed string columns come back chunked (with no chunks when the frame is empty)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class IntermediateWriter:
+    """Incrementally write cleaned chunks to a Parquet or Arrow IPC file"""
+
+    def __init__(self, path, default_columns, csv_export_path=None):
+        self.path = path
+        # Schema used when the source yields no chunks at all
+        self.default_columns = list(default_columns)
+        self.csv_export_path = csv_export_path
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+        self._csv_header_written = False
+
+    def _open(self, schema):
+        self.schema = schema
+        # An explicit local sink keeps Windows drive paths from being parsed as URIs
+        self._sink = pa.OSFile(self.path, 'wb')
+        if self.path.endswith(FORMAT_EXTENSIONS['arrow']):
+            self._writer = pa.ipc.new_file(self._sink, schema)
+        else:
+            self._writer = pq.ParquetWriter(self._sink, schema)
+
+    def write(self, frame):
+        if self.schema is None:
+            self.schema = movies_arrow_schema(frame.columns)
+        batch = _to_record_batch(frame, self.schema)
+        self._write_batch(batch)
+        self.rows += batch.num_rows
+
+        if self.csv_export_path:
+            batch.to_pandas().to_csv(self.csv_export_path, mode='a' if self._csv_header_written else 'w',
+                                     header=not self._csv_header_written, index=False)
+            self._csv_header_written = True
+
+    def _write_batch(self, batch):
+        if self._writer is None:
+            self._open(self.schema)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        if self._writer is None:
+            self._open(self.schema or movies_arrow_schema(self.default_columns))
+        self._writer.close()
+        self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On failure only close what was opened, never create an empty artifact
+        if exc_type is None or self._writer is not None:
+            self.close()
+
+
+class InMemoryIntermediate(IntermediateWriter):
+    """
+    Intermediate handle for in-process runs: cleaned chunks stay in memory as Arrow
+    record batches and are handed straight to the load step. Once they exceed the
+    memory budget everything is spilled to `path` and written there from then on.
+    """
+
+    def __init__(self, path, default_columns, memory_budget_mb=None, csv_export_path=None):
+        super().__init__(path, default_columns, csv_export_path=csv_export_path)
+        self.memory_budget_bytes = int((memory_budget_mb or MEMORY_BUDGET_MB) * 1024 * 1024)
+        self.batches = []
+        self.nbytes = 0
+
+    @property
+    def spilled(self):
+        return self._writer is not None
+
+    def _write_batch(self, batch):
+        if self.spilled:
+            super()._write_batch(batch)
+            return
+        self.batches.append(batch)
+        self.nbytes += batch.nbytes
+        if self.nbytes > self.memory_budget_bytes:
+            print(f"In-memory intermediate exceeded {self.memory_budget_bytes / (1024 * 1024):.0f} MB, "
+                  f"spilling to {self.path}")
+            self._open(self.schema)
+            for held in self.batches:
+                self._writer.write_batch(held)
+            self.batches = []
+            self.nbytes = 0
+
+    def close(self):
+        if self.spilled:
+            super().close()
+        elif self.schema is None:
+            self.schema = movies_arrow_schema(self.default_columns)
+
+    def iter_batches(self, batch_size=65536):
+        if self.spilled:
+            yield from iter_intermediate_batches(self.path, batch_size)
+            return
+        table = pa.Table.from_batches(self.batches, schema=self.schema)
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield batch.to_pandas()
+
+    def __repr__(self):
+        if self.spilled:
+            return f"<intermediate {self.rows} rows spilled to {self.path}>"
+        return f"<in-memory intermediate {self.rows} rows, {self.nbytes / (1024 * 1024):.1f} MB>"
+
+
+def intermediate_row_count(path):
+    """Number of rows in an intermediate file (or in-memory handle), read from its metadata only"""
+    if isinstance(path, InMemoryIntermediate):
+        return path.rows
+    if path.endswith(FORMAT_EXTENSIONS['arrow']):
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def iter_intermediate_batches(path, batch_size=65536):
+    """
+    Yield the intermediate file as pandas frames of at most `batch_size` rows.
+    Arrow IPC files are memory-mapped and read zero-copy; Parquet is memory-mapped
+    and decoded one row group batch at a time. In-memory handles are sliced directly.
+    """
+    if isinstance(path, InMemoryIntermediate):
+        yield from path.iter_batches(batch_size)
+        return
+    if path.endswith(FORMAT_EXTENSIONS['arrow']):
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+            for batch in table.to_batches(max_chunksize=batch_size):
+                yield batch.to_pandas()
+        return
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield batch.to_pandas()
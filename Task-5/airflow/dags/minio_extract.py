@@ -0,0 +1,160 @@
+"""
+Extraction of source objects from MinIO (or any S3-compatible store) with boto3.
+Objects are downloaded as parallel byte-range parts straight to disk, verified against
+their ETag, and skipped entirely when the ETag matches the last successful download.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from etl_state import load_json_state, update_json_state
+
+MINIO_ENDPOINT = os.environ.get('MINIO_ENDPOINT', 'http://localhost:9000')
+MINIO_ACCESS_KEY = os.environ.get('MINIO_ACCESS_KEY', 'minioadmin')
+MINIO_SECRET_KEY = os.environ.get('MINIO_SECRET_KEY', 'minioadmin')
+MINIO_BUCKET = os.environ.get('MINIO_BUCKET', 'movies')
+MINIO_OBJECT = os.environ.get('MINIO_OBJECT', 'Movies.csv')
+# When set, every CSV object under this prefix is extracted instead of MINIO_OBJECT
+MINIO_PREFIX = os.environ.get('MINIO_PREFIX')
+
+# Size of each ranged GET and number of parts fetched concurrently
+DEFAULT_PART_SIZE = int(os.environ.get('ETL_DOWNLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+DEFAULT_WORKERS = int(os.environ.get('ETL_DOWNLOAD_WORKERS', '4'))
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+ETAG_STATE_FILE = 'minio_etags.json'
+
+
+def get_s3_client(endpoint_url=None):
+    """boto3 S3 client for the configured MinIO endpoint"""
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url or MINIO_ENDPOINT,
+        aws_access_key_id=MINIO_ACCESS_KEY,
+        aws_secret_access_key=MINIO_SECRET_KEY,
+        region_name='us-east-1',
+        config=Config(signature_version='s3v4', max_pool_connections=max(10, DEFAULT_WORKERS * 2)),
+    )
+
+
+def _upload_part_size(client, bucket, key, etag, default):
+    """
+    Part size used when a multipart object was uploaded, so the download parts line up
+    with the upload parts and the multipart ETag can be recomputed.
+    """
+    if '-' not in etag:
+        return default
+    try:
+        return client.head_object(Bucket=bucket, Key=key, PartNumber=1)['ContentLength']
+    except ClientError:
+        return default
+
+
+def _fetch_range(client, bucket, key, etag, dest_path, first, last):
+    """Download bytes [first, last] into the same offsets of dest_path; returns the part md5"""
+    response = client.get_object(Bucket=bucket, Key=key, Range=f"bytes={first}-{last}", IfMatch=etag)
+    digest = hashlib.md5()
+    with open(dest_path, 'r+b') as out:
+        out.seek(first)
+        for block in response['Body'].iter_chunks(READ_BLOCK_SIZE):
+            digest.update(block)
+            out.write(block)
+    return digest.digest()
+
+
+def _file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _verify_etag(path, etag, size, part_digests, parts_match_upload):
+    """Check a downloaded file's size and its single-part (md5) or multipart (md5-of-md5s-N) ETag"""
+    actual_size = os.path.getsize(path)
+    if actual_size != size:
+        raise ValueError(f"Size mismatch for {path}: expected {size} bytes, got {actual_size}")
+    if '-' not in etag:
+        actual = _file_md5(path)
+    elif parts_match_upload:
+        actual = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+    else:
+        print(f"Cannot recompute multipart ETag {etag}, verified size only")
+        return
+    if actual != etag:
+        raise ValueError(f"ETag mismatch for {path}: expected {etag}, got {actual}")
+
+
+def download_object(bucket, key, dest_path, client=None, part_size=None, max_workers=None, force=False):
+    """
+    Download s3://bucket/key to dest_path in parallel byte-range parts.
+    Skips the download when the object's ETag matches the last run and dest_path is intact.
+    Returns a dict with the path, ETag, size and whether bytes were transferred.
+    """
+    client = client or get_s3_client()
+    max_workers = max_workers or DEFAULT_WORKERS
+
+    head = client.head_object(Bucket=bucket, Key=key)
+    etag = head['ETag'].strip('"')
+    size = head['ContentLength']
+    result = {'path': dest_path, 'etag': etag, 'size': size, 'downloaded': False}
+
+    state = load_json_state(ETAG_STATE_FILE)
+    state_key = f"{bucket}/{key}"
+    if (not force and state.get(state_key, {}).get('etag') == etag
+            and os.path.exists(dest_path) and os.path.getsize(dest_path) == size):
+        print(f"s3://{state_key} unchanged (ETag {etag}), skipping download")
+        return result
+
+    part_size = _upload_part_size(client, bucket, key, etag, part_size or DEFAULT_PART_SIZE)
+    ranges = [(first, min(first + part_size, size) - 1) for first in range(0, size, part_size)]
+    parts_match_upload = '-' in etag and len(ranges) == int(etag.rsplit('-', 1)[1])
+
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    tmp_path = dest_path + '.part'
+    with open(tmp_path, 'wb') as f:
+        f.truncate(size)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            part_digests = list(pool.map(
+                lambda r: _fetch_range(client, bucket, key, etag, tmp_path, r[0], r[1]), ranges))
+        _verify_etag(tmp_path, etag, size, part_digests, parts_match_upload)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+    update_json_state(ETAG_STATE_FILE, {state_key: {'etag': etag, 'size': size, 'path': dest_path}})
+    print(f"Downloaded s3://{state_key} ({size} bytes, {len(ranges)} parts) to {dest_path}")
+    result['downloaded'] = True
+    return result
+
+
+def list_objects(bucket, prefix='', suffix='.csv', client=None):
+    """Key, ETag and size of every object under `prefix` ending in `suffix`, in lexical key order"""
+    client = client or get_s3_client()
+    objects = []
+    for page in client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend({'key': obj['Key'], 'etag': obj['ETag'].strip('"'), 'size': obj['Size']}
+                       for obj in page.get('Contents', []) if obj['Key'].endswith(suffix))
+    return sorted(objects, key=lambda obj: obj['key'])
+
+
+def list_object_keys(bucket, prefix='', suffix='.csv', client=None):
+    """Keys of every object under `prefix` ending in `suffix`, in lexical order"""
+    return [obj['key'] for obj in list_objects(bucket, prefix, suffix, client)]
+
+
+def download_objects(bucket, keys, dest_dir, client=None, force=False):
+    """Download several objects into dest_dir (keeping their key paths); returns one result per key"""
+    client = client or get_s3_client()
+    return [download_object(bucket, key, os.path.join(dest_dir, *key.split('/')), client=client, force=force)
+            for key in keys]
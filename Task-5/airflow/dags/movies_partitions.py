@@ -0,0 +1,194 @@
+"""
+Physical layout of the movies table.
+`movies` is range-partitioned on title_year, `ETL_PARTITION_YEARS` years per partition
+(default 1), with a default partition for undated rows (year 0). Full and partition loads
+build each partition's rows in a standalone table and swap it in with DETACH/ATTACH at the
+end of the load, so readers only wait for the swap and partitions outside the load are
+never touched. Indexes live on the parent and are built on a new partition when it is
+attached, after its rows are in.
+"""
+
+import os
+import re
+
+import pandas as pd
+from psycopg2 import sql
+
+from movies_schema import movies_table_ddl
+
+PARTITION_KEY = 'title_year'
+
+# Years covered by one partition; 10 gives one partition per decade
+PARTITION_YEARS = int(os.environ.get('ETL_PARTITION_YEARS', '1'))
+
+DEFAULT_PARTITION = 'movies_undated'
+
+MOVIES_PARTITIONED_DDL = movies_table_ddl(partition_key=PARTITION_KEY)
+
+# Rows without a year are loaded as 0; the check lets PostgreSQL skip scanning the
+# default partition whenever a year partition is created or attached
+DEFAULT_PARTITION_DDL = f"""
+CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF movies DEFAULT;
+ALTER TABLE {DEFAULT_PARTITION} ADD CONSTRAINT {DEFAULT_PARTITION}_bounds CHECK ({PARTITION_KEY} <= 0);
+"""
+
+
+def movies_relkind(cur):
+    """'p' for the partitioned movies table, 'r' for a plain (pre-partitioning) one, None if missing"""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('movies')")
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def ensure_partitioned_table(cur):
+    """Create the partitioned movies table and its default partition if they do not exist"""
+    if movies_relkind(cur) is None:
+        cur.execute(MOVIES_PARTITIONED_DDL)
+        cur.execute(DEFAULT_PARTITION_DDL)
+
+
+def partition_start(year):
+    """First year of the partition holding `year`, or None for the default partition"""
+    return None if pd.isna(year) or year <= 0 else int(year) - int(year) % PARTITION_YEARS
+
+
+def partition_name(start):
+    return DEFAULT_PARTITION if start is None else f"movies_{start}"
+
+
+def partition_years(start):
+    """Years a partition can hold (the default partition holds undated rows, year 0)"""
+    return [0] if start is None else list(range(start, start + PARTITION_YEARS))
+
+
+def _bounds(start):
+    """FOR VALUES clause and the equivalent CHECK expression of a partition"""
+    if start is None:
+        return sql.SQL("DEFAULT"), sql.SQL("{} <= 0").format(sql.Identifier(PARTITION_KEY))
+    return (sql.SQL("FOR VALUES FROM ({}) TO ({})").format(sql.Literal(start), sql.Literal(start + PARTITION_YEARS)),
+            sql.SQL("{key} >= {start} AND {key} < {end}").format(
+                key=sql.Identifier(PARTITION_KEY), start=sql.Literal(start),
+                end=sql.Literal(start + PARTITION_YEARS)))
+
+
+def partition_starts(years):
+    """Sorted partition starts covering a sequence of years (None, the default partition, last)"""
+    starts = {partition_start(year) for year in pd.unique(pd.Series(years, dtype='float64'))}
+    return sorted(starts - {None}) + ([None] if None in starts else [])
+
+
+def staged_partition_starts(cur, staging='movies_staging'):
+    """Partition starts of the rows in the staging table"""
+    cur.execute(sql.SQL("SELECT DISTINCT {} FROM {}").format(sql.Identifier(PARTITION_KEY), sql.Identifier(staging)))
+    return partition_starts([row[0] for row in cur.fetchall()])
+
+
+def attached_partition_starts(cur):
+    """Partition starts of the partitions currently attached to movies"""
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'movies'::regclass
+    """)
+    names = [row[0] for row in cur.fetchall()]
+    return [None if name == DEFAULT_PARTITION else int(name.rsplit('_', 1)[1]) for name in names]
+
+
+def attached_partition_bounds(cur):
+    """(from, to) title_year range of every attached year partition, read from the catalog"""
+    cur.execute("""
+        SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'movies'::regclass
+    """)
+    bounds = []
+    for (expr,) in cur.fetchall():
+        match = re.match(r"FOR VALUES FROM \((-?\d+)\) TO \((-?\d+)\)", expr)
+        if match:
+            bounds.append((int(match.group(1)), int(match.group(2))))
+    return sorted(bounds)
+
+
+def check_partition_width(cur):
+    """
+    Raise if the existing year partitions are not PARTITION_YEARS wide. Merges and
+    partition swaps create partitions of the configured width next to the existing ones,
+    which would overlap them; only a full load can change the layout.
+    """
+    widths = {end - start for start, end in attached_partition_bounds(cur)}
+    if widths and widths != {PARTITION_YEARS}:
+        raise ValueError(
+            f"movies is partitioned by {'/'.join(map(str, sorted(widths)))} year(s) but ETL_PARTITION_YEARS is "
+            f"{PARTITION_YEARS}; set ETL_PARTITION_YEARS back or run a full load (ETL_LOAD_MODE=full) to re-partition")
+
+
+def ensure_partitions(cur, starts):
+    """Create the (empty) year partitions a merge or append is about to write into"""
+    check_partition_width(cur)
+    for start in starts:
+        if start is not None:
+            cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF movies {}").format(
+                sql.Identifier(partition_name(start)), _bounds(start)[0]))
+
+
+def build_partition(cur, start, select):
+    """
+    Fill a standalone `<partition>_load` table, shaped like movies, with one partition's rows.
+    `select(bounds)` returns the column list and query for the rows matching a bounds
+    condition. The bounds check is added as a constraint so ATTACH can skip validating the
+    rows. Returns the number of rows written.
+    """
+    load_table = sql.Identifier(partition_name(start) + '_load')
+    check = _bounds(start)[1]
+    cur.execute(sql.SQL("CREATE TABLE {} (LIKE movies INCLUDING DEFAULTS)").format(load_table))
+    cur.execute(sql.SQL("INSERT INTO {} {}").format(load_table, select(check)))
+    rows = cur.rowcount
+    cur.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} CHECK ({})").format(
+        load_table, sql.Identifier(partition_name(start) + '_bounds'), check))
+    return rows
+
+
+def drop_partition(cur, start, collect_hashes=False):
+    """
+    Detach and drop one partition if it exists.
+    Returns the row hashes it held when `collect_hashes` is set, else an empty list.
+    """
+    name = sql.Identifier(partition_name(start))
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (partition_name(start),))
+    if not cur.fetchone()[0]:
+        return []
+    cur.execute(sql.SQL("ALTER TABLE movies DETACH PARTITION {}").format(name))
+    hashes = []
+    if collect_hashes:
+        cur.execute(sql.SQL("SELECT row_hash FROM {} WHERE row_hash IS NOT NULL").format(name))
+        hashes = [row[0] for row in cur.fetchall()]
+    cur.execute(sql.SQL("DROP TABLE {}").format(name))
+    return hashes
+
+
+def swap_in_partition(cur, start, collect_hashes=False):
+    """
+    Replace a partition with its `_load` table built by build_partition: detach and drop the
+    old one, rename and attach the new one (which builds its indexes).
+    Returns the row hashes the old partition held (see drop_partition).
+    """
+    hashes = drop_partition(cur, start, collect_hashes)
+    name = partition_name(start)
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(name + '_load'), sql.Identifier(name)))
+    cur.execute(sql.SQL("ALTER TABLE movies ATTACH PARTITION {} {}").format(sql.Identifier(name), _bounds(start)[0]))
+    return hashes
+
+
+def analyze_partitions(conn, starts=None):
+    """
+    Refresh planner statistics after a committed load: the partitions in `starts`, or the
+    whole table (parent and every partition) when `starts` is None.
+    """
+    cur = conn.cursor()
+    try:
+        if starts is None:
+            cur.execute("ANALYZE movies")
+        else:
+            for start in starts:
+                cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(partition_name(start))))
+    finally:
+        cur.close()
+    conn.commit()
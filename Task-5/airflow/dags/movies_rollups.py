@@ -0,0 +1,146 @@
+"""
+Rollup tables for the movies dashboard.
+The load step keeps per-year aggregates (counts, score, budget and gross sums), a per-year
+score histogram and the top movies of every year next to `movies`. A load recomputes only
+the years it touched, inside its own transaction, and each year's rows come from that
+year's partition alone, so readers get a few small rows instead of scanning the table.
+"""
+
+import os
+
+from psycopg2 import sql
+
+# Movies kept per year in movies_top_by_year; the dashboard's top 5 is read from it
+ROLLUP_TOP_N = max(int(os.environ.get('ETL_ROLLUP_TOP_N', '10')), 5)
+
+ROLLUP_TABLES = ['movies_year_rollup', 'movies_score_histogram', 'movies_top_by_year']
+
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS movies_year_rollup (
+    title_year INTEGER PRIMARY KEY,
+    movies BIGINT NOT NULL,
+    scored_movies BIGINT NOT NULL,
+    score_sum NUMERIC,
+    min_score DECIMAL(3,1),
+    max_score DECIMAL(3,1),
+    budget_sum NUMERIC,
+    gross_sum NUMERIC,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS movies_score_histogram (
+    title_year INTEGER,
+    score_bucket INTEGER,
+    movies BIGINT NOT NULL,
+    PRIMARY KEY (title_year, score_bucket)
+);
+CREATE TABLE IF NOT EXISTS movies_top_by_year (
+    title_year INTEGER,
+    rank INTEGER,
+    id INTEGER NOT NULL,
+    movie_title VARCHAR(255),
+    imdb_score DECIMAL(3,1),
+    budget BIGINT,
+    PRIMARY KEY (title_year, rank)
+);
+CREATE INDEX IF NOT EXISTS movies_top_by_year_score_idx ON movies_top_by_year (imdb_score DESC, id DESC);
+"""
+
+# Each query rebuilds one rollup for the years matching {years}
+ROLLUP_QUERIES = [
+    """
+    INSERT INTO movies_year_rollup
+        (title_year, movies, scored_movies, score_sum, min_score, max_score, budget_sum, gross_sum)
+    SELECT title_year, count(*), count(imdb_score), sum(imdb_score), min(imdb_score), max(imdb_score),
+           sum(budget), sum(gross)
+    FROM movies
+    WHERE {years}
+    GROUP BY title_year
+    """,
+    # Buckets are whole score points: 7 holds 7.0-7.9, 10 holds 10.0
+    """
+    INSERT INTO movies_score_histogram (title_year, score_bucket, movies)
+    SELECT title_year, floor(imdb_score)::INTEGER, count(*)
+    FROM movies
+    WHERE {years} AND imdb_score IS NOT NULL
+    GROUP BY 1, 2
+    """,
+    # Same order as the dashboard's keyset pages (imdb_score DESC, id DESC)
+    """
+    INSERT INTO movies_top_by_year (title_year, rank, id, movie_title, imdb_score, budget)
+    SELECT title_year, rank, id, movie_title, imdb_score, budget
+    FROM (
+        SELECT title_year, id, movie_title, imdb_score, budget,
+               row_number() OVER (PARTITION BY title_year ORDER BY imdb_score DESC, id DESC) AS rank
+        FROM movies
+        WHERE {years}
+    ) ranked
+    WHERE rank <= %(top_n)s
+    """,
+]
+
+
+def ensure_rollup_tables(cur):
+    """Create the rollup tables; returns True if they did not exist yet (so need a full refresh)"""
+    cur.execute("SELECT to_regclass('movies_year_rollup') IS NULL")
+    created = cur.fetchone()[0]
+    cur.execute(ROLLUP_DDL)
+    return created
+
+
+def refresh_rollups(cur, years=None):
+    """
+    Recompute the rollup rows of `years` (every year when None) from `movies`, in the
+    caller's transaction. Years left without movies lose their rollup rows.
+    Returns the number of years that now have rollup rows among those refreshed.
+    """
+    params = {'top_n': ROLLUP_TOP_N}
+    if years is None:
+        cur.execute(sql.SQL("TRUNCATE TABLE {}").format(
+            sql.SQL(', ').join(sql.Identifier(table) for table in ROLLUP_TABLES)))
+        condition = sql.SQL("TRUE")
+    else:
+        params['years'] = sorted({int(year) for year in years})
+        if not params['years']:
+            return 0
+        # A literal array, so the planner prunes movies to the touched partitions
+        condition = sql.SQL("title_year = ANY(%(years)s)")
+        for table in ROLLUP_TABLES:
+            cur.execute(sql.SQL("DELETE FROM {} WHERE {}").format(sql.Identifier(table), condition), params)
+
+    for query in ROLLUP_QUERIES:
+        cur.execute(sql.SQL(query).format(years=condition), params)
+    if years is None:
+        cur.execute("SELECT count(*) FROM movies_year_rollup")
+    else:
+        cur.execute("SELECT count(*) FROM movies_year_rollup WHERE title_year = ANY(%(years)s)", params)
+    return cur.fetchone()[0]
+
+
+def _number(value):
+    """JSON-friendly int/float for a NUMERIC aggregate"""
+    if value is None:
+        return None
+    return int(value) if value == int(value) else float(value)
+
+
+def read_year_rollups(cur):
+    """Per-year counts, score and money totals and score histogram, oldest year first"""
+    cur.execute("SELECT title_year, score_bucket, movies FROM movies_score_histogram")
+    histograms = {}
+    for year, bucket, movies in cur.fetchall():
+        histograms.setdefault(year, {})[str(bucket)] = movies
+    cur.execute("""
+        SELECT title_year, movies, scored_movies, score_sum, min_score, max_score, budget_sum, gross_sum
+        FROM movies_year_rollup
+        ORDER BY title_year
+    """)
+    return [{
+        'title_year': year,
+        'movies': movies,
+        'avg_score': round(float(score_sum) / scored, 2) if scored else None,
+        'min_score': _number(min_score),
+        'max_score': _number(max_score),
+        'budget_sum': _number(budget_sum),
+        'gross_sum': _number(gross_sum),
+        'score_histogram': histograms.get(year, {}),
+    } for year, movies, scored, score_sum, min_score, max_score, budget_sum, gross_sum in cur.fetchall()]
@@ -0,0 +1,159 @@
+"""
+Schema registry for the movies feed.
+One list of columns drives the typed CSV parse (usecols/dtype), the case-insensitive
+mapping from source headers to table columns, the Arrow intermediate schema and the
+`CREATE TABLE movies` DDL and insert column list.
+"""
+
+import io
+from collections import namedtuple
+
+import pandas as pd
+
+Column = namedtuple('Column', ['name', 'kind'])
+
+TITLE_MAX_LENGTH = 255
+
+# Decodes any byte; used for the rest of a file once its sniffed encoding fails
+FALLBACK_ENCODING = 'latin-1'
+
+# Types per column kind: pandas dtype used when parsing, SQL type, Arrow type alias.
+# Counts are parsed as float64 (NaN for missing): the C parser converts those natively,
+# while nullable Int64 goes through Python objects and parses about twice as slowly.
+# The Arrow writer and the loader cast them to integers once cleaned.
+KIND_TYPES = {
+    'text': {'pandas': 'str', 'sql': f'VARCHAR({TITLE_MAX_LENGTH})', 'arrow': 'string'},
+    'int': {'pandas': 'float64', 'sql': 'INTEGER', 'arrow': 'int64'},
+    'bigint': {'pandas': 'float64', 'sql': 'BIGINT', 'arrow': 'int64'},
+    'score': {'pandas': 'float64', 'sql': 'DECIMAL(3,1)', 'arrow': 'float64'},
+}
+
+# Table columns in insert order; source headers are matched case-insensitively
+MOVIES_SCHEMA = [
+    Column('movie_title', 'text'),
+    Column('num_critic_for_reviews', 'int'),
+    Column('duration', 'int'),
+    Column('DIRECTOR_facebook_likes', 'int'),
+    Column('actor_3_facebook_likes', 'int'),
+    Column('ACTOR_1_facebook_likes', 'int'),
+    Column('gross', 'bigint'),
+    Column('num_voted_users', 'int'),
+    Column('Cast_Total_facebook_likes', 'int'),
+    Column('facenumber_in_poster', 'int'),
+    Column('num_user_for_reviews', 'int'),
+    Column('budget', 'bigint'),
+    Column('title_year', 'int'),
+    Column('ACTOR_2_facebook_likes', 'int'),
+    Column('imdb_score', 'score'),
+]
+
+MOVIES_COLUMNS = [col.name for col in MOVIES_SCHEMA]
+INTEGER_COLUMNS = [col.name for col in MOVIES_SCHEMA if col.kind in ('int', 'bigint')]
+BIGINT_COLUMNS = [col.name for col in MOVIES_SCHEMA if col.kind == 'bigint']
+
+
+def column_type(name, system):
+    """'pandas', 'sql' or 'arrow' type of a schema column"""
+    kind = next(col.kind for col in MOVIES_SCHEMA if col.name == name)
+    return KIND_TYPES[kind][system]
+
+
+def movies_table_ddl(table='movies', partition_key=None):
+    """
+    CREATE TABLE statement generated from the schema. With `partition_key` the table is
+    range-partitioned on that column, which is then NOT NULL (0 when missing) and part of
+    the primary key, as PostgreSQL requires.
+    """
+    columns = ',\n'.join(
+        f"    {col.name} {KIND_TYPES[col.kind]['sql']}" + (" NOT NULL DEFAULT 0" if col.name == partition_key else "")
+        for col in MOVIES_SCHEMA
+    )
+    if partition_key is None:
+        return (f"CREATE TABLE IF NOT EXISTS {table} (\n    id SERIAL PRIMARY KEY,\n{columns},\n"
+                f"    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP\n);\n")
+    return (f"CREATE TABLE IF NOT EXISTS {table} (\n    id SERIAL,\n{columns},\n"
+            f"    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,\n    PRIMARY KEY (id, {partition_key})\n"
+            f") PARTITION BY RANGE ({partition_key});\n")
+
+
+def resolve_columns(header):
+    """
+    Map source header names to schema names, ignoring case. The first match wins, so a
+    repeated header (pandas' `title_year.1`) and columns outside the schema are dropped.
+    """
+    wanted = {col.name.lower(): col.name for col in MOVIES_SCHEMA}
+    mapping = {}
+    for source_name in header:
+        schema_name = wanted.get(str(source_name).strip().lower())
+        if schema_name is not None and schema_name not in mapping.values():
+            mapping[source_name] = schema_name
+    return mapping
+
+
+def read_options(mapping, typed=True):
+    """read_csv keyword arguments selecting and typing the schema columns"""
+    if typed:
+        dtype = {source: column_type(name, 'pandas') for source, name in mapping.items()}
+    else:
+        # Lenient parse: only the title is typed, numbers are coerced after parsing
+        dtype = {source: 'str' for source, name in mapping.items() if name == 'movie_title'}
+    return {'usecols': list(mapping), 'dtype': dtype}
+
+
+def coerce_to_schema(frame):
+    """Rename a frame's columns to the schema and cast them, dropping everything else"""
+    mapping = resolve_columns(frame.columns)
+    frame = frame.loc[:, ~frame.columns.duplicated()][list(mapping)].rename(columns=mapping)
+    for name in frame.columns:
+        dtype = column_type(name, 'pandas')
+        if dtype == 'str':
+            frame[name] = frame[name].astype('str')
+        else:
+            frame[name] = pd.to_numeric(frame[name], errors='coerce').astype(dtype)
+    return frame
+
+
+def _rewind(source):
+    if isinstance(source, io.IOBase):
+        source.seek(0)
+
+
+def iter_movies_csv(source, encoding, chunksize):
+    """
+    Yield chunks of a movies CSV (path or seekable binary buffer) with schema column names,
+    parsed straight into the schema dtypes. A chunk holding a value that does not fit its
+    type (e.g. '"475"' in a count column) switches the rest of the file to a lenient parse,
+    and a byte the sniffed encoding cannot decode (past the sniffed prefix) switches it to
+    Latin-1; either way the rest is re-read from that chunk on. The cleaning step then
+    coerces the leniently parsed columns.
+    """
+    mapping = None
+    typed = True
+    rows_done = 0
+    while True:
+        try:
+            _rewind(source)
+            if mapping is None:
+                mapping = resolve_columns(pd.read_csv(source, encoding=encoding, nrows=0).columns)
+                _rewind(source)
+            reader = pd.read_csv(source, encoding=encoding, chunksize=chunksize,
+                                 skiprows=range(1, rows_done + 1) if rows_done else None,
+                                 **read_options(mapping, typed=typed))
+            with reader:
+                for chunk in reader:
+                    yield chunk.rename(columns=mapping)
+                    rows_done += len(chunk)
+            return
+        except UnicodeDecodeError as e:
+            # Latin-1 maps every byte to a character, so it cannot fail here
+            if encoding == FALLBACK_ENCODING:
+                raise
+            print(f"Decoding as {encoding} failed after {rows_done} rows ({e.reason}), "
+                  f"reading the rest as {FALLBACK_ENCODING}")
+            encoding = FALLBACK_ENCODING
+        except (ValueError, TypeError) as e:
+            if not typed:
+                raise
+            print(f"Typed parse failed after {rows_done} rows ({str(e).splitlines()[0]}), "
+                  f"reading the rest with lenient types")
+            typed = False
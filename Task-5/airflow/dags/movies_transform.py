@@ -0,0 +1,137 @@
+"""
+Chunked transform for the movies feed.
+The CSV is read `chunksize` rows at a time and each cleaned chunk is appended to a typed
+Parquet/Arrow artifact, so peak memory depends on the chunk size rather than the file size.
+"""
+
+import os
+import re
+import time
+
+import pandas as pd
+
+from etl_metrics import peak_rss_mb
+from intermediate import IntermediateWriter
+from movies_schema import BIGINT_COLUMNS, INTEGER_COLUMNS, MOVIES_COLUMNS, TITLE_MAX_LENGTH, iter_movies_csv
+from source_encoding import sniff_encoding
+from validation import ValidationReport, validate_chunk
+
+# Rows parsed and cleaned per chunk
+DEFAULT_CHUNK_SIZE = int(os.environ.get('ETL_TRANSFORM_CHUNK_SIZE', '100000'))
+
+# Trailing '?' + mis-decoded byte left on titles by the source export
+# ('?\xff' when read as latin-1, '?\ufffd' when read as utf-8 with replacement)
+MOJIBAKE_TITLE_SUFFIX = re.compile(r'(?:\?[\xff\ufffd])+\s*$')
+
+# Count columns: missing values are filled with 0
+NUMERIC_COLUMNS = INTEGER_COLUMNS
+
+INT_MAX = 2 ** 31 - 1
+BIGINT_MAX = 2 ** 63 - 1
+
+# Gross above this multiple of the budget is flagged as suspicious (not rejected)
+GROSS_BUDGET_MAX_RATIO = float(os.environ.get('ETL_GROSS_BUDGET_MAX_RATIO', '100'))
+
+# Data quality rules checked on every raw chunk before cleaning (see validation.py)
+MOVIES_RULES = [
+    {'column': 'movie_title', 'check': 'not_null'},
+    {'column': 'movie_title', 'check': 'max_length', 'value': TITLE_MAX_LENGTH},
+    {'column': 'imdb_score', 'check': 'not_null'},
+    {'column': 'imdb_score', 'check': 'numeric'},
+    {'column': 'imdb_score', 'check': 'range', 'min': 0, 'max': 10},
+    {'column': 'title_year', 'check': 'range', 'min': 1870, 'max': 2100},
+    # Junk in a count column is loaded as 0, so only count it
+    *[{'column': col, 'check': 'numeric', 'severity': 'warn'} for col in NUMERIC_COLUMNS],
+    *[{'column': col, 'check': 'range', 'min': 0, 'max': BIGINT_MAX if col in BIGINT_COLUMNS else INT_MAX}
+      for col in NUMERIC_COLUMNS if col != 'title_year'],
+    {'name': 'gross_within_budget_ratio', 'check': 'expression', 'columns': ['gross', 'budget'],
+     'expr': f'gross <= budget * {GROSS_BUDGET_MAX_RATIO}', 'when': 'budget > 0', 'severity': 'warn'},
+    # Repeated title/year pairs are merged (last one wins) by the load step, only count them
+    {'name': 'title_year_unique', 'check': 'unique', 'columns': ['movie_title', 'title_year'],
+     'severity': 'warn'},
+]
+
+
+def normalize_titles(data):
+    """Strip the mojibake suffix and surrounding whitespace from titles"""
+    data['movie_title'] = data['movie_title'].str.replace(MOJIBAKE_TITLE_SUFFIX, '', regex=True).str.strip()
+    return data
+
+
+def clean_movies_chunk(data):
+    """
+    Apply the transform cleaning rules to one chunk of raw rows.
+    Rows are not filtered here; transform_chunk drops rows failing MOVIES_RULES first.
+    """
+    # Chunks read after a failed typed parse still hold text in the numeric columns
+    data['imdb_score'] = pd.to_numeric(data['imdb_score'], errors='coerce')
+
+    for col in NUMERIC_COLUMNS:
+        if col in data.columns:
+            data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0)
+
+    return data[[col for col in MOVIES_COLUMNS if col in data.columns]]
+
+
+def transform_chunk(raw):
+    """
+    Validate one raw chunk against MOVIES_RULES and clean the rows that pass.
+    Returns (cleaned, rejected, counts) for a ValidationReport.
+    """
+    # Titles are compared after removing the export's mojibake suffix
+    raw = normalize_titles(raw.copy())
+    valid, rejected, counts = validate_chunk(raw, MOVIES_RULES)
+    return clean_movies_chunk(valid.copy()), rejected, counts
+
+
+def iter_transformed_chunks(input_file, encoding, chunksize=None):
+    """Yield (raw_row_count, cleaned_chunk, rejected_rows, rule_counts) for a CSV file"""
+    # Chunks come out typed and named by the schema registry (see movies_schema.py)
+    for chunk in iter_movies_csv(input_file, encoding, chunksize or DEFAULT_CHUNK_SIZE):
+        yield (len(chunk),) + transform_chunk(chunk)
+
+
+def transform_movies_csv(input_file, output_file, chunksize=None, source_key=None, csv_export_file=None,
+                         writer=None, quarantine_file=None):
+    """
+    Stream `input_file` through the validation and cleaning rules into the intermediate
+    `output_file` (.parquet or .arrow) chunk by chunk, optionally exporting a CSV copy as well.
+    Rejected rows go to `quarantine_file` with their reasons.
+    A `writer` (e.g. an InMemoryIntermediate) replaces the default file writer.
+    Returns throughput, validation and peak memory metrics for the run.
+    """
+    start = time.perf_counter()
+    encoding = sniff_encoding(input_file, source_key=source_key)
+    report = ValidationReport(MOVIES_RULES, quarantine_path=quarantine_file)
+    rows_in = 0
+    rows_out = 0
+    chunks = 0
+    if writer is None:
+        writer = IntermediateWriter(output_file, MOVIES_COLUMNS, csv_export_path=csv_export_file)
+    with writer:
+        for raw_rows, cleaned, rejected, counts in iter_transformed_chunks(input_file, encoding, chunksize):
+            report.add(raw_rows, rejected, counts)
+            report.check_unique(cleaned)
+            writer.write(cleaned)
+            rows_in += raw_rows
+            rows_out += len(cleaned)
+            chunks += 1
+
+    elapsed = time.perf_counter() - start
+    return transform_metrics(encoding, chunks, rows_in, rows_out, elapsed, report.finish())
+
+
+def transform_metrics(encoding, chunks, rows_in, rows_out, elapsed, validation):
+    """Metrics dict shared by the serial and parallel transforms"""
+    return {
+        'encoding': encoding,
+        'chunks': chunks,
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'rows_rejected': validation['rows_rejected'],
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows_in / elapsed, 1) if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        # The full report is in the state directory; XCom only carries the failing rules
+        'rule_failures': {name: rule['failures'] for name, rule in validation['rules'].items() if rule['failures']},
+    }
@@ -0,0 +1,133 @@
+"""
+Multi-core transform for large or many source CSV files.
+Each input is split into byte ranges that end on line boundaries, the ranges are cleaned
+in a ProcessPoolExecutor, and the per-range outputs are merged into one intermediate
+artifact in (input, range) order, so the result does not depend on worker scheduling.
+"""
+
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from intermediate import IntermediateWriter, iter_intermediate_batches
+from movies_schema import MOVIES_COLUMNS, iter_movies_csv
+from movies_transform import DEFAULT_CHUNK_SIZE, MOVIES_RULES, transform_chunk, transform_metrics
+from source_encoding import sniff_encoding
+from validation import REASON_COLUMN, ValidationReport
+
+# Worker processes for the transform; 1 keeps the single-process chunked transform
+TRANSFORM_WORKERS = int(os.environ.get('ETL_TRANSFORM_WORKERS', '1'))
+
+# Target size of one byte-range partition
+PARTITION_BYTES = int(os.environ.get('ETL_PARTITION_BYTES', str(64 * 1024 * 1024)))
+
+
+def plan_partitions(path, partition_bytes=None):
+    """
+    Split a CSV file into byte ranges of about `partition_bytes`, each ending just after
+    a newline. Returns the header line and the list of (start, end) offsets.
+    Assumes quoted fields never contain newlines, which holds for the movies feed.
+    """
+    partition_bytes = partition_bytes or PARTITION_BYTES
+    ranges = []
+    with open(path, 'rb') as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        start = len(header)
+        while start < size:
+            target = start + partition_bytes
+            if target >= size:
+                end = size
+            else:
+                # Finish the line the target offset falls in
+                f.seek(target)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def _transform_partition(task):
+    """
+    Worker: parse one byte range (with the file header), validate and clean it and write
+    a part file. Returns the row counts, the rejected rows and the rule failure counts.
+    """
+    path, start, end, header, encoding, part_path = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    raw_rows = 0
+    cleaned_rows = 0
+    rejected_frames = []
+    counts = {}
+    with IntermediateWriter(part_path, MOVIES_COLUMNS) as writer:
+        for raw in iter_movies_csv(io.BytesIO(header + data), encoding, DEFAULT_CHUNK_SIZE):
+            cleaned, rejected, chunk_counts = transform_chunk(raw)
+            writer.write(cleaned)
+            raw_rows += len(raw)
+            cleaned_rows += len(cleaned)
+            rejected_frames.append(rejected)
+            for name, failures in chunk_counts.items():
+                counts[name] = counts.get(name, 0) + failures
+    if not rejected_frames:
+        # A range of only blank lines parses to no chunks
+        return raw_rows, cleaned_rows, pd.DataFrame(columns=MOVIES_COLUMNS + [REASON_COLUMN]), counts
+    return raw_rows, cleaned_rows, pd.concat(rejected_frames), counts
+
+
+def transform_movies_parallel(input_files, output_file, workers=None, partition_bytes=None,
+                              source_keys=None, csv_export_file=None, writer=None, quarantine_file=None):
+    """
+    Transform one or more CSV files into the intermediate `output_file` using `workers`
+    processes. Partitions are cleaned into temporary Arrow part files next to the output
+    and merged in input order, together with their quarantined rows.
+    Returns the same metrics as transform_movies_csv. Raises ValueError without input files.
+    """
+    if not input_files:
+        raise ValueError("transform_movies_parallel needs at least one input file")
+    start = time.perf_counter()
+    workers = workers or TRANSFORM_WORKERS
+    parts_dir = output_file + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+
+    tasks = []
+    encodings = []
+    for i, path in enumerate(input_files):
+        encoding = sniff_encoding(path, source_key=source_keys[i] if source_keys else None)
+        encodings.append(encoding)
+        header, ranges = plan_partitions(path, partition_bytes)
+        for j, (first, last) in enumerate(ranges):
+            part_path = os.path.join(parts_dir, f"part-{i:05d}-{j:05d}.arrow")
+            tasks.append((path, first, last, header, encoding, part_path))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_transform_partition, tasks))
+
+        # Quarantine and uniqueness are order dependent, so they run here in partition order
+        report = ValidationReport(MOVIES_RULES, quarantine_path=quarantine_file)
+        if writer is None:
+            writer = IntermediateWriter(output_file, MOVIES_COLUMNS, csv_export_path=csv_export_file)
+        with writer:
+            for task, (raw_rows, _, rejected, counts) in zip(tasks, results):
+                report.add(raw_rows, rejected, counts)
+                for frame in iter_intermediate_batches(task[-1]):
+                    report.check_unique(frame)
+                    writer.write(frame)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Parallel transform: {len(input_files)} files, {len(tasks)} partitions, {workers} workers, "
+          f"{elapsed:.2f}s")
+    metrics = transform_metrics(
+        encodings[0] if len(set(encodings)) == 1 else ','.join(encodings), len(tasks),
+        sum(result[0] for result in results), sum(result[1] for result in results), elapsed, report.finish(),
+    )
+    metrics['workers'] = workers
+    return metrics
@@ -0,0 +1,210 @@
+"""
+Pipelined execution of the movies ETL.
+An extract thread streams raw CSV chunks, transform worker threads clean them with the
+same rules as transform_data, and the calling thread COPYs them into the staging table
+as they arrive. Bounded queues between the stages provide backpressure, so wall-clock
+time approaches the slowest stage instead of the sum of all three.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from etl_metrics import peak_rss_mb
+from incremental_load import load_movies
+from movies_loader import prepare_movies_frame
+from movies_schema import iter_movies_csv
+from movies_transform import DEFAULT_CHUNK_SIZE, MOVIES_RULES, transform_chunk
+from source_encoding import sniff_encoding
+from validation import ValidationReport
+
+DEFAULT_TRANSFORM_WORKERS = int(os.environ.get('ETL_PIPELINE_WORKERS', '2'))
+
+# Chunks allowed to wait between two stages before the producer blocks
+DEFAULT_QUEUE_SIZE = int(os.environ.get('ETL_PIPELINE_QUEUE_SIZE', '4'))
+
+# How often blocked threads re-check whether another stage has failed
+POLL_SECONDS = 0.5
+
+_DONE = object()
+
+
+class _StageFailed(Exception):
+    """Raised inside a stage when another stage has already failed"""
+
+
+class _Pipeline:
+    """Queues, stop flag, validation report and per-stage busy time shared by the pipeline threads"""
+
+    def __init__(self, queue_size, report):
+        self.report = report
+        self.raw = queue.Queue(maxsize=queue_size)
+        self.cleaned = queue.Queue(maxsize=queue_size)
+        self.stop = threading.Event()
+        self.error = None
+        self.busy = {'extract': 0.0, 'transform': 0.0, 'load': 0.0}
+        # Time the loader spent waiting on transform workers rather than loading
+        self.load_wait = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.chunks = 0
+        self._lock = threading.Lock()
+
+    def fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.stop.set()
+
+    def add_busy(self, stage, seconds):
+        with self._lock:
+            self.busy[stage] += seconds
+
+    def put(self, q, item):
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+        raise _StageFailed()
+
+    def get(self, q):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                pass
+        raise _StageFailed()
+
+
+def _extract(pipeline, source, encoding, chunksize, workers):
+    """Read raw chunks into the first queue, then one end marker per transform worker"""
+    try:
+        reader = iter_movies_csv(source, encoding, chunksize)
+        try:
+            seq = 0
+            while True:
+                start = time.perf_counter()
+                chunk = next(reader, None)
+                pipeline.add_busy('extract', time.perf_counter() - start)
+                if chunk is None:
+                    break
+                pipeline.put(pipeline.raw, (seq, chunk))
+                seq += 1
+        finally:
+            reader.close()
+        for _ in range(workers):
+            pipeline.put(pipeline.raw, _DONE)
+    except _StageFailed:
+        pass
+    except Exception as e:
+        print(f"Error in pipelined extract: {e}")
+        pipeline.fail(e)
+
+
+def _transform(pipeline):
+    """Validate and clean raw chunks and align them with the movies insert columns"""
+    try:
+        while True:
+            item = pipeline.get(pipeline.raw)
+            if item is _DONE:
+                pipeline.put(pipeline.cleaned, _DONE)
+                return
+            seq, chunk = item
+            start = time.perf_counter()
+            cleaned, rejected, counts = transform_chunk(chunk)
+            frame = prepare_movies_frame(cleaned)
+            pipeline.add_busy('transform', time.perf_counter() - start)
+            pipeline.put(pipeline.cleaned, (seq, len(chunk), frame, rejected, counts))
+    except _StageFailed:
+        pass
+    except Exception as e:
+        print(f"Error in pipelined transform: {e}")
+        pipeline.fail(e)
+
+
+def _ordered_frames(pipeline, workers):
+    """
+    Yield cleaned frames in source order as workers finish them. Staging order decides
+    which duplicate row wins the merge, so it must not depend on thread scheduling
+    (the same goes for the quarantine file and the uniqueness check).
+    """
+    pending = {}
+    next_seq = 0
+    finished = 0
+    while finished < workers:
+        start = time.perf_counter()
+        item = pipeline.get(pipeline.cleaned)
+        pipeline.load_wait += time.perf_counter() - start
+        if item is _DONE:
+            finished += 1
+            continue
+        seq = item[0]
+        pending[seq] = item[1:]
+        while next_seq in pending:
+            raw_rows, frame, rejected, counts = pending.pop(next_seq)
+            pipeline.report.add(raw_rows, rejected, counts)
+            pipeline.report.check_unique(frame)
+            pipeline.rows_in += raw_rows
+            pipeline.rows_out += len(frame)
+            pipeline.chunks += 1
+            next_seq += 1
+            yield frame
+
+
+def run_pipelined(conn, source, chunksize=None, workers=None, queue_size=None,
+                  mode=None, watermark_source=None, fingerprint=None, source_key=None, quarantine_file=None):
+    """
+    Extract, transform and load `source` (a CSV path) concurrently into `movies`.
+    The load goes through the same staging table and merge as load_to_postgresql.
+    Rows failing MOVIES_RULES are written to `quarantine_file` and never loaded.
+    Returns the load stats extended with transform and validation counts and per-stage busy seconds.
+    """
+    chunksize = chunksize or DEFAULT_CHUNK_SIZE
+    workers = workers or DEFAULT_TRANSFORM_WORKERS
+    pipeline = _Pipeline(queue_size or DEFAULT_QUEUE_SIZE, ValidationReport(MOVIES_RULES, quarantine_file))
+    encoding = sniff_encoding(source, source_key=source_key)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=_extract, name='etl-extract',
+                                args=(pipeline, source, encoding, chunksize, workers), daemon=True)]
+    threads += [threading.Thread(target=_transform, name=f'etl-transform-{i}', args=(pipeline,), daemon=True)
+                for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        stats = load_movies(conn, _ordered_frames(pipeline, workers), mode=mode,
+                            source=watermark_source, fingerprint=fingerprint)
+    except _StageFailed:
+        conn.rollback()
+        raise pipeline.error
+    except Exception as e:
+        pipeline.fail(e)
+        raise
+    finally:
+        pipeline.stop.set()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start
+    pipeline.busy['load'] = max(stats['merge_seconds'] - pipeline.load_wait, 0.0)
+    stats.update({
+        'encoding': encoding,
+        'chunks': pipeline.chunks,
+        'rows_in': pipeline.rows_in,
+        'rows_out': pipeline.rows_out,
+        'rows_rejected': pipeline.report.rows_rejected,
+        'workers': workers,
+        'wall_seconds': round(elapsed, 3),
+        'stage_busy_seconds': {stage: round(seconds, 3) for stage, seconds in pipeline.busy.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    validation = pipeline.report.finish()
+    stats['rule_failures'] = {name: rule['failures'] for name, rule in validation['rules'].items() if rule['failures']}
+    busy = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in stats['stage_busy_seconds'].items())
+    print(f"Pipelined ETL: {pipeline.rows_in} rows in, {stats['loaded']} loaded in {elapsed:.2f}s "
+          f"wall ({busy} busy, {workers} transform workers)")
+    return stats
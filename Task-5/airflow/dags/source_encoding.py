@@ -0,0 +1,68 @@
+"""
+Encoding detection for source CSV files.
+Only a bounded prefix of the file is inspected, and the verdict is cached per source
+(local file fingerprint or object ETag), so the file itself is decoded exactly once.
+"""
+
+import codecs
+import os
+
+from etl_state import file_fingerprint, load_json_state, update_json_state
+
+# Bytes read from the start of the file to decide the encoding
+SAMPLE_BYTES = int(os.environ.get('ETL_ENCODING_SAMPLE_BYTES', str(1024 * 1024)))
+
+CACHE_FILE = 'encoding_cache.json'
+
+# Verdicts already made by this process, keyed like the on-disk cache
+_encoding_cache = {}
+
+
+def detect_encoding(sample, complete=False):
+    """
+    Guess the encoding of a byte sample.
+    `complete` means the sample is the whole file, so a truncated multi-byte
+    sequence at the end is a real error rather than a cut in the middle of a character.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    # cp1252 and latin-1 only differ in 0x80-0x9F; without those bytes latin-1 is the
+    # safer pick because it can decode any later byte
+    if any(0x80 <= byte <= 0x9F for byte in sample):
+        try:
+            sample.decode('cp1252')
+            return 'cp1252'
+        except UnicodeDecodeError:
+            pass
+    return 'latin-1'
+
+
+def sniff_encoding(path, source_key=None, sample_bytes=None):
+    """
+    Return the encoding of `path`, inspecting at most `sample_bytes` bytes.
+    Pass the object ETag as `source_key` for downloaded objects so the verdict
+    survives re-downloads of the same object.
+    """
+    key = source_key or file_fingerprint(path)
+    if key in _encoding_cache:
+        return _encoding_cache[key]
+
+    persisted = load_json_state(CACHE_FILE)
+    if key in persisted:
+        _encoding_cache[key] = persisted[key]
+        return persisted[key]
+
+    sample_bytes = sample_bytes or SAMPLE_BYTES
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    encoding = detect_encoding(sample, complete=len(sample) < sample_bytes)
+    print(f"Detected encoding {encoding} for {path} from a {len(sample)} byte sample")
+
+    _encoding_cache[key] = encoding
+    update_json_state(CACHE_FILE, {key: encoding})
+    return encoding
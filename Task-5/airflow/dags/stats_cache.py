@@ -0,0 +1,169 @@
+"""
+TTL + LRU cache for the dashboard statistics.
+Entries live in process memory and, optionally, in a JSON file in the ETL state directory.
+The load task refreshes the file when it finishes, and dashboard processes notice the new
+file version with a single stat() call (size and mtime), so reads stay O(1) and never race the nightly load.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from etl_state import file_fingerprint, load_json_state, save_json_state, state_path
+from movies_rollups import read_year_rollups
+
+STATS_TTL_SECONDS = float(os.environ.get('ETL_STATS_TTL_SECONDS', '300'))
+STATS_MAX_ENTRIES = int(os.environ.get('ETL_STATS_MAX_ENTRIES', '32'))
+
+# Share entries and invalidations across processes through a file in the state directory
+STATS_FILE_STORE = os.environ.get('ETL_STATS_FILE_STORE', '1') == '1'
+STATS_STORE_FILE = 'dashboard_stats.json'
+
+DASHBOARD_STATS_KEY = 'dashboard'
+YEAR_STATS_KEY = 'years'
+
+
+class StatsCache:
+    """In-process LRU with per-entry TTL, optionally backed by a JSON file"""
+
+    def __init__(self, ttl=STATS_TTL_SECONDS, max_entries=STATS_MAX_ENTRIES,
+                 store_file=STATS_STORE_FILE if STATS_FILE_STORE else None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store_file = store_file
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+        self._entries = OrderedDict()
+        self._store_fingerprint = None
+        self._lock = threading.Lock()
+
+    def _sync_from_store(self):
+        """Reload the file store if another process (e.g. the load task) rewrote it"""
+        if self.store_file is None:
+            return
+        try:
+            fingerprint = file_fingerprint(state_path(self.store_file))
+        except FileNotFoundError:
+            return
+        if fingerprint == self._store_fingerprint:
+            return
+        store = load_json_state(self.store_file)
+        self.version = store.get('version', 0)
+        self._entries = OrderedDict(store.get('entries', {}))
+        self._store_fingerprint = fingerprint
+
+    def _prune(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        now = time.time()
+        for key in [key for key, entry in self._entries.items() if entry['expires_at'] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _write_store(self):
+        if self.store_file is None:
+            return
+        # The file is read by every dashboard process, so it gets the same limits as memory
+        self._prune()
+        save_json_state(self.store_file, {'version': self.version, 'entries': dict(self._entries)})
+        self._store_fingerprint = file_fingerprint(state_path(self.store_file))
+
+    def _put(self, key, value):
+        self._entries[key] = {'value': value, 'expires_at': time.time() + self.ttl}
+        self._entries.move_to_end(key)
+        self._prune()
+
+    def get(self, key, compute):
+        """Cached value for `key`, calling `compute()` on a miss or after expiry"""
+        with self._lock:
+            self._sync_from_store()
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['value']
+            self.misses += 1
+            version = self.version
+
+        value = compute()
+        with self._lock:
+            # A load that invalidated the cache while compute() ran may have made this value
+            # stale, so it is returned but not cached
+            self._sync_from_store()
+            if self.version == version:
+                self._put(key, value)
+                self._write_store()
+        return value
+
+    def invalidate(self, fresh_values=None):
+        """Drop every entry, optionally seeding the new version with precomputed values"""
+        with self._lock:
+            self._sync_from_store()
+            self.version += 1
+            self._entries = OrderedDict()
+            for key, value in (fresh_values or {}).items():
+                self._put(key, value)
+            self._write_store()
+
+    def counters(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'version': self.version}
+
+
+def compute_dashboard_stats(conn):
+    """Row count and top 5 movies by score, read from the rollup tables the load maintains"""
+    cur = conn.cursor()
+    cur.execute("SELECT coalesce(sum(movies), 0) FROM movies_year_rollup;")
+    total = int(cur.fetchone()[0])
+    # Every year's best movies are in movies_top_by_year, so the overall top 5 is too
+    cur.execute("""
+        SELECT movie_title, imdb_score, title_year, budget
+        FROM movies_top_by_year
+        ORDER BY imdb_score DESC, id DESC
+        LIMIT 5;
+    """)
+    sample = _sample_rows(cur.fetchall())
+    cur.close()
+    return {'total': total, 'sample': sample}
+
+
+def scan_dashboard_stats(conn):
+    """The same stats computed from `movies` itself, for databases without the rollups (SQLite)"""
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM movies;")
+    total = cur.fetchone()[0]
+    cur.execute("""
+        SELECT movie_title, imdb_score, title_year, budget
+        FROM movies
+        ORDER BY imdb_score DESC, id DESC
+        LIMIT 5;
+    """)
+    sample = _sample_rows(cur.fetchall())
+    cur.close()
+    return {'total': total, 'sample': sample}
+
+
+def _sample_rows(rows):
+    # Titles are normalized by the transform step, only fill in missing ones
+    return [[title or 'Unknown', float(score) if score is not None else None, year, budget]
+            for title, score, year, budget in rows]
+
+
+def compute_year_stats(conn):
+    """Per-year rollups (counts, score and money totals, score histograms) as JSON-friendly values"""
+    cur = conn.cursor()
+    years = read_year_rollups(cur)
+    cur.close()
+    return {'years': years}
+
+
+def refresh_dashboard_stats(conn, cache=None):
+    """Invalidate the dashboard cache and store freshly computed stats (called after a load)"""
+    cache = cache or StatsCache()
+    stats = compute_dashboard_stats(conn)
+    cache.invalidate({DASHBOARD_STATS_KEY: stats, YEAR_STATS_KEY: compute_year_stats(conn)})
+    print(f"Dashboard stats cache refreshed (version {cache.version}, {stats['total']} records)")
+    return stats
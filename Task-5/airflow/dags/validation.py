@@ -0,0 +1,192 @@
+"""
+Declarative, vectorized data quality rules.
+Rules are plain dicts evaluated as boolean masks over whole chunks. Rows failing a
+'reject' rule are split off into a quarantine file with their reasons before they reach
+the database; 'warn' rules are only counted. A ValidationReport aggregates the counts
+of every chunk, checks uniqueness across chunks and writes the summary report.
+
+Rule checks:
+    not_null     value is missing (or blank text)
+    numeric      value is present but not a number
+    range        number outside [min, max]
+    max_length   text longer than `value` characters
+    expression   `expr` (DataFrame.eval syntax) is false where `when` holds and `columns` are present
+    unique       `columns` repeat a combination seen earlier (stateful, see ValidationReport)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from etl_state import save_json_state
+from hash_set import HashSet
+
+REPORT_STATE_FILE = 'validation_report.json'
+
+REASON_COLUMN = 'reject_reasons'
+
+
+def rule_name(rule):
+    """Stable name of a rule, used as the reject reason and in the report"""
+    if 'name' in rule:
+        return rule['name']
+    return f"{rule['column']}:{rule['check']}"
+
+
+def _column_lookup(frame):
+    """Case-insensitive mapping from rule column names to the frame's columns"""
+    return {str(col).lower(): col for col in frame.columns}
+
+
+def _numeric(frame, lookup, column, cache):
+    """Column coerced to numbers (NaN for missing or junk), computed once per chunk"""
+    if column not in cache:
+        # float64 so nullable (Int64) columns compare to plain booleans instead of NA
+        cache[column] = pd.to_numeric(frame[lookup[column.lower()]], errors='coerce').astype('float64')
+    return cache[column]
+
+
+def _failure_mask(frame, rule, lookup, cache):
+    """Boolean array of rows failing `rule`, or None if its columns are not in the chunk"""
+    check = rule['check']
+    columns = rule.get('columns', [rule.get('column')])
+    if any(col is None or col.lower() not in lookup for col in columns):
+        return None
+
+    if check == 'expression':
+        numbers = pd.DataFrame({col: _numeric(frame, lookup, col, cache) for col in columns})
+        present = numbers.notna().all(axis=1).to_numpy()
+        holds = numbers.eval(rule['expr']).to_numpy(dtype=bool)
+        applies = numbers.eval(rule['when']).to_numpy(dtype=bool) if 'when' in rule else True
+        return present & applies & ~holds
+
+    values = frame[lookup[rule['column'].lower()]]
+    if check == 'not_null':
+        missing = values.isna().to_numpy(copy=True)
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            missing |= (values.astype('string').str.strip() == '').fillna(True).to_numpy(dtype=bool)
+        return missing
+    if check == 'numeric':
+        return (_numeric(frame, lookup, rule['column'], cache).isna() & values.notna()).to_numpy()
+    if check == 'range':
+        numbers = _numeric(frame, lookup, rule['column'], cache)
+        outside = pd.Series(False, index=frame.index)
+        if 'min' in rule:
+            outside |= numbers < rule['min']
+        if 'max' in rule:
+            outside |= numbers > rule['max']
+        return outside.to_numpy()
+    if check == 'max_length':
+        return (values.astype('string').str.len() > rule['value']).fillna(False).to_numpy(dtype=bool)
+    raise ValueError(f"Unknown validation check '{check}' in rule {rule_name(rule)}")
+
+
+def validate_chunk(frame, rules):
+    """
+    Evaluate the stateless rules over one chunk.
+    Returns (valid_rows, rejected_rows, counts): rejected rows carry a `reject_reasons`
+    column listing every failed reject rule, and counts maps rule names to failures.
+    """
+    lookup = _column_lookup(frame)
+    cache = {}
+    counts = {}
+    rejected = np.zeros(len(frame), dtype=bool)
+    reject_masks = []
+    for rule in rules:
+        if rule['check'] == 'unique':
+            continue
+        mask = _failure_mask(frame, rule, lookup, cache)
+        if mask is None:
+            continue
+        name = rule_name(rule)
+        counts[name] = counts.get(name, 0) + int(mask.sum())
+        if rule.get('severity', 'reject') == 'reject':
+            rejected |= mask
+            reject_masks.append((name, mask))
+
+    valid = frame[~rejected]
+    quarantined = frame[rejected].copy()
+    if len(quarantined):
+        # Only the (few) rejected rows pay for building reason strings
+        reasons = pd.Series('', index=quarantined.index, dtype=object)
+        for name, mask in reject_masks:
+            hit = mask[rejected]
+            reasons[hit] = reasons[hit] + (name + ';')
+        quarantined[REASON_COLUMN] = reasons.str.rstrip(';')
+    return valid, quarantined, counts
+
+
+class ValidationReport:
+    """Aggregates chunk results in source order: counts, quarantine file and uniqueness"""
+
+    def __init__(self, rules, quarantine_path=None):
+        self.rules = rules
+        self.quarantine_path = quarantine_path
+        self.rows_checked = 0
+        self.rows_rejected = 0
+        self.failures = {rule_name(rule): 0 for rule in rules}
+        # uint64 hashes of every key combination seen so far, per unique rule
+        self._seen = {rule_name(rule): HashSet(np.uint64)
+                      for rule in rules if rule['check'] == 'unique'}
+        self._quarantine_header_written = False
+
+    def add(self, rows_checked, rejected, counts):
+        """Record one chunk's validate_chunk result and append its rejected rows to the quarantine file"""
+        self.rows_checked += rows_checked
+        self.rows_rejected += len(rejected)
+        for name, failures in counts.items():
+            self.failures[name] = self.failures.get(name, 0) + failures
+        if len(rejected) and self.quarantine_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.quarantine_path)), exist_ok=True)
+            rejected.to_csv(self.quarantine_path, mode='a' if self._quarantine_header_written else 'w',
+                            header=not self._quarantine_header_written, index=False)
+            self._quarantine_header_written = True
+
+    def check_unique(self, frame):
+        """
+        Count rows repeating a key already seen in this or an earlier chunk.
+        Keys are compared case- and whitespace-insensitively via 64-bit hashes.
+        Returns a boolean array of duplicate rows.
+        """
+        duplicates = np.zeros(len(frame), dtype=bool)
+        lookup = _column_lookup(frame)
+        for rule in self.rules:
+            if rule['check'] != 'unique' or any(col.lower() not in lookup for col in rule['columns']):
+                continue
+            keys = pd.DataFrame({
+                col: frame[lookup[col.lower()]].astype('string').str.strip().str.lower()
+                     .str.replace(r'\s+', ' ', regex=True)
+                for col in rule['columns']
+            })
+            hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+            name = rule_name(rule)
+            dup = pd.Series(hashes).duplicated().to_numpy() | self._seen[name].contains(hashes)
+            self._seen[name].add(hashes[~dup])
+            self.failures[name] += int(dup.sum())
+            duplicates |= dup
+        return duplicates
+
+    def summary(self):
+        severities = {rule_name(rule): rule.get('severity', 'reject') for rule in self.rules}
+        return {
+            'rows_checked': self.rows_checked,
+            'rows_rejected': self.rows_rejected,
+            'rows_passed': self.rows_checked - self.rows_rejected,
+            'quarantine_file': self.quarantine_path if self._quarantine_header_written else None,
+            'rules': {name: {'severity': severities.get(name, 'reject'), 'failures': failures}
+                      for name, failures in self.failures.items()},
+        }
+
+    def finish(self):
+        """Print and persist the summary report (also removing a stale quarantine file)"""
+        if (self.quarantine_path and not self._quarantine_header_written
+                and os.path.exists(self.quarantine_path)):
+            os.remove(self.quarantine_path)
+        report = self.summary()
+        failed = ', '.join(f"{name}={rule['failures']}" for name, rule in report['rules'].items()
+                           if rule['failures'])
+        print(f"Validation: {report['rows_checked']} rows checked, {report['rows_rejected']} quarantined"
+              + (f" ({failed})" if failed else ""))
+        save_json_state(REPORT_STATE_FILE, report)
+        return report
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the parallel transform from 1 to N worker processes.
+A synthetic input is built by repeating the rows of Movies.csv (raw bytes, so the
+Latin-1 titles are kept) and transformed once per worker count.
+
+    python benchmarks/bench_parallel_transform.py --rows 2000000 --max-workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+TASK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(TASK_DIR, 'airflow', 'dags'))
+
+from parallel_transform import transform_movies_parallel
+
+
+def build_input(path, rows):
+    """Write `rows` data rows by repeating the sample file's data lines"""
+    with open(os.path.join(TASK_DIR, 'Movies.csv'), 'rb') as f:
+        header = f.readline()
+        lines = [line if line.endswith(b'\n') else line + b'\n' for line in f if line.strip()]
+    with open(path, 'wb') as out:
+        out.write(header)
+        written = 0
+        while written < rows:
+            batch = lines[:rows - written]
+            out.writelines(batch)
+            written += len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--partition-mb', type=float, default=16)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'movies_bench.csv')
+        build_input(source, args.rows)
+        print(f"Input: {args.rows} rows, {os.path.getsize(source) / (1024 * 1024):.1f} MB")
+
+        results = []
+        for workers in range(1, args.max_workers + 1):
+            metrics = transform_movies_parallel(
+                [source], os.path.join(tmp, f'out_{workers}.arrow'), workers=workers,
+                partition_bytes=int(args.partition_mb * 1024 * 1024),
+            )
+            results.append({'workers': workers, 'seconds': metrics['seconds'],
+                            'rows_per_sec': metrics['rows_per_sec'], 'partitions': metrics['chunks']})
+
+    baseline = results[0]['seconds']
+    print(f"\n{'Workers':>7} {'Seconds':>9} {'Rows/sec':>12} {'Speedup':>8}")
+    for row in results:
+        row['speedup'] = round(baseline / row['seconds'], 2) if row['seconds'] else None
+        print(f"{row['workers']:>7} {row['seconds']:>9} {row['rows_per_sec']:>12,.0f} {row['speedup']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': args.rows, 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the movies pipeline on synthetic data.
+For each size a movies CSV shaped like Movies.csv (same header with the repeated
+title_year column, Latin-1 titles with the export's '?\\xff' suffix, missing values and
+repeated rows) is generated, then the transform, the load and the dashboard queries are
+timed and the results written as JSON for comparison between commits.
+
+    python benchmarks/bench_pipeline.py --rows 10000 1000000 --json bench.json
+    python benchmarks/bench_pipeline.py --rows 10000 --db sqlite --compare bench.json
+
+The PostgreSQL backend does a full load into `movies` of the database in the PG*
+settings, so point PGDATABASE at a scratch database. ETL state (validation report,
+dedup seen-set) goes to a temporary directory unless ETL_STATE_DIR is set.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+TASK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(TASK_DIR)
+sys.path.append(os.path.join(TASK_DIR, 'airflow', 'dags'))
+os.environ.setdefault('ETL_STATE_DIR', tempfile.mkdtemp(prefix='etl_bench_state_'))
+
+import numpy as np
+import pandas as pd
+
+from intermediate import artifact_path, iter_intermediate_batches
+from movies_loader import DEFAULT_BATCH_SIZE, prepare_movies_frame
+from movies_schema import MOVIES_COLUMNS, movies_table_ddl
+from movies_transform import transform_movies_csv
+from parallel_transform import transform_movies_parallel
+from stats_cache import compute_dashboard_stats, scan_dashboard_stats
+
+# Title words, including Latin-1 characters the source export carries
+TITLE_WORDS = np.array(['The', 'Dark', 'Knight', 'Pirates', 'Return', 'Amélie', 'Señor', 'Über',
+                        'Noël', 'Café', 'Mañana', 'Garçon', 'Night', 'Rises', 'Spectre', 'Légende'])
+
+# (low, high) of each generated count column
+COUNT_RANGES = {
+    'num_critic_for_reviews': (1, 800), 'duration': (60, 200), 'DIRECTOR_facebook_likes': (0, 25000),
+    'actor_3_facebook_likes': (0, 25000), 'ACTOR_1_facebook_likes': (0, 650000),
+    'gross': (100000, 800000000), 'num_voted_users': (5, 1700000), 'Cast_Total_facebook_likes': (0, 700000),
+    'facenumber_in_poster': (0, 10), 'num_user_for_reviews': (1, 5000), 'budget': (200000, 300000000),
+    'title_year': (1920, 2016), 'ACTOR_2_facebook_likes': (0, 140000),
+}
+
+GENERATE_CHUNK_ROWS = 500000
+
+
+def _synthetic_chunk(rng, first_row, rows, missing_rate, duplicate_rate):
+    """One chunk of synthetic rows with the Movies.csv columns (source names and order)"""
+    words = TITLE_WORDS[rng.integers(0, len(TITLE_WORDS), size=(2, rows))]
+    ids = np.arange(first_row, first_row + rows).astype(str)
+    titles = pd.Series(np.char.add(np.char.add(np.char.add(words[0], ' '), np.char.add(words[1], ' ')), ids))
+    chunk = pd.DataFrame({'movie_title': titles + '?\xff'})
+    for col, (low, high) in COUNT_RANGES.items():
+        values = pd.Series(rng.integers(low, high, size=rows), dtype='Int64')
+        values[rng.random(rows) < missing_rate] = pd.NA
+        chunk[col] = values
+    chunk['imdb_score'] = rng.integers(16, 96, size=rows) / 10
+    # The export repeats title_year as a last column, blank on some rows
+    chunk['title_year_repeat'] = chunk['title_year'].where(rng.random(rows) < 0.5)
+    # Re-sent rows: copy earlier rows of the chunk over a few positions
+    repeats = np.flatnonzero(rng.random(rows) < duplicate_rate)
+    if len(repeats):
+        chunk.iloc[repeats] = chunk.iloc[rng.integers(0, rows, size=len(repeats))].to_numpy()
+    return chunk
+
+
+def generate_movies_csv(path, rows, seed=42, missing_rate=0.05, duplicate_rate=0.01):
+    """Write `rows` synthetic movies to a Latin-1 CSV with the Movies.csv header"""
+    with open(os.path.join(TASK_DIR, 'Movies.csv'), 'rb') as f:
+        header = f.readline().rstrip(b'\r\n') + b'\n'
+    rng = np.random.default_rng(seed)
+    with open(path, 'wb') as out:
+        out.write(header)
+        for first_row in range(0, rows, GENERATE_CHUNK_ROWS):
+            chunk = _synthetic_chunk(rng, first_row, min(GENERATE_CHUNK_ROWS, rows - first_row),
+                                     missing_rate, duplicate_rate)
+            out.write(chunk.to_csv(index=False, header=False, lineterminator='\n').encode('latin-1'))
+
+
+def bench_transform(source, output_base, workers):
+    output_file = artifact_path(output_base)
+    if workers > 1:
+        metrics = transform_movies_parallel([source], output_file, workers=workers)
+    else:
+        metrics = transform_movies_csv(source, output_file)
+    return output_file, {key: metrics[key] for key in
+                         ('seconds', 'rows_in', 'rows_out', 'rows_rejected', 'rows_per_sec', 'peak_rss_mb')}
+
+
+def _prepared_frames(artifact):
+    return (prepare_movies_frame(frame) for frame in iter_intermediate_batches(artifact, batch_size=DEFAULT_BATCH_SIZE))
+
+
+def bench_load_postgres(artifact):
+    from db import get_connection
+    from incremental_load import load_movies
+
+    with get_connection() as conn:
+        stats = load_movies(conn, _prepared_frames(artifact), mode='full')
+    # merge_seconds covers staging, COPY and merge; rows_per_sec is the COPY alone
+    return {'seconds': stats['merge_seconds'], 'loaded': stats['loaded'], 'rejected': stats['rejected'],
+            'repeated_rows_dropped': stats['repeated_rows_dropped'], 'copy_rows_per_sec': stats['rows_per_sec']}
+
+
+def open_sqlite(path):
+    """SQLite stand-in for the warehouse: the generated DDL with an autoincrement id"""
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS movies")
+    conn.execute(movies_table_ddl().replace('SERIAL', 'INTEGER'))
+    return conn
+
+
+def bench_load_sqlite(conn, artifact):
+    start = time.perf_counter()
+    insert = (f"INSERT INTO movies ({', '.join(MOVIES_COLUMNS)}) "
+              f"VALUES ({', '.join('?' for _ in MOVIES_COLUMNS)})")
+    loaded = 0
+    for frame in _prepared_frames(artifact):
+        rows = frame[MOVIES_COLUMNS].astype(object).where(frame[MOVIES_COLUMNS].notna(), None)
+        conn.executemany(insert, rows.itertuples(index=False, name=None))
+        loaded += len(frame)
+    conn.execute("CREATE INDEX movies_imdb_score_idx ON movies (imdb_score DESC, id DESC)")
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    return {'seconds': round(elapsed, 3), 'loaded': loaded}
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, round(time.perf_counter() - start, 4)
+
+
+def bench_dashboard(conn, placeholder, pages):
+    """Time the dashboard stats query, `pages` keyset pages of /data and a full NDJSON-style scan"""
+    from simple_web_interface import DEFAULT_PAGE_SIZE, STREAM_FETCH_SIZE, keyset_query
+
+    def query(after, limit=None):
+        sql, params = keyset_query(after, limit)
+        cur = conn.cursor()
+        cur.execute(sql.replace('%s', placeholder), params)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+    def walk_pages():
+        after = None
+        for _ in range(pages):
+            page = query(after, DEFAULT_PAGE_SIZE)
+            if len(page) < DEFAULT_PAGE_SIZE:
+                break
+            after = (page[-1][2], page[-1][0])
+
+    def scan():
+        # Streamed like the NDJSON export: a server-side cursor on PostgreSQL
+        if placeholder == '%s':
+            cur = conn.cursor(name='bench_scan')
+            cur.itersize = STREAM_FETCH_SIZE
+        else:
+            cur = conn.cursor()
+        cur.execute(*keyset_query(None))
+        rows = sum(1 for _ in cur)
+        cur.close()
+        return rows
+
+    results = {}
+    # PostgreSQL reads the rollup tables the load maintains, SQLite has none and scans movies
+    stats = compute_dashboard_stats if placeholder == '%s' else scan_dashboard_stats
+    _, results['stats_seconds'] = _timed(lambda: stats(conn))
+    _, results['first_page_seconds'] = _timed(lambda: query(None, DEFAULT_PAGE_SIZE))
+    _, results[f'{pages}_pages_seconds'] = _timed(walk_pages)
+    _, results['full_scan_seconds'] = _timed(scan)
+    return results
+
+
+def run_size(rows, args, data_dir):
+    source = os.path.join(data_dir, f'movies_{rows}_{args.seed}.csv')
+    if not os.path.exists(source):
+        _, seconds = _timed(lambda: generate_movies_csv(source, rows, seed=args.seed))
+        print(f"Generated {rows} rows ({os.path.getsize(source) / (1024 * 1024):.1f} MB) in {seconds}s")
+
+    result = {'rows': rows, 'input_mb': round(os.path.getsize(source) / (1024 * 1024), 1)}
+    artifact, result['transform'] = bench_transform(source, os.path.join(data_dir, f'bench_{rows}'), args.workers)
+    try:
+        if args.db == 'sqlite':
+            conn = open_sqlite(os.path.join(data_dir, 'bench.sqlite'))
+            try:
+                result['load'] = bench_load_sqlite(conn, artifact)
+                result['dashboard'] = bench_dashboard(conn, '?', args.pages)
+            finally:
+                conn.close()
+        else:
+            from db import get_connection
+            result['load'] = bench_load_postgres(artifact)
+            with get_connection() as conn:
+                result['dashboard'] = bench_dashboard(conn, '%s', args.pages)
+                conn.rollback()
+    finally:
+        os.remove(artifact)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=TASK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(result):
+    """{'transform.seconds': ..., 'load.rows_per_sec': ...} for one size"""
+    return {f'{stage}.{key}': value for stage, values in result.items() if isinstance(values, dict)
+            for key, value in values.items()}
+
+
+def print_comparison(results, baseline_path):
+    """Timings of this run against a previous JSON result, matched by row count"""
+    with open(baseline_path) as f:
+        baseline = {entry['rows']: _flatten(entry) for entry in json.load(f)['results']}
+    print(f"\n{'Rows':>10} {'Metric':<32} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for result in results:
+        before = baseline.get(result['rows'], {})
+        for metric, value in _flatten(result).items():
+            if not (metric.endswith('seconds') or metric.endswith('rows_per_sec')) or not before.get(metric):
+                continue
+            change = (value - before[metric]) / before[metric] * 100
+            print(f"{result['rows']:>10} {metric:<32} {before[metric]:>12} {value:>12} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    parser.add_argument('--db', choices=['postgres', 'sqlite'], default='postgres')
+    parser.add_argument('--workers', type=int, default=1, help='transform worker processes')
+    parser.add_argument('--pages', type=int, default=50, help='keyset pages walked by the dashboard benchmark')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help='keep generated inputs here and reuse them between runs')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='print the change against a previous --json result')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        results = []
+        for rows in args.rows:
+            result = run_size(rows, args, data_dir)
+            print(json.dumps(result))
+            results.append(result)
+
+    report = {
+        'commit': _git_commit(),
+        'db': args.db,
+        'workers': args.workers,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 from minio import Minio
+import codecs
 import pandas as pd
-from io import BytesIO
 
 # Connect to MinIO
 client = Minio(
@@ -14,7 +14,8 @@ client = Minio(
 response = client.get_object("movies", "Movies.csv")  
 
 # Use correct encoding
-data = pd.read_csv(BytesIO(response.read()), encoding='ISO-8859-1')
+# Parse straight from the HTTP stream instead of buffering the whole object
+data = pd.read_csv(codecs.getreader('ISO-8859-1')(response))
 response.close()
 response.release_conn()
 
@@ -0,0 +1,182 @@
+"""
+Background job runner for the web interface.
+Pipeline runs are started as subprocesses on a worker thread so HTTP requests return at once.
+Only one job per pipeline runs at a time, and the runner's progress lines and log output
+are captured for the /jobs/<id> and /logs endpoints.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
+from etl_metrics import PROGRESS_PREFIX
+
+TASK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Command per pipeline name; -u keeps the child's stdout unbuffered so progress arrives live
+PIPELINES = {
+    'etl_pipeline': [sys.executable, '-u', 'run_etl_dag.py'],
+}
+
+MAX_LOG_LINES = int(os.environ.get('ETL_JOB_LOG_LINES', '5000'))
+MAX_JOBS = int(os.environ.get('ETL_JOB_HISTORY', '20'))
+
+STAGES = ['extract', 'transform', 'load']
+
+
+class Job:
+    """One pipeline run: status, per-stage progress and a bounded log buffer"""
+
+    def __init__(self, pipeline):
+        self.id = uuid.uuid4().hex[:12]
+        self.pipeline = pipeline
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.returncode = None
+        self.error = None
+        self.stages = {stage: {'status': 'pending'} for stage in STAGES}
+        self.logs = deque(maxlen=MAX_LOG_LINES)
+        # Total lines ever logged, so followers can resume after old lines were dropped
+        self.log_count = 0
+        self.changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def start(self):
+        with self.changed:
+            self.status = 'running'
+            self.started_at = time.time()
+            self.changed.notify_all()
+
+    def append_log(self, line):
+        with self.changed:
+            self.logs.append(line)
+            self.log_count += 1
+            self.changed.notify_all()
+
+    def record_progress(self, event):
+        with self.changed:
+            stage = self.stages.setdefault(event.pop('stage'), {})
+            stage.update(event)
+            self.changed.notify_all()
+
+    def finish(self, status, returncode=None, error=None):
+        with self.changed:
+            self.status = status
+            self.returncode = returncode
+            self.error = error
+            self.finished_at = time.time()
+            self.changed.notify_all()
+
+    def log_lines(self, offset=0):
+        """Buffered log lines from absolute line number `offset` on, and the next offset"""
+        with self.changed:
+            first = self.log_count - len(self.logs)
+            lines = list(self.logs)[max(offset - first, 0):]
+            return lines, self.log_count
+
+    def follow_logs(self, offset=0, poll_seconds=1.0):
+        """Yield log lines as they arrive until the job has finished"""
+        while True:
+            lines, offset = self.log_lines(offset)
+            yield from lines
+            with self.changed:
+                if self.done and offset == self.log_count:
+                    return
+                if offset == self.log_count:
+                    self.changed.wait(poll_seconds)
+
+    def to_dict(self):
+        with self.changed:
+            end = self.finished_at or time.time()
+            return {
+                'id': self.id,
+                'pipeline': self.pipeline,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'seconds': round(end - self.started_at, 3) if self.started_at else None,
+                'returncode': self.returncode,
+                'error': self.error,
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'log_lines': self.log_count,
+            }
+
+
+class JobRunner:
+    """Starts pipeline jobs on background threads, at most one active job per pipeline"""
+
+    def __init__(self, pipelines=None, cwd=TASK_DIR):
+        self.pipelines = pipelines or PIPELINES
+        self.cwd = cwd
+        self.jobs = OrderedDict()
+        self.active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pipeline='etl_pipeline'):
+        """Start a job, or return the one already running; returns (job, created)"""
+        if pipeline not in self.pipelines:
+            raise KeyError(f"Unknown pipeline '{pipeline}'")
+        with self._lock:
+            running = self.active.get(pipeline)
+            if running is not None and not running.done:
+                return running, False
+            job = Job(pipeline)
+            self.active[pipeline] = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_JOBS:
+                self.jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def status_counts(self):
+        """Number of kept jobs per status"""
+        with self._lock:
+            return dict(Counter(job.status for job in self.jobs.values()))
+
+    def latest(self):
+        with self._lock:
+            return next(reversed(self.jobs.values()), None)
+
+    def _run(self, job):
+        job.start()
+        try:
+            process = subprocess.Popen(
+                self.pipelines[job.pipeline], cwd=self.cwd,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding='utf-8', errors='replace', bufsize=1,
+                env={**os.environ, 'PYTHONIOENCODING': 'utf-8'},
+            )
+            for line in process.stdout:
+                line = line.rstrip('\n')
+                if line.startswith(PROGRESS_PREFIX):
+                    try:
+                        job.record_progress(json.loads(line[len(PROGRESS_PREFIX):]))
+                        continue
+                    except ValueError:
+                        pass
+                job.append_log(line)
+            returncode = process.wait()
+        except Exception as e:
+            print(f"Job {job.id} could not be started: {e}")
+            job.finish('failed', error=str(e))
+            return
+        if returncode == 0:
+            job.finish('succeeded', returncode)
+        else:
+            job.finish('failed', returncode, error=f"Pipeline exited with code {returncode}")
@@ -1,45 +1,29 @@
+import os
+import sys
 import pandas as pd
-import psycopg2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
+from db import get_connection
+from incremental_load import load_movies
+from movies_loader import prepare_movies_frame
+from movies_schema import coerce_to_schema
 
 # ---------------- Read Transformed CSV ----------------
 data = pd.read_csv("movies_transformed.csv")  # from Transform step
 
-# Handle duplicate columns automatically
-if data.columns.duplicated().any():
-    data = data.loc[:, ~data.columns.duplicated()]
+# Keep the schema columns (whatever their case) and drop repeated ones
+data = prepare_movies_frame(coerce_to_schema(data))
 
 print("Data to load (first row):")
 print(data.head(1))
 
 # ---------------- Connect to PostgreSQL ----------------
-conn = psycopg2.connect(
-    host="localhost",
-    port=5433,
-    database="etl_demo",      # your database
-    user="postgres",          # your username
-    password="SpeakO13."       # your password
-)
-cur = conn.cursor()
-
-# ---------------- Insert Data ----------------
-for _, row in data.iterrows():
-    cur.execute("""
-        INSERT INTO movies (
-            movie_title, num_critic_for_reviews, duration, DIRECTOR_facebook_likes,
-            actor_3_facebook_likes, ACTOR_1_facebook_likes, gross, num_voted_users,
-            Cast_Total_facebook_likes, facenumber_in_poster, num_user_for_reviews,
-            budget, title_year, ACTOR_2_facebook_likes, imdb_score
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (
-        row["movie_title"], row["num_critic_for_reviews"], row["duration"], row["DIRECTOR_facebook_likes"],
-        row["actor_3_facebook_likes"], row["ACTOR_1_facebook_likes"], row["gross"], row["num_voted_users"],
-        row["Cast_Total_facebook_likes"], row["facenumber_in_poster"], row["num_user_for_reviews"],
-        row["budget"], row["title_year"], row["ACTOR_2_facebook_likes"], row["imdb_score"]
-    ))
-
-conn.commit()
-cur.close()
-conn.close()
+# Connection settings come from PGHOST/PGPORT/PGDATABASE/PGUSER/PGPASSWORD
+with get_connection() as conn:
+    # ---------------- Insert Data ----------------
+    # Merged like an incremental DAG load: rows get their merge keys and content hashes,
+    # rows repeated in the file or loaded by an earlier run are dropped, changed rows are
+    # updated, and the partitions, rollups and seen-set are kept current
+    stats = load_movies(conn, [data], mode='incremental')
 
-print("\nData loaded into PostgreSQL successfully!")
+print(f"\nData loaded into PostgreSQL successfully! ({stats['inserted']} inserted, {stats['updated']} updated)")
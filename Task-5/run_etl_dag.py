@@ -6,29 +6,146 @@ This script runs the ETL pipeline without needing the full Airflow scheduler
 
 import sys
 import os
-sys.path.append('d:/Data-Engineering-Buildables-Fellowship/Task-5/airflow/dags')
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
 
-from etl_pipeline_dag import extract_from_minio, transform_data, load_to_postgresql
+from airflow.exceptions import AirflowSkipException
+from db import get_connection
+from etl_metrics import RUN_METRICS_FILE, report_progress, save_run_metrics
+from etl_state import save_json_state
+from etl_pipeline_dag import (extract_from_minio, transform_data, load_to_postgresql, transform_and_load_pipelined,
+                              list_new_objects, transform_object, load_object, merge_load_stats)
 
-def run_etl_pipeline():
-    """Run the complete ETL pipeline manually"""
-    print("Starting ETL Pipeline...")
+class LocalTaskInstance:
+    """Minimal stand-in for Airflow's TaskInstance so stages can share XComs outside Airflow"""
+    
+    def __init__(self, xcoms, task_id):
+        self.xcoms = xcoms
+        self.task_id = task_id
+    
+    def xcom_push(self, key, value):
+        self.xcoms[(self.task_id, key)] = value
+    
+    def xcom_pull(self, task_ids, key='return_value'):
+        return self.xcoms.get((task_ids, key))
+
+def run_task(xcoms, task_id, callable_, **context):
+    """Call a DAG task function with a local context and record its return value"""
+    ti = LocalTaskInstance(xcoms, task_id)
+    result = callable_(ti=ti, **context)
+    ti.xcom_push('return_value', result)
+    return result
+
+# Stage metric fields reported in the progress events
+PROGRESS_FIELDS = ['files', 'bytes_read', 'rows_in', 'rows_out', 'rows_rejected', 'cpu_seconds', 'db_round_trips']
+
+def run_stage(xcoms, timings, stage, task_id, callable_, **context):
+    """
+    Run one task, emitting started/finished/failed progress events and recording the
+    stage metrics the task pushed (see etl_metrics.measure_stage)
+    """
+    report_progress(stage, 'started')
+    error = None
+    try:
+        return run_task(xcoms, task_id, callable_, **context)
+    except AirflowSkipException as e:
+        error = {'reason': str(e)}
+        raise
+    except Exception as e:
+        error = {'error': str(e)}
+        raise
+    finally:
+        metrics = xcoms.get((task_id, 'stage_metrics')) or {'status': 'failed'}
+        # Mapped tasks share a stage name, so the row is named after this run's stage
+        metrics = {**metrics, 'stage': stage}
+        timings.append(metrics)
+        report_progress(stage, metrics['status'], seconds=metrics.get('wall_seconds'),
+                        **{name: metrics[name] for name in PROGRESS_FIELDS if name in metrics}, **(error or {}))
+
+def print_stage_table(timings):
+    """Per-stage timing, memory and database summary"""
+    def fmt(value):
+        return '-' if value is None else str(value)
+    
+    print(f"\n{'Stage':<15} {'Status':<9} {'Seconds':>9} {'CPU s':>9} {'Rows out':>10} {'DB calls':>9} "
+          f"{'RSS MB':>9} {'Delta MB':>9} {'Peak MB':>9}")
+    for row in timings:
+        print(f"{row['stage']:<15} {row['status']:<9} {fmt(row.get('wall_seconds')):>9} "
+              f"{fmt(row.get('cpu_seconds')):>9} {fmt(row.get('rows_out')):>10} {fmt(row.get('db_round_trips')):>9} "
+              f"{fmt(row.get('rss_mb')):>9} {fmt(row.get('rss_delta_mb')):>9} {fmt(row.get('peak_rss_mb')):>9}")
+    print(f"{'total':<15} {'':<9} {round(sum(row.get('wall_seconds') or 0 for row in timings), 3):>9}")
+
+def save_stage_metrics(run_id, mode, timings):
+    """Write the run's stage metrics to the state directory and the etl_run_metrics table"""
+    save_json_state(RUN_METRICS_FILE, {'run_id': run_id, 'mode': mode, 'stages': timings})
+    try:
+        with get_connection() as conn:
+            save_run_metrics(conn, run_id, timings)
+    except Exception as e:
+        print(f"Could not record run metrics in PostgreSQL: {e}")
+
+def run_fan_out(xcoms, timings):
+    """
+    The DAG's mapped tasks, one object at a time: list the new objects, transform and load
+    each one, then merge the load stats
+    """
+    objects = run_stage(xcoms, timings, 'list', 'list_new_objects', list_new_objects)
+    loads = []
+    for index, source_object in enumerate(objects):
+        transformed = run_stage(xcoms, timings, f'transform[{index}]', f'transform_object[{index}]',
+                                transform_object, **source_object)
+        loads.append(run_stage(xcoms, timings, f'load[{index}]', f'load_object[{index}]',
+                               load_object, **transformed))
+    return run_stage(xcoms, timings, 'reduce', 'merge_load_stats', merge_load_stats, load_stats=loads)
+
+def run_etl_pipeline(in_memory=False, pipelined=False, fan_out=False):
+    """
+    Run the complete ETL pipeline manually.
+    With in_memory=True the transformed batches are handed to the load step in memory
+    (spilling to the intermediate file past ETL_MEMORY_BUDGET_MB) instead of via a file.
+    With pipelined=True transform and load run concurrently over bounded queues.
+    With fan_out=True every new MinIO object is transformed and merged on its own.
+    """
+    mode = (" (pipelined)..." if pipelined else " (in-memory handoff)..." if in_memory
+            else " (per-object fan-out)..." if fan_out else "...")
+    print("Starting ETL Pipeline" + mode)
     print("=" * 50)
     
+    xcoms = {}
+    timings = []
+    run_id = f"manual__{datetime.now().isoformat()}"
     try:
+        if fan_out:
+            print("\nListing new objects, then transforming and loading each one...")
+            totals = run_fan_out(xcoms, timings)
+            print(f"Fan-out completed: {totals}")
+            return
+        
         # Step 1: Extract
         print("\nStep 1: Extracting data from MinIO...")
-        extract_result = extract_from_minio()
+        extract_result = run_stage(xcoms, timings, 'extract', 'extract_from_minio', extract_from_minio)
         print(f"Extract completed: {extract_result}")
         
-        # Step 2: Transform
-        print("\nStep 2: Transforming data...")
-        transform_result = transform_data()
-        print(f"Transform completed: {transform_result}")
-        
-        # Step 3: Load
-        print("\nStep 3: Loading data to PostgreSQL...")
-        load_to_postgresql()
+        try:
+            if pipelined:
+                # Steps 2+3: chunks are cleaned and COPYed as they stream in
+                print("\nStep 2: Transforming and loading data concurrently...")
+                run_stage(xcoms, timings, 'transform+load', 'transform_and_load_pipelined',
+                          transform_and_load_pipelined)
+            else:
+                # Step 2: Transform
+                print("\nStep 2: Transforming data...")
+                transform_result = run_stage(xcoms, timings, 'transform', 'transform_data', transform_data,
+                                             in_memory=in_memory)
+                print(f"Transform completed: {transform_result}")
+                
+                # Step 3: Load
+                print("\nStep 3: Loading data to PostgreSQL...")
+                run_stage(xcoms, timings, 'load', 'load_to_postgresql', load_to_postgresql)
+        except AirflowSkipException as e:
+            # Incremental mode: the source matches the last loaded watermark
+            print(f"Pipeline skipped: {e}")
+            return
         print("Load completed successfully!")
         
         print("\nETL Pipeline completed successfully!")
@@ -36,21 +153,13 @@ def run_etl_pipeline():
         
         # Validation query
         print("\nValidating data in PostgreSQL...")
-        import psycopg2
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5433,
-            database="etl_demo",
-            user="postgres",
-            password="SpeakO13."
-        )
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM movies;")
-        count = cur.fetchone()[0]
-        cur.execute("SELECT movie_title, imdb_score FROM movies LIMIT 5;")
-        sample_data = cur.fetchall()
-        cur.close()
-        conn.close()
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM movies;")
+            count = cur.fetchone()[0]
+            cur.execute("SELECT movie_title, imdb_score FROM movies LIMIT 5;")
+            sample_data = cur.fetchall()
+            cur.close()
         
         print(f"Total records in database: {count}")
         print("Sample data:")
@@ -60,6 +169,13 @@ def run_etl_pipeline():
     except Exception as e:
         print(f"Error in ETL pipeline: {e}")
         raise
+    finally:
+        print_stage_table(timings)
+        save_stage_metrics(run_id, 'pipelined' if pipelined else 'in-memory' if in_memory
+                           else 'fan-out' if fan_out else 'serial', timings)
 
 if __name__ == "__main__":
-    run_etl_pipeline()
\ No newline at end of file
+    runner_mode = os.environ.get('ETL_RUNNER_MODE')
+    run_etl_pipeline(in_memory='--in-memory' in sys.argv[1:] or runner_mode == 'in-memory',
+                     pipelined='--pipelined' in sys.argv[1:] or runner_mode == 'pipelined',
+                     fan_out='--fan-out' in sys.argv[1:] or runner_mode == 'fan-out')
\ No newline at end of file
@@ -4,13 +4,28 @@ Simple Web Interface for ETL Pipeline Status
 Since Airflow webserver has Windows issues, this provides a basic web UI
 """
 
-from flask import Flask, render_template_string, jsonify
-import psycopg2
+from flask import Flask, Response, render_template_string, jsonify, request, stream_with_context
+import json
 import os
+import sys
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
+from db import get_connection
+from etl_metrics import RUN_METRICS_FILE, db_call_counters
+from etl_state import load_json_state
+from jobs import JobRunner
+from stats_cache import DASHBOARD_STATS_KEY, YEAR_STATS_KEY, StatsCache, compute_dashboard_stats, compute_year_stats
 
 app = Flask(__name__)
 
+# Dashboard stats are served from here; the ETL load task refreshes the shared store
+stats_cache = StatsCache()
+
+# Pipeline runs execute in the background; at most one run of the ETL pipeline at a time
+job_runner = JobRunner()
+
 # HTML template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -60,6 +75,9 @@ HTML_TEMPLATE = """
             <h3>Pipeline Status: OPERATIONAL</h3>
             <p><strong>Last Updated:</strong> {{ current_time }}</p>
             <p><strong>DAG:</strong> etl_pipeline (Extract → Transform → Load)</p>
+            {% if job %}
+            <p><strong>Last Run:</strong> <a href="/jobs/{{ job.id }}">{{ job.id }}</a> ({{ job.status }})</p>
+            {% endif %}
         </div>
         
         <div class="status-card info">
@@ -67,6 +85,7 @@ HTML_TEMPLATE = """
             <p><strong>Total Records:</strong> {{ total_records }}</p>
             <p><strong>Database:</strong> PostgreSQL (etl_demo)</p>
             <p><strong>Table:</strong> movies</p>
+            <p><strong>Stats Cache:</strong> {{ cache.hits }} hits / {{ cache.misses }} misses (version {{ cache.version }})</p>
         </div>
         
         <div class="status-card warning">
@@ -116,40 +135,14 @@ HTML_TEMPLATE = """
 """
 
 def get_database_stats():
-    """Get database statistics"""
+    """Get database statistics (cached, recomputed on expiry or after a load)"""
+    def compute():
+        with get_connection() as conn:
+            return compute_dashboard_stats(conn)
+    
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5433,
-            database="etl_demo",
-            user="postgres",
-            password="SpeakO13."
-        )
-        cur = conn.cursor()
-        
-        # Get total count
-        cur.execute("SELECT COUNT(*) FROM movies;")
-        total = cur.fetchone()[0]
-        
-        # Get sample data
-        cur.execute("""
-            SELECT movie_title, imdb_score, title_year, budget 
-            FROM movies 
-            ORDER BY imdb_score DESC 
-            LIMIT 5;
-        """)
-        sample_data = cur.fetchall()
-        
-        # Clean movie titles
-        cleaned_sample = []
-        for row in sample_data:
-            clean_title = row[0].replace('?ÿ', '').strip() if row[0] else 'Unknown'
-            cleaned_sample.append((clean_title, row[1], row[2], row[3]))
-        
-        cur.close()
-        conn.close()
-        
-        return total, cleaned_sample
+        stats = stats_cache.get(DASHBOARD_STATS_KEY, compute)
+        return stats['total'], stats['sample']
         
     except Exception as e:
         print(f"Database error: {e}")
@@ -164,56 +157,186 @@ def dashboard():
     return render_template_string(HTML_TEMPLATE, 
                                 current_time=current_time,
                                 total_records=total_records,
-                                sample_data=sample_data)
+                                sample_data=sample_data,
+                                cache=stats_cache.counters(),
+                                job=job_runner.latest())
+
+# Page size for /data, and the largest page a client may ask for
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip by the server-side cursor behind the NDJSON stream
+STREAM_FETCH_SIZE = 2000
+
+def parse_after(after):
+    """Parse the keyset cursor 'score,id' from the previous page"""
+    score, movie_id = after.split(',')
+    # Decimal keeps the comparison on the NUMERIC column, so the index stays usable
+    return Decimal(score), int(movie_id)
+
+def keyset_query(after, limit=None):
+    """Movies ordered by score (backed by the imdb_score index), starting after a keyset cursor"""
+    query = "SELECT id, movie_title, imdb_score, title_year, budget FROM movies"
+    params = []
+    if after is not None:
+        query += " WHERE (imdb_score, id) < (%s, %s)"
+        params.extend(after)
+    query += " ORDER BY imdb_score DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+def stream_ndjson(after):
+    """Yield every remaining movie as one JSON line, read through a named server-side cursor"""
+    with get_connection() as conn:
+        cur = conn.cursor(name='movies_ndjson')
+        cur.itersize = STREAM_FETCH_SIZE
+        cur.execute(*keyset_query(after))
+        for movie_id, title, score, year, budget in cur:
+            yield json.dumps({
+                "id": movie_id,
+                "movie_title": title or 'Unknown',
+                "imdb_score": float(score) if score is not None else None,
+                "title_year": year,
+                "budget": budget,
+            }) + "\n"
+        cur.close()
 
 @app.route('/data')
 def view_data():
-    """View all data"""
+    """
+    View data one page at a time (?limit=&after=score,id), or the whole table as
+    NDJSON with ?format=ndjson
+    """
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5433,
-            database="etl_demo",
-            user="postgres",
-            password="SpeakO13."
-        )
-        cur = conn.cursor()
-        cur.execute("SELECT movie_title, imdb_score, title_year, budget FROM movies ORDER BY imdb_score DESC;")
-        all_data = cur.fetchall()
-        cur.close()
-        conn.close()
+        after = request.args.get('after')
+        after = parse_after(after) if after else None
+    except (ValueError, InvalidOperation):
+        return jsonify({"error": "after must be '<imdb_score>,<id>'"}), 400
+    
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_ndjson(after)), mimetype='application/x-ndjson')
+    
+    try:
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        with get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(*keyset_query(after, limit))
+            page = cur.fetchall()
+            cur.close()
         
-        # Clean data
-        cleaned_data = []
-        for row in all_data:
-            clean_title = row[0].replace('?ÿ', '').strip() if row[0] else 'Unknown'
-            cleaned_data.append((clean_title, row[1], row[2], row[3]))
+        # Titles are normalized by the transform step, only fill in missing ones
+        data = [(row[1] or 'Unknown',) + tuple(row[2:]) for row in page]
+        next_after = f"{page[-1][2]},{page[-1][0]}" if len(page) == limit else None
         
-        return jsonify({"data": cleaned_data, "count": len(cleaned_data)})
+        return jsonify({"data": data, "count": len(data), "next_after": next_after})
         
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@app.route('/stats')
+def year_stats():
+    """Per-year movie counts, score and budget/gross totals and score histograms (from the rollup tables)"""
+    def compute():
+        with get_connection() as conn:
+            return compute_year_stats(conn)
+    
+    try:
+        return jsonify(stats_cache.get(YEAR_STATS_KEY, compute))
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/run-etl', methods=['POST'])
 def run_etl():
-    """Run ETL pipeline"""
+    """Start the ETL pipeline in the background and return its job id"""
     try:
-        import subprocess
-        result = subprocess.run(['python', 'run_etl_dag.py'], 
-                              capture_output=True, text=True, cwd='d:/Data-Engineering-Buildables-Fellowship/Task-5')
-        
-        if result.returncode == 0:
-            return jsonify({"message": "ETL Pipeline executed successfully!"})
-        else:
-            return jsonify({"message": f"ETL Pipeline failed: {result.stderr}"})
+        job, created = job_runner.submit('etl_pipeline')
+        if not created:
+            return jsonify({"message": f"ETL Pipeline is already running (job {job.id})",
+                            "job_id": job.id, "status_url": f"/jobs/{job.id}"}), 409
+        return jsonify({"message": f"ETL Pipeline started (job {job.id})",
+                        "job_id": job.id, "status_url": f"/jobs/{job.id}"}), 202
             
     except Exception as e:
-        return jsonify({"message": f"Error running ETL: {str(e)}"})
+        return jsonify({"message": f"Error running ETL: {str(e)}"}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status and per-stage progress (row counts, timings) of a pipeline job"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/logs')
 def view_logs():
-    """View logs"""
-    return jsonify({"message": "Logs feature coming soon!"})
+    """Stream the log of a job (?job=<id>, default the latest run) as plain text"""
+    job_id = request.args.get('job')
+    job = job_runner.get(job_id) if job_id else job_runner.latest()
+    if job is None:
+        return jsonify({"message": "No ETL runs yet" if not job_id else f"Unknown job '{job_id}'"}), 404
+    
+    # Follow a running job until it finishes unless ?follow=0
+    follow = request.args.get('follow', '1') != '0'
+    lines = job.follow_logs() if follow else iter(job.log_lines()[0])
+    return Response(stream_with_context(line + '\n' for line in lines), mimetype='text/plain')
+
+# Per-stage gauges exported from the last manual run: (metric name, stage field, scale, help)
+STAGE_GAUGES = [
+    ('etl_stage_wall_seconds', 'wall_seconds', 1, 'Wall time of the stage'),
+    ('etl_stage_cpu_seconds', 'cpu_seconds', 1, 'CPU time of the stage, including worker processes'),
+    ('etl_stage_peak_rss_bytes', 'peak_rss_mb', 1024 * 1024, 'Process peak resident memory at the end of the stage'),
+    ('etl_stage_rows_in', 'rows_in', 1, 'Rows read by the stage'),
+    ('etl_stage_rows_out', 'rows_out', 1, 'Rows written by the stage'),
+    ('etl_stage_bytes_read', 'bytes_read', 1, 'Bytes of input files read by the stage'),
+    ('etl_stage_db_round_trips', 'db_round_trips', 1, 'Database statements and COPYs issued by the stage'),
+    ('etl_stage_db_seconds', 'db_seconds', 1, 'Time spent waiting for the database'),
+]
+
+def prometheus_metric(lines, name, metric_type, help_text, samples):
+    """Append one metric family in the Prometheus text format; samples are (labels, value)"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        label_text = ','.join(
+            '{}="{}"'.format(key, str(val).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, val in labels.items()
+        )
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: last manual run's stages, dashboard cache, DB calls and jobs"""
+    lines = []
+    run = load_json_state(RUN_METRICS_FILE)
+    stages = run.get('stages', [])
+    if run:
+        prometheus_metric(lines, 'etl_last_run_info', 'gauge', 'Last manual pipeline run',
+                          [({'run_id': run['run_id'], 'mode': run['mode']}, 1)])
+        prometheus_metric(lines, 'etl_stage_success', 'gauge', '1 if the stage finished in the last run',
+                          [({'stage': stage['stage']}, int(stage['status'] == 'finished')) for stage in stages])
+    for name, field, scale, help_text in STAGE_GAUGES:
+        samples = [({'stage': stage['stage']}, round(stage[field] * scale) if scale > 1 else stage[field])
+                   for stage in stages
+                   if stage.get(field) is not None]
+        if samples:
+            prometheus_metric(lines, name, 'gauge', help_text, samples)
+    
+    cache = stats_cache.counters()
+    prometheus_metric(lines, 'etl_dashboard_stats_cache_hits_total', 'counter', 'Dashboard stats cache hits',
+                      [({}, cache['hits'])])
+    prometheus_metric(lines, 'etl_dashboard_stats_cache_misses_total', 'counter', 'Dashboard stats cache misses',
+                      [({}, cache['misses'])])
+    db_calls = db_call_counters()
+    prometheus_metric(lines, 'etl_dashboard_db_round_trips_total', 'counter',
+                      'Database statements issued by the dashboard process', [({}, db_calls['round_trips'])])
+    prometheus_metric(lines, 'etl_dashboard_db_seconds_total', 'counter',
+                      'Time the dashboard process spent waiting for the database', [({}, round(db_calls['seconds'], 6))])
+    prometheus_metric(lines, 'etl_jobs', 'gauge', 'Pipeline jobs kept by the dashboard, by status',
+                      [({'status': status}, count) for status, count in job_runner.status_counts().items()])
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     print("Starting ETL Pipeline Web Interface...")
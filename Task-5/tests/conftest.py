@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'airflow', 'dags'))
+
+# Database tests drop and recreate the ETL tables, so they run against a scratch database
+# (created beforehand, e.g. `createdb etl_test`), never the warehouse in PGDATABASE
+os.environ['PGDATABASE'] = os.environ.get('ETL_TEST_PGDATABASE', 'etl_test')
+
+ETL_TABLES = ['movies', 'etl_watermarks', 'movies_year_rollup', 'movies_score_histogram', 'movies_top_by_year']
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Point the ETL state files at a fresh directory"""
+    import etl_state
+    path = str(tmp_path / 'state')
+    monkeypatch.setattr(etl_state, 'STATE_DIR', path)
+    return path
+
+
+@pytest.fixture
+def pg_conn(state_dir):
+    """Pooled connection to the scratch database with the ETL tables dropped; skips without PostgreSQL"""
+    import psycopg2
+    from db import get_connection
+
+    try:
+        with get_connection() as conn:
+            pass
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {str(e).strip()}")
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {', '.join(ETL_TABLES)} CASCADE")
+        cur.close()
+        conn.commit()
+        yield conn
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from dedup import RowDeduplicator
+from hash_set import HashSet, merge_sorted
+
+
+def test_hash_set_membership_across_merged_runs():
+    hashes = HashSet()
+    added = []
+    for chunk in ([5, 1, 5], [9, 3], [2], [8, 7, 6, 4], [3, 10]):
+        hashes.add(chunk)
+        added += chunk
+    # Runs of similar size have been merged, and every run stays sorted and unique
+    assert 1 < len(hashes.runs) < 5
+    assert all(np.array_equal(run, np.unique(run)) for run in hashes.runs)
+
+    probe = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 0, 11, -1])
+    assert hashes.contains(probe).tolist() == [True] * 10 + [False] * 3
+    assert len(hashes) == 10
+    assert hashes.to_array().tolist() == sorted(set(added))
+
+
+def test_hash_set_matches_a_plain_set():
+    rng = np.random.default_rng(0)
+    hashes = HashSet(np.uint64)
+    reference = set()
+    for _ in range(40):
+        chunk = rng.integers(0, 500, rng.integers(0, 50)).astype(np.uint64)
+        assert hashes.contains(chunk).tolist() == [value in reference for value in chunk.tolist()]
+        hashes.add(chunk)
+        reference.update(chunk.tolist())
+    assert hashes.to_array().tolist() == sorted(reference)
+
+
+def test_merge_sorted():
+    assert merge_sorted(np.array([1, 4, 6]), np.array([2, 4, 7])).tolist() == [1, 2, 4, 6, 7]
+
+
+def test_row_deduplicator_drops_repeats_within_and_across_chunks():
+    dedup = RowDeduplicator()
+    first = pd.DataFrame({'row': ['a', 'b', 'a', 'c']})
+    second = pd.DataFrame({'row': ['c', 'd', 'd', 'e']})
+
+    kept = dedup.filter(first, np.array([1, 2, 1, 3]))
+    assert kept['row'].tolist() == ['a', 'b', 'c']
+    kept = dedup.filter(second, np.array([3, 4, 4, 5]))
+    assert kept['row'].tolist() == ['d', 'e']
+
+    assert (dedup.repeated, dedup.already_loaded, dedup.dropped) == (3, 0, 3)
+    assert dedup.run_hashes.tolist() == [1, 2, 3, 4, 5]
+
+
+def test_row_deduplicator_seen_set():
+    seen = np.array([2, 4], dtype=np.int64)
+    frame = pd.DataFrame({'row': ['a', 'b', 'c', 'b']})
+    hashes = np.array([1, 2, 3, 2])
+
+    merging = RowDeduplicator(seen)
+    assert merging.filter(frame, hashes)['row'].tolist() == ['a', 'c']
+    assert (merging.repeated, merging.already_loaded) == (0, 2)
+
+    # Without drop_seen, loaded rows are kept and the set is only carried forward
+    replacing = RowDeduplicator(seen, drop_seen=False)
+    assert replacing.filter(frame, hashes)['row'].tolist() == ['a', 'b', 'c']
+    assert (replacing.repeated, replacing.already_loaded) == (1, 0)
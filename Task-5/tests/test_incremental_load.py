@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+
+from incremental_load import changed_sources, ensure_movies_table, load_movies, source_unchanged
+from movies_loader import bulk_load, prepare_movies_frame
+from movies_partitions import ensure_partitions, movies_relkind, partition_starts
+from movies_schema import movies_table_ddl
+
+
+def movies_frame(rows):
+    """Prepared movies frame from (title, year, score) tuples, other columns 0"""
+    return prepare_movies_frame(pd.DataFrame(rows, columns=['movie_title', 'title_year', 'imdb_score']))
+
+
+def fetch_scores(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT movie_title, title_year, imdb_score FROM movies ORDER BY movie_title")
+    rows = [(title, year, float(score)) for title, year, score in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def test_bulk_load_bisects_to_the_bad_row(pg_conn):
+    rows = [(f"Movie {i}", 2000 + i, 7.0) for i in range(8)]
+    rows[5] = ('x' * 300, 2005, 7.0)  # longer than VARCHAR(255)
+    frame = movies_frame(rows)
+    cur = pg_conn.cursor()
+    ensure_movies_table(cur)
+    ensure_partitions(cur, partition_starts(frame['title_year']))
+    cur.close()
+
+    stats = bulk_load(pg_conn, frame, batch_size=8)
+    pg_conn.commit()
+
+    assert (stats['loaded'], stats['rejected'], stats['batches']) == (7, 1, 1)
+    assert [row[0] for row in fetch_scores(pg_conn)] == [f"Movie {i}" for i in range(8) if i != 5]
+
+
+def test_incremental_load_upserts_on_the_merge_key(pg_conn):
+    load_movies(pg_conn, [movies_frame([('Avatar', 2009, 7.9), ('Up', 2009, 8.3), ('Heat', 1995, 8.2)])],
+                mode='incremental')
+
+    # Same key despite case and spacing: one update, one unchanged row, one insert
+    stats = load_movies(pg_conn, [movies_frame([('  avatar ', 2009, 8.0), ('Up', 2009, 8.3), ('Alien', 1979, 8.5)])],
+                        mode='incremental')
+
+    assert (stats['inserted'], stats['updated']) == (1, 1)
+    assert fetch_scores(pg_conn) == [
+        ('  avatar ', 2009, 8.0), ('Alien', 1979, 8.5), ('Heat', 1995, 8.2), ('Up', 2009, 8.3)]
+
+
+def test_watermark_marks_a_loaded_source_unchanged(pg_conn):
+    frame = movies_frame([('Avatar', 2009, 7.9)])
+    assert not source_unchanged(pg_conn, 'movies.csv', 'etag-1')
+
+    load_movies(pg_conn, [frame], mode='incremental', source='movies.csv', fingerprint='etag-1')
+
+    assert source_unchanged(pg_conn, 'movies.csv', 'etag-1')
+    assert not source_unchanged(pg_conn, 'movies.csv', 'etag-2')
+    assert changed_sources(pg_conn, {'movies.csv': 'etag-1', 'other.csv': 'etag-1'}) == ['other.csv']
+
+
+def test_unpartitioned_table_is_only_rebuilt_by_a_full_load(pg_conn):
+    load_movies(pg_conn, [movies_frame([('Heat', 1995, 8.2)])], mode='incremental', source='b.csv', fingerprint='b1')
+    cur = pg_conn.cursor()
+    cur.execute("DROP TABLE movies CASCADE")
+    cur.execute(movies_table_ddl())
+    cur.execute("INSERT INTO movies (movie_title, title_year, imdb_score) VALUES ('Heat', 1995, 8.2)")
+    pg_conn.commit()
+
+    for mode in ('incremental', 'partitions'):
+        with pytest.raises(ValueError, match='not partitioned'):
+            load_movies(pg_conn, [movies_frame([('Up', 2009, 8.3)])], mode=mode, source='a.csv', fingerprint='a1')
+    assert movies_relkind(cur) == 'r'
+    assert fetch_scores(pg_conn) == [('Heat', 1995, 8.2)]
+
+    # The full load keeps only a.csv's rows, so b.csv must be reloaded by its next run
+    load_movies(pg_conn, [movies_frame([('Up', 2009, 8.3)])], mode='full', source='a.csv', fingerprint='a1')
+    assert movies_relkind(cur) == 'p'
+    assert fetch_scores(pg_conn) == [('Up', 2009, 8.3)]
+    assert changed_sources(pg_conn, {'a.csv': 'a1', 'b.csv': 'b1'}) == ['b.csv']
+
+
+def test_rows_without_merge_keys_stop_an_object_load(pg_conn):
+    # Two sources merged like the DAG's mapped load_object tasks
+    load_movies(pg_conn, [movies_frame([('Heat', 1995, 8.2)])], mode='incremental', source='a.csv', fingerprint='a1')
+    load_movies(pg_conn, [movies_frame([('Up', 2009, 8.3)])], mode='incremental', source='b.csv', fingerprint='b1')
+    cur = pg_conn.cursor()
+    cur.execute("UPDATE movies SET row_key = NULL WHERE movie_title = 'Heat'")
+    pg_conn.commit()
+
+    with pytest.raises(ValueError, match='without merge keys'):
+        load_movies(pg_conn, [movies_frame([('Heat', 1995, 8.4)])], mode='incremental',
+                    source='a.csv', fingerprint='a2')
+    assert fetch_scores(pg_conn) == [('Heat', 1995, 8.2), ('Up', 2009, 8.3)]
+    assert changed_sources(pg_conn, {'a.csv': 'a2', 'b.csv': 'b1'}) == ['a.csv']
+
+    # The explicit rebuild from a.csv alone hands b.csv back to the next run
+    load_movies(pg_conn, [movies_frame([('Heat', 1995, 8.4)])], mode='full', source='a.csv', fingerprint='a2')
+    assert changed_sources(pg_conn, {'a.csv': 'a2', 'b.csv': 'b1'}) == ['b.csv']
+    load_movies(pg_conn, [movies_frame([('Up', 2009, 8.3)])], mode='incremental', source='b.csv', fingerprint='b1')
+    assert fetch_scores(pg_conn) == [('Heat', 1995, 8.4), ('Up', 2009, 8.3)]
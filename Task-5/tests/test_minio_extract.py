@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+import pytest
+
+moto = pytest.importorskip('moto')
+import boto3
+
+from minio_extract import _verify_etag, download_object
+
+BUCKET = 'movies'
+
+
+@pytest.fixture
+def s3(state_dir, monkeypatch):
+    """S3 client against moto's in-process mock with an empty bucket"""
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        monkeypatch.setenv(name, 'testing')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_download_in_ranged_parts(s3, tmp_path):
+    body = os.urandom(100_000)
+    s3.put_object(Bucket=BUCKET, Key='movies.csv', Body=body)
+    dest = str(tmp_path / 'landing' / 'movies.csv')
+
+    result = download_object(BUCKET, 'movies.csv', dest, client=s3, part_size=7_000, max_workers=4)
+
+    assert result == {'path': dest, 'etag': hashlib.md5(body).hexdigest(), 'size': 100_000, 'downloaded': True}
+    assert read(dest) == body
+    assert not os.path.exists(dest + '.part')
+
+
+def test_download_verifies_a_multipart_etag(s3, tmp_path):
+    parts = [os.urandom(5 * 1024 * 1024), os.urandom(1_000)]
+    upload_id = s3.create_multipart_upload(Bucket=BUCKET, Key='big.csv')['UploadId']
+    uploaded = [{'PartNumber': n, 'ETag': s3.upload_part(Bucket=BUCKET, Key='big.csv', UploadId=upload_id,
+                                                         PartNumber=n, Body=part)['ETag']}
+                for n, part in enumerate(parts, 1)]
+    s3.complete_multipart_upload(Bucket=BUCKET, Key='big.csv', UploadId=upload_id,
+                                 MultipartUpload={'Parts': uploaded})
+    dest = str(tmp_path / 'big.csv')
+
+    # The download parts are realigned to the 5 MiB upload parts despite the smaller part_size
+    result = download_object(BUCKET, 'big.csv', dest, client=s3, part_size=1024 * 1024)
+
+    assert result['etag'].endswith('-2') and result['downloaded']
+    assert read(dest) == b''.join(parts)
+
+
+def test_unchanged_object_is_not_downloaded_again(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key='movies.csv', Body=b'title\nUp\n')
+    dest = str(tmp_path / 'movies.csv')
+    assert download_object(BUCKET, 'movies.csv', dest, client=s3)['downloaded']
+
+    assert not download_object(BUCKET, 'movies.csv', dest, client=s3)['downloaded']
+    assert download_object(BUCKET, 'movies.csv', dest, client=s3, force=True)['downloaded']
+
+    # A truncated local copy or a new ETag both trigger a fresh download
+    with open(dest, 'wb') as f:
+        f.write(b'title\n')
+    assert download_object(BUCKET, 'movies.csv', dest, client=s3)['downloaded']
+    s3.put_object(Bucket=BUCKET, Key='movies.csv', Body=b'title\nHeat\n')
+    assert download_object(BUCKET, 'movies.csv', dest, client=s3)['downloaded']
+    assert read(dest) == b'title\nHeat\n'
+
+
+def test_download_an_empty_object(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key='empty.csv', Body=b'')
+    dest = str(tmp_path / 'empty.csv')
+
+    result = download_object(BUCKET, 'empty.csv', dest, client=s3)
+
+    assert (result['size'], result['downloaded']) == (0, True)
+    assert read(dest) == b''
+    assert not download_object(BUCKET, 'empty.csv', dest, client=s3)['downloaded']
+
+
+def test_verify_etag_rejects_a_size_mismatch(tmp_path):
+    path = tmp_path / 'part'
+    path.write_bytes(b'abc')
+    etag = hashlib.md5(b'abc').hexdigest()
+
+    _verify_etag(str(path), etag, 3, [], False)
+    with pytest.raises(ValueError, match='expected 4 bytes, got 3'):
+        _verify_etag(str(path), etag, 4, [], False)
+    # A multipart ETag that cannot be recomputed is still checked for size
+    with pytest.raises(ValueError, match='Size mismatch'):
+        _verify_etag(str(path), 'abc-3', 4, [], False)
@@ -0,0 +1,53 @@
+import pytest
+
+import movies_partitions
+from incremental_load import ensure_movies_table
+from movies_partitions import (attached_partition_bounds, check_partition_width, ensure_partitions, partition_name,
+                               partition_starts, partition_years)
+
+
+class FakeCursor:
+    """Cursor returning fixed pg_get_expr(relpartbound) rows"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+
+    def execute(self, query, vars=None):
+        pass
+
+    def fetchall(self):
+        return [(bound,) for bound in self.bounds]
+
+
+def test_partition_starts_for_a_year_set(monkeypatch):
+    monkeypatch.setattr(movies_partitions, 'PARTITION_YEARS', 10)
+
+    assert partition_starts([2009, 1995, 2001, None, 0, 2000.0]) == [1990, 2000, None]
+    assert partition_years(1990) == list(range(1990, 2000))
+    assert partition_years(None) == [0]
+    assert [partition_name(start) for start in (1990, None)] == ['movies_1990', 'movies_undated']
+
+
+def test_check_partition_width_rejects_another_width(monkeypatch):
+    monkeypatch.setattr(movies_partitions, 'PARTITION_YEARS', 1)
+    same = FakeCursor(['FOR VALUES FROM (2000) TO (2001)', 'FOR VALUES FROM (2001) TO (2002)', 'DEFAULT'])
+    check_partition_width(same)
+    check_partition_width(FakeCursor(['DEFAULT']))
+
+    wider = FakeCursor(['FOR VALUES FROM (2000) TO (2010)', 'DEFAULT'])
+    with pytest.raises(ValueError, match='partitioned by 10 year'):
+        check_partition_width(wider)
+
+
+def test_ensure_partitions_creates_the_year_ranges(pg_conn, monkeypatch):
+    monkeypatch.setattr(movies_partitions, 'PARTITION_YEARS', 10)
+    cur = pg_conn.cursor()
+    ensure_movies_table(cur)
+
+    ensure_partitions(cur, partition_starts([1995, 2001, 2009, 0]))
+    assert attached_partition_bounds(cur) == [(1990, 2000), (2000, 2010)]
+
+    monkeypatch.setattr(movies_partitions, 'PARTITION_YEARS', 1)
+    with pytest.raises(ValueError, match='ETL_PARTITION_YEARS is 1'):
+        ensure_partitions(cur, partition_starts([2015]))
+    pg_conn.rollback()
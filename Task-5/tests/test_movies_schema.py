@@ -0,0 +1,42 @@
+import io
+
+import pandas as pd
+
+from movies_schema import iter_movies_csv
+
+HEADER = b'movie_title,num_voted_users,title_year,imdb_score\n'
+
+
+def read_all(data, encoding, chunksize=100):
+    return pd.concat(list(iter_movies_csv(io.BytesIO(data), encoding, chunksize)), ignore_index=True)
+
+
+def test_undecodable_byte_switches_the_rest_to_latin1(capsys):
+    # Past the parser's first read block, so earlier chunks are already out as UTF-8
+    rows = [f'Movie {i},{i},2000,7.0\n'.encode() for i in range(40_000)]
+    rows[39_000] = b'Caf\xe9,39000,2000,7.0\n'  # Latin-1 byte in a file sniffed as UTF-8
+
+    frame = read_all(HEADER + b''.join(rows), 'utf-8', chunksize=1000)
+
+    assert len(frame) == 40_000
+    assert frame['movie_title'][39_000] == 'Café'
+    assert frame['num_voted_users'].tolist() == list(range(40_000))
+    out = capsys.readouterr().out
+    assert 'Decoding as utf-8 failed after' in out and 'failed after 0 rows' not in out
+
+
+def test_lenient_and_latin1_fallbacks_combine():
+    rows = [f'Movie {i},{i},2000,7.0\n'.encode() for i in range(600)]
+    rows[250] = b'Heat,"""250""",1995,8.2\n'
+    rows[450] = b'Caf\xe9,450,2000,7.0\n'
+
+    frame = read_all(HEADER + b''.join(rows), 'utf-8')
+
+    assert len(frame) == 600
+    assert frame['movie_title'][[250, 450]].tolist() == ['Heat', 'Café']
+    assert pd.to_numeric(frame['num_voted_users'], errors='coerce').isna().sum() == 1
+
+
+def test_valid_utf8_is_read_strictly():
+    frame = read_all(HEADER + 'Amélie,1,2001,8.3\n'.encode(), 'utf-8')
+    assert frame['movie_title'].tolist() == ['Amélie']
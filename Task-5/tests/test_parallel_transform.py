@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'airflow', 'dags'))
+import etl_state
+import parallel_transform
+from parallel_transform import _transform_partition, plan_partitions, transform_movies_parallel
+from validation import REASON_COLUMN
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Movies.csv')
+
+
+def _movies_with_blank_tail(tmp_path):
+    path = str(tmp_path / 'movies.csv')
+    with open(MOVIES_CSV, 'rb') as src, open(path, 'wb') as dst:
+        dst.write(src.read().rstrip(b'\r\n') + b'\n\n\n\n')
+    return path
+
+
+def test_partition_of_only_blank_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_state, 'STATE_DIR', str(tmp_path / 'state'))
+    path = _movies_with_blank_tail(tmp_path)
+    header, _ = plan_partitions(path)
+    size = os.path.getsize(path)
+
+    task = (path, size - 3, size, header, 'latin-1', str(tmp_path / 'part.arrow'))
+
+    raw_rows, cleaned_rows, rejected, counts = _transform_partition(task)
+    assert (raw_rows, cleaned_rows, len(rejected)) == (0, 0, 0)
+
+    # Depending on the pandas version the range parses to one empty chunk or to none
+    monkeypatch.setattr(parallel_transform, 'iter_movies_csv', lambda *args: iter(()))
+    raw_rows, cleaned_rows, rejected, counts = _transform_partition(task)
+    assert (raw_rows, cleaned_rows, len(rejected)) == (0, 0, 0)
+    assert REASON_COLUMN in rejected.columns
+
+
+def test_parallel_transform_with_blank_trailing_partitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_state, 'STATE_DIR', str(tmp_path / 'state'))
+    path = _movies_with_blank_tail(tmp_path)
+    output = str(tmp_path / 'movies.parquet')
+    # One line per partition, so each trailing blank line is a partition of its own
+    metrics = transform_movies_parallel([path], output, workers=2, partition_bytes=1)
+
+    expected = transform_movies_parallel([MOVIES_CSV], str(tmp_path / 'expected.parquet'), workers=1)
+    assert metrics['rows_out'] == expected['rows_out']
+    pd.testing.assert_frame_equal(pd.read_parquet(output), pd.read_parquet(str(tmp_path / 'expected.parquet')))
+
+
+def test_parallel_transform_without_input_files(tmp_path):
+    with pytest.raises(ValueError, match='at least one input file'):
+        transform_movies_parallel([], str(tmp_path / 'movies.parquet'))
+    assert not os.path.exists(str(tmp_path / 'movies.parquet.parts'))
@@ -0,0 +1,31 @@
+import time
+
+from etl_state import load_json_state
+from stats_cache import STATS_STORE_FILE, StatsCache
+
+
+def stored_keys():
+    return list(load_json_state(STATS_STORE_FILE)['entries'])
+
+
+def test_store_shares_entries_and_invalidations(state_dir):
+    dashboard, loader = StatsCache(), StatsCache()
+    assert dashboard.get('total', lambda: 1) == 1
+    assert loader.get('total', lambda: 2) == 1
+
+    loader.invalidate({'total': 3})
+    assert dashboard.get('total', lambda: 4) == 3
+    assert dashboard.counters() == {'hits': 1, 'misses': 1, 'entries': 1, 'version': 1}
+
+
+def test_store_keeps_the_lru_and_ttl_limits(state_dir, monkeypatch):
+    cache = StatsCache(ttl=60, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.get(key, lambda: key)
+    assert stored_keys() == ['b', 'c']
+
+    # Expired entries are dropped from the file when it is next written
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    cache.get('d', lambda: 'd')
+    assert stored_keys() == ['d']
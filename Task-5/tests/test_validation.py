@@ -0,0 +1,77 @@
+import json
+import os
+
+import pandas as pd
+from validation import REASON_COLUMN, REPORT_STATE_FILE, ValidationReport, validate_chunk
+
+RULES = [
+    {'column': 'title', 'check': 'not_null'},
+    {'column': 'title', 'check': 'max_length', 'value': 5},
+    {'column': 'score', 'check': 'numeric'},
+    {'column': 'score', 'check': 'range', 'min': 0, 'max': 10},
+    {'column': 'votes', 'check': 'numeric', 'severity': 'warn'},
+    {'name': 'gross_vs_budget', 'check': 'expression', 'columns': ['gross', 'budget'],
+     'expr': 'gross <= budget * 2', 'when': 'budget > 0', 'severity': 'warn'},
+    {'name': 'title_unique', 'check': 'unique', 'columns': ['title'], 'severity': 'warn'},
+]
+
+
+def sample_frame():
+    return pd.DataFrame({
+        'Title': ['Up', 'Jaws', 'Avatar', 'Heat', 'Alien'],
+        'score': ['8.3', '7.1', '7.9', 'n/a', '11'],
+        'votes': ['10', 'many', '30', '40', '50'],
+        'gross': [10, 20, 300, 40, 50],
+        'budget': [10, 20, 100, 0, 50],
+    })
+
+
+def test_validate_chunk_passes_warns_and_rejects():
+    valid, rejected, counts = validate_chunk(sample_frame(), RULES)
+
+    # Warn-only failures ('many' votes, gross over twice the budget) keep the row
+    assert valid['Title'].tolist() == ['Up', 'Jaws']
+    assert rejected['Title'].tolist() == ['Avatar', 'Heat', 'Alien']
+    assert rejected[REASON_COLUMN].tolist() == ['title:max_length', 'score:numeric', 'score:range']
+    assert (counts['votes:numeric'], counts['gross_vs_budget'], counts['title:not_null']) == (1, 1, 0)
+
+
+def test_validate_chunk_lists_every_failed_rule():
+    frame = pd.DataFrame({'title': ['Avatar', ' ', None], 'score': ['-1', '5', '5']})
+    _, rejected, counts = validate_chunk(frame, RULES)
+    assert rejected[REASON_COLUMN].tolist() == ['title:max_length;score:range', 'title:not_null', 'title:not_null']
+    # Rules whose columns are missing from the chunk are skipped
+    assert 'votes:numeric' not in counts
+
+
+def test_report_counts_quarantine_file_and_uniqueness(tmp_path, state_dir):
+    quarantine = str(tmp_path / 'quarantine' / 'rejected.csv')
+    report = ValidationReport(RULES, quarantine_path=quarantine)
+    frame = sample_frame()
+    for chunk in (frame.iloc[:3], frame.iloc[3:]):
+        valid, rejected, counts = validate_chunk(chunk, RULES)
+        report.add(len(chunk), rejected, counts)
+        report.check_unique(valid)
+    report.check_unique(pd.DataFrame({'title': [' UP ', 'Rocky']}))
+
+    summary = report.finish()
+    assert (summary['rows_checked'], summary['rows_rejected'], summary['rows_passed']) == (5, 3, 2)
+    assert summary['rules']['title_unique'] == {'severity': 'warn', 'failures': 1}
+    assert summary['rules']['score:range'] == {'severity': 'reject', 'failures': 1}
+
+    quarantined = pd.read_csv(quarantine)
+    assert quarantined['Title'].tolist() == ['Avatar', 'Heat', 'Alien']
+    assert list(quarantined.columns)[-1] == REASON_COLUMN
+    with open(os.path.join(state_dir, REPORT_STATE_FILE)) as f:
+        assert json.load(f)['rows_rejected'] == 3
+
+
+def test_report_removes_a_stale_quarantine_file(tmp_path, state_dir):
+    quarantine = tmp_path / 'rejected.csv'
+    quarantine.write_text('old run\n')
+    report = ValidationReport(RULES, quarantine_path=str(quarantine))
+    valid, rejected, counts = validate_chunk(pd.DataFrame({'title': ['Up'], 'score': ['8']}), RULES)
+    report.add(1, rejected, counts)
+
+    assert report.finish()['quarantine_file'] is None
+    assert not quarantine.exists()
@@ -1,6 +1,11 @@
 from minio import Minio
+import codecs
+import os
+import sys
 import pandas as pd
-from io import BytesIO
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
+from movies_schema import coerce_to_schema
 
 # ---------------- Extract ----------------
 client = Minio(
@@ -13,7 +18,8 @@ client = Minio(
 response = client.get_object("movies", "Movies.csv")  # bucket & filename
 
 # Fix: specify encoding='ISO-8859-1' to handle special characters
-data = pd.read_csv(BytesIO(response.read()), encoding='ISO-8859-1')
+# Parse straight from the HTTP stream instead of buffering the whole object
+data = pd.read_csv(codecs.getreader('ISO-8859-1')(response))
 response.close()
 response.release_conn()
 
@@ -21,18 +27,10 @@ print("Extracted data (first row):")
 print(data.head(1))
 
 # ---------------- Transform ----------------
-numeric_cols = ["num_critic_for_reviews","duration","DIRECTOR_facebook_likes",
-                "actor_3_facebook_likes","ACTOR_1_facebook_likes","gross",
-                "num_voted_users","Cast_Total_facebook_likes","facenumber_in_poster",
-                "num_user_for_reviews","budget","title_year","ACTOR_2_facebook_likes","imdb_score"]
-
-for col in numeric_cols:
-    if col in data.columns:
-        data[col] = pd.to_numeric(data[col], errors='coerce').fillna(0)
-
-# Remove duplicate column if exists
-if data.columns.duplicated().any():
-    data = data.loc[:, ~data.columns.duplicated()]
+# Match the headers to the movies schema whatever their case, drop extra and repeated
+# columns (pandas reads the second title_year as title_year.1) and cast to the schema types
+data = coerce_to_schema(data)
+data = data.fillna({col: 0 for col in data.columns if col != 'movie_title'})
 
 print("\nTransformed data (first row):")
 print(data.head(1))
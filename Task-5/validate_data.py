@@ -1,27 +1,36 @@
-import psycopg2
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airflow', 'dags'))
+from db import get_connection
+from etl_state import load_json_state
+from validation import REPORT_STATE_FILE
 
 # Connect and validate data
-conn = psycopg2.connect(
-    host='localhost', 
-    port=5433, 
-    database='etl_demo', 
-    user='postgres', 
-    password='SpeakO13.'
-)
-cur = conn.cursor()
+with get_connection() as conn:
+    cur = conn.cursor()
+
+    # Get total count
+    cur.execute('SELECT COUNT(*) FROM movies;')
+    total = cur.fetchone()[0]
+    print(f'Total records in database: {total}')
+
+    # Get top movies by IMDB score
+    cur.execute('SELECT movie_title, imdb_score FROM movies ORDER BY imdb_score DESC LIMIT 3;')
+    print('\nTop 3 movies by IMDB score:')
+    for movie, score in cur.fetchall():
+        print(f'  {movie}: {score}')
 
-# Get total count
-cur.execute('SELECT COUNT(*) FROM movies;')
-total = cur.fetchone()[0]
-print(f'Total records in database: {total}')
+    cur.close()
 
-# Get top movies by IMDB score
-cur.execute('SELECT movie_title, imdb_score FROM movies ORDER BY imdb_score DESC LIMIT 3;')
-print('\nTop 3 movies by IMDB score:')
-for movie, score in cur.fetchall():
-    clean_title = movie.replace('?ÿ', '').strip()
-    print(f'  {clean_title}: {score}')
+# Data quality report of the last transform
+report = load_json_state(REPORT_STATE_FILE)
+if report:
+    print(f"\nLast transform: {report['rows_checked']} rows checked, {report['rows_rejected']} quarantined")
+    for name, rule in report['rules'].items():
+        if rule['failures']:
+            print(f"  {name} ({rule['severity']}): {rule['failures']}")
+    if report.get('quarantine_file'):
+        print(f"Rejected rows: {report['quarantine_file']}")
 
-cur.close()
-conn.close()
 print('\nETL Pipeline validation completed successfully!')
\ No newline at end of file